@@ -0,0 +1,139 @@
+from utils.logging_utils import logger
+from utils.text_processing import get_english_words_array
+
+import argparse
+import numpy as np
+import pandas as pd
+import os
+
+# columns of blogtext.csv
+COLUMNS = ['id', 'gender', 'age', 'topic', 'sign', 'date', 'text']
+TOPICS = ['indUnk', 'Student', 'Technology', 'Arts', 'Education', 'Communications-Media', 'Internet',
+          'Non-Profit', 'Engineering', 'Law', 'Publishing', 'Science', 'Government', 'Consulting', 'Religion',
+          'Fashion', 'Marketing', 'Advertising', 'BusinessServices', 'Banking', 'Chemicals', 'Telecommunications',
+          'Accounting', 'Military', 'Museums-Libraries', 'Sports-Recreation', 'HumanResources', 'RealEstate',
+          'Transportation', 'Manufacturing', 'Biotech', 'Tourism', 'LawEnforcement-Security', 'Architecture',
+          'InvestmentBanking', 'Automotive', 'Agriculture', 'Construction', 'Environment', 'Maritime']
+SIGNS = ['Aries', 'Taurus', 'Gemini', 'Cancer', 'Leo', 'Virgo', 'Libra', 'Scorpio', 'Sagittarius', 'Capricorn',
+         'Aquarius', 'Pisces']
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October',
+          'November', 'December']
+# formats of the dollar amounts inserted into the texts
+DOLLAR_FORMATS = ['${:d}', '${:,d}', '${:.2f}', '${:d}M', '${:d} million', '${:.1f} billion', '${:d}bn', '${:d}k',
+                  '${:d} thousand']
+# tokens with punctuation and capital letters, so the cleaning has something to do
+PUNCTUATION = ['.', ',', '!', '?', '...', ':)', ';']
+
+
+def build_vocabulary(size: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Build the vocabulary of the synthetic corpus - English words mixed with made-up words, which are dropped
+    by the cleaning like the slang, names and typos of the real blogs.
+
+    Args:
+        size (int): The number of words in the vocabulary.
+        rng (np.random.Generator): The random generator.
+
+    Returns:
+        np.ndarray: The words, the rank of a word in the Zipf distribution is its position.
+    """
+    english_words = get_english_words_array()
+    n_english = min(len(english_words), size * 3 // 4)
+    english = rng.choice(english_words, n_english, replace=False)
+    syllables = ['bla', 'ka', 'ro', 'mi', 'te', 'lo', 'na', 'zu', 'pe', 'xo', 'ri', 'du', 'gre', 'ph', 'st', 'ck']
+    made_up = {''.join(rng.choice(syllables, rng.integers(2, 7))) for _ in range(size - n_english)}
+    vocabulary = np.concatenate([english, np.array(sorted(made_up), dtype=object)])
+    rng.shuffle(vocabulary)
+    return vocabulary
+
+
+def generate_posts(n_posts: int, vocabulary: np.ndarray, rng: np.random.Generator, mean_length: int = 200,
+                   zipf_exponent: float = 1.1, dollar_rate: float = 0.03, first_id: int = 0) -> pd.DataFrame:
+    """
+    Generate synthetic posts with the schema of blogtext.csv. The words follow a Zipf distribution over
+    the vocabulary and a fraction of the posts contains dollar amounts.
+
+    Args:
+        n_posts (int): The number of posts.
+        vocabulary (np.ndarray): The words ordered by their Zipf rank.
+        rng (np.random.Generator): The random generator.
+        mean_length (int): The mean number of words in a post.
+        zipf_exponent (float): The exponent of the Zipf distribution of the words.
+        dollar_rate (float): The fraction of the posts containing dollar amounts.
+        first_id (int): The number of the first post, used to derive the author ids.
+
+    Returns:
+        pd.DataFrame: The generated posts.
+    """
+    weights = 1 / np.arange(1, len(vocabulary) + 1) ** zipf_exponent
+    cumulative = np.cumsum(weights / weights.sum())
+
+    # post lengths are skewed like in the real corpus, most posts are short and some are very long
+    lengths = np.maximum(rng.geometric(1 / mean_length, n_posts), 1)
+    words = vocabulary[np.searchsorted(cumulative, rng.random(lengths.sum())).clip(max=len(vocabulary) - 1)]
+
+    decorated = rng.random(len(words)) < 0.1
+    words[decorated] = words[decorated] + rng.choice(PUNCTUATION, decorated.sum())
+    capitalized = rng.random(len(words)) < 0.05
+    words[capitalized] = [word.capitalize() for word in words[capitalized]]
+
+    # replace a random word of the selected posts with a dollar amount
+    post_starts = np.cumsum(lengths) - lengths
+    with_dollars = np.flatnonzero(rng.random(n_posts) < dollar_rate)
+    positions = post_starts[with_dollars] + (rng.random(len(with_dollars)) * lengths[with_dollars]).astype(int)
+    formats = rng.choice(DOLLAR_FORMATS, len(positions))
+    values = rng.pareto(1.2, len(positions)) * 10 + 1
+    words[positions] = [amount_format.format(int(value) if 'd' in amount_format else value)
+                        for amount_format, value in zip(formats, values)]
+
+    texts = [' '.join(words[start:start + length]) for start, length in zip(post_starts, lengths)]
+    # authors write several posts, the author attributes are derived from the author id
+    authors = (np.arange(first_id, first_id + n_posts) // 35).astype(np.int64)
+    return pd.DataFrame({
+        'id': authors + 1_000_000,
+        'gender': np.where(authors % 2 == 0, 'female', 'male'),
+        'age': 13 + (authors * 7919) % 36,
+        'topic': np.array(TOPICS)[(authors * 31) % len(TOPICS)],
+        'sign': np.array(SIGNS)[(authors * 17) % len(SIGNS)],
+        'date': [f"{day},{MONTHS[month]},{year}" for day, month, year in
+                 zip(rng.integers(1, 29, n_posts), rng.integers(0, 12, n_posts), rng.integers(1999, 2005, n_posts))],
+        'text': texts,
+    }, columns=COLUMNS)
+
+
+def generate_corpus(directory: str, n_posts: int, seed: int = 42, vocabulary_size: int = 50_000,
+                    chunksize: int = 100_000, **post_options) -> str:
+    """
+    Generate a synthetic corpus with the schema of blogtext.csv and write it to the directory.
+    The corpus is written in chunks, so corpora larger than the memory can be generated.
+
+    Args:
+        directory (str): The target directory.
+        n_posts (int): The number of posts.
+        seed (int): The seed of the random generator, the same seed generates the same corpus.
+        vocabulary_size (int): The number of words in the vocabulary.
+        chunksize (int): The number of posts generated at once.
+        **post_options: The options of generate_posts.
+
+    Returns:
+        str: The path of the generated CSV file.
+    """
+    rng = np.random.default_rng(seed)
+    vocabulary = build_vocabulary(vocabulary_size, rng)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, "blogtext.csv")
+    for first_id in range(0, n_posts, chunksize):
+        posts = generate_posts(min(chunksize, n_posts - first_id), vocabulary, rng, first_id=first_id,
+                               **post_options)
+        posts.to_csv(path, mode='w' if first_id == 0 else 'a', header=first_id == 0, index=False)
+        logger.info(f"Generated {first_id + len(posts)}/{n_posts} posts")
+    return path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate a synthetic blog corpus with the schema of blogtext.csv.")
+    parser.add_argument("directory", help="Directory the blogtext.csv file is written to.")
+    parser.add_argument("--posts", type=int, default=10_000, help="Number of posts (default: 10000).")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the random generator (default: 42).")
+    args = parser.parse_args()
+    generate_corpus(args.directory, args.posts, seed=args.seed)
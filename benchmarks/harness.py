@@ -0,0 +1,180 @@
+from utils.dataset_utils import convert_dataset_to_parquet, load_dataset_to_dataframe, iter_dataset_texts, \
+    get_dataset_fingerprint
+from utils.token_store import load_or_build_token_store
+from utils.logging_utils import logger
+from utils.metrics import MetricsRecorder
+from tasks import Task1, Task2, Task3, Task4, Task5
+from tasks.task import Task
+
+from contextlib import contextmanager
+from typing import Iterator
+import platform
+import time
+import json
+import os
+
+
+class BenchmarkReport:
+    """
+    Collects the timings of the benchmark stages. The peak memory of a stage is sampled while the stage runs,
+    so it is the peak of this stage and not of the whole benchmark so far.
+
+    Attributes:
+        n_posts (int): The number of posts in the benchmarked corpus.
+        stages (list[dict]): The measured stages in the order they ran.
+
+    Methods:
+        stage(name: str, items: int) -> Iterator[dict]:
+            Measure the stage run inside the with block.
+        to_dict() -> dict:
+            Get the machine-readable report.
+    """
+
+    def __init__(self, n_posts: int):
+        """
+        Initialize the BenchmarkReport class.
+
+        Args:
+            n_posts (int): The number of posts in the benchmarked corpus.
+
+        Returns:
+            None
+        """
+        self.n_posts = n_posts
+        self.stages = []
+        self._recorder = MetricsRecorder()
+
+    @contextmanager
+    def stage(self, name: str, items: int) -> Iterator[dict]:
+        """
+        Measure the wall time and the peak RSS of the benchmark process during the stage run inside the with block.
+        The number of processed posts can be updated in the yielded dict when it is known only after the stage.
+
+        Args:
+            name (str): The name of the stage.
+            items (int): The number of posts processed by the stage.
+
+        Returns:
+            Iterator[dict]: The record of the stage.
+        """
+        record = {'name': name, 'posts': items}
+        start = time.perf_counter()
+        with self._recorder.stage(name):
+            yield record
+        record['seconds'] = time.perf_counter() - start
+        record['posts_per_second'] = record['posts'] / record['seconds'] if record['seconds'] > 0 else None
+        # the record of the recorder is removed, so a repeated stage name reports the peak of its own run
+        record['peak_rss_mb'] = self._recorder.records.pop(name)['peak_rss_mb'] or None
+        self.stages.append(record)
+        logger.info(f"{name}: {record['seconds']:.3f} s, {record['posts']} posts")
+
+    def to_dict(self) -> dict:
+        """
+        Get the machine-readable report.
+
+        Args:
+            None
+
+        Returns:
+            dict: The report with the environment and the measured stages.
+        """
+        return {
+            'posts': self.n_posts,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'stages': self.stages,
+        }
+
+
+def benchmark_task(task: Task, report: BenchmarkReport, path_to_dataset: str, token_store) -> None:
+    """
+    Benchmark the loading of the task data and the preprocess, task method and save stages of the task.
+
+    Args:
+        task (Task): The benchmarked task.
+        report (BenchmarkReport): The report the stages are added to.
+        path_to_dataset (str): The path to the dataset files.
+        token_store (TokenStore): The tokenized dataset.
+
+    Returns:
+        None
+    """
+    name = task.__class__.__name__
+    task.token_store = token_store if task.uses_token_store else None
+    with report.stage(f"{name}.load", 0) as record:
+        data = load_dataset_to_dataframe(path_to_dataset, columns=task.columns, filters=task.filters)
+        record['posts'] = len(data)
+    with report.stage(f"{name}.preprocess_data", len(data)):
+        preprocessed_data = task.preprocess_data(data)
+    with report.stage(f"{name}.task_method", len(preprocessed_data)):
+        result = task.task_method(preprocessed_data)
+    with report.stage(f"{name}.save_results", len(preprocessed_data)):
+        task.save_results(result)
+
+
+def run_benchmarks(path_to_dataset: str, n_posts: int, tasks: list[Task] | None = None) -> dict:
+    """
+    Benchmark the dataset loaders and all tasks on the dataset. The artifacts derived from the dataset are built
+    from scratch, so their build time is part of the report.
+
+    Args:
+        path_to_dataset (str): The path to the dataset files.
+        n_posts (int): The number of posts in the dataset.
+        tasks (list[Task] | None): The benchmarked tasks, Task1 to Task5 if None.
+
+    Returns:
+        dict: The machine-readable report.
+    """
+    report = BenchmarkReport(n_posts)
+    with report.stage("load.convert_dataset_to_parquet", n_posts):
+        convert_dataset_to_parquet(path_to_dataset)
+    with report.stage("load.get_dataset_fingerprint", n_posts):
+        dataset_fingerprint = get_dataset_fingerprint(path_to_dataset)
+    with report.stage("load.build_token_store", n_posts):
+        token_store = load_or_build_token_store(iter_dataset_texts(path_to_dataset), dataset_fingerprint)
+
+    for task in tasks or [Task1(), Task2(), Task3(), Task4(), Task5()]:
+        benchmark_task(task, report, path_to_dataset, token_store)
+    return report.to_dict()
+
+
+def find_regressions(report: dict, baseline: dict, max_regression: float, min_seconds: float = 0.1) -> list[str]:
+    """
+    Compare the throughput of the stages with a baseline report. The stages shorter than min_seconds
+    in the baseline are skipped, their timings are mostly noise.
+
+    Args:
+        report (dict): The current report.
+        baseline (dict): The baseline report.
+        max_regression (float): The allowed relative drop of the throughput, e.g. 0.2 for 20 %.
+        min_seconds (float): The minimal duration of a compared stage in the baseline.
+
+    Returns:
+        list[str]: The descriptions of the stages slower than allowed.
+    """
+    baseline_stages = {stage['name']: stage for stage in baseline['stages']}
+    regressions = []
+    for stage in report['stages']:
+        baseline_stage = baseline_stages.get(stage['name'])
+        if baseline_stage is None or baseline_stage['seconds'] < min_seconds or not stage['posts_per_second']:
+            continue
+        ratio = stage['posts_per_second'] / baseline_stage['posts_per_second']
+        if ratio < 1 - max_regression:
+            regressions.append(f"{stage['name']}: {stage['posts_per_second']:.0f} posts/s, "
+                               f"baseline {baseline_stage['posts_per_second']:.0f} posts/s ({ratio - 1:+.0%})")
+    return regressions
+
+
+def load_report(path: str) -> dict:
+    """
+    Load a report saved by the benchmark.
+
+    Args:
+        path (str): The path of the JSON report.
+
+    Returns:
+        dict: The report.
+    """
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,94 @@
+import argparse
+import tempfile
+import shutil
+import json
+import sys
+import os
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse the command line arguments.
+
+    Args:
+        None
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the loaders and the tasks on a synthetic blog corpus.")
+    parser.add_argument("--posts", type=int, default=10_000, help="Number of generated posts (default: 10000).")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the corpus generator (default: 42).")
+    parser.add_argument("--work-dir", default=None,
+                        help="Directory for the corpus, the cache and the results (default: a temporary directory). "
+                             "An existing corpus with the same number of posts is reused.")
+    parser.add_argument("--output", default="benchmark_report.json", help="Path of the JSON report.")
+    parser.add_argument("--baseline", default=None, help="JSON report of a previous run to compare with.")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Allowed relative drop of posts/s of any stage against the baseline (default: 0.2).")
+    parser.add_argument("--min-seconds", type=float, default=0.1,
+                        help="Stages shorter than this in the baseline are not compared (default: 0.1).")
+    return parser.parse_args()
+
+
+def main() -> int:
+    """
+    Generate the corpus, run the benchmark and compare it with the baseline.
+
+    Args:
+        None
+
+    Returns:
+        int: The exit code, 1 if any stage is slower than the baseline allows.
+    """
+    args = parse_arguments()
+    work_directory = os.path.abspath(args.work_dir or tempfile.mkdtemp(prefix="blog-corpus-benchmark-"))
+    output_path = os.path.abspath(args.output)
+    baseline_path = args.baseline and os.path.abspath(args.baseline)
+    # the artifacts are built from scratch in the work directory, the project cache is not touched;
+    # the cache directory is read by config on import, so the project modules are imported just now
+    os.makedirs(work_directory, exist_ok=True)
+    run_directory = tempfile.mkdtemp(prefix="run-", dir=work_directory)
+    # except for the vocabulary artifact, it is not derived from the dataset and building it downloads
+    # the NLTK words corpus, so it is copied from the project cache and the benchmark runs offline
+    project_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    project_cache_directory = os.environ.get("BLOG_CORPUS_CACHE_DIR", os.path.join(project_directory, "cache"))
+    vocabulary_path = os.path.join("vocabulary", "english_words.npy")
+    if os.path.exists(os.path.join(project_cache_directory, vocabulary_path)):
+        os.makedirs(os.path.join(run_directory, "cache", "vocabulary"))
+        shutil.copyfile(os.path.join(project_cache_directory, vocabulary_path),
+                        os.path.join(run_directory, "cache", vocabulary_path))
+    os.environ["BLOG_CORPUS_CACHE_DIR"] = os.path.join(run_directory, "cache")
+
+    from benchmarks.generate_corpus import generate_corpus
+    from benchmarks.harness import run_benchmarks, find_regressions, load_report
+    from utils.dataset_utils import COLUMNAR_DIRECTORY_NAME
+    from utils.logging_utils import logger
+
+    corpus_directory = os.path.join(work_directory, f"corpus-{args.posts}-{args.seed}")
+    if not os.path.exists(os.path.join(corpus_directory, "blogtext.csv")):
+        logger.info(f"Generating synthetic corpus with {args.posts} posts to {corpus_directory}")
+        generate_corpus(corpus_directory, args.posts, seed=args.seed)
+    # the columnar copy is stored next to the corpus, remove it so its conversion is measured
+    shutil.rmtree(os.path.join(corpus_directory, COLUMNAR_DIRECTORY_NAME), ignore_errors=True)
+
+    # the results of the tasks are written to the run directory
+    os.chdir(run_directory)
+    report = run_benchmarks(corpus_directory, args.posts)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Benchmark report saved to {output_path}")
+
+    if baseline_path:
+        regressions = find_regressions(report, load_report(baseline_path), args.max_regression,
+                                       args.min_seconds)
+        for regression in regressions:
+            logger.error(f"Throughput regression - {regression}")
+        if regressions:
+            return 1
+        logger.info("No throughput regression against the baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
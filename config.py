@@ -1,18 +1,26 @@
-import platform
-import os
-
-def is_windows():
-    return platform.system() == "Windows"
-
-
-project_directory = os.path.dirname(os.path.abspath(__file__))
-# define the path to streamlit web app.py
-streamlit_filepath_webapp = os.path.join(project_directory, "web_app", "app.py")
-
-if is_windows():
-    # define the path to streamlit.exe for windows
-    streamlit_exe_filepath = os.path.join(project_directory, 'venv', 'Scripts', 'streamlit.exe')
-else:
-    # define the path to streamlit for Linux/MacOS
-    streamlit_exe_filepath = os.path.join(project_directory, 'venv', 'bin', 'streamlit')
-
+import platform
+import os
+
+def is_windows():
+    return platform.system() == "Windows"
+
+
+project_directory = os.path.dirname(os.path.abspath(__file__))
+# define the path to streamlit web app.py
+streamlit_filepath_webapp = os.path.join(project_directory, "web_app", "app.py")
+
+if is_windows():
+    # define the path to streamlit.exe for windows
+    streamlit_exe_filepath = os.path.join(project_directory, 'venv', 'Scripts', 'streamlit.exe')
+else:
+    # define the path to streamlit for Linux/MacOS
+    streamlit_exe_filepath = os.path.join(project_directory, 'venv', 'bin', 'streamlit')
+
+# define the directory for build-once artifacts (tokenized corpus, ...) shared across runs
+cache_directory = os.environ.get("BLOG_CORPUS_CACHE_DIR", os.path.join(project_directory, "cache"))
+
+# define the chart interpretation server used by the web app and the limits of the requests sent to it
+interpretation_server_url = os.environ.get("INTERPRETATION_SERVER_URL", "http://81.201.57.116:5008")
+interpretation_timeout = float(os.environ.get("INTERPRETATION_TIMEOUT", "60"))
+interpretation_retries = int(os.environ.get("INTERPRETATION_RETRIES", "2"))
+interpretation_concurrency = int(os.environ.get("INTERPRETATION_CONCURRENCY", "4"))
@@ -1,41 +1,226 @@
-from utils.dataset_utils import download_dataset, load_dataset_to_dataframe
-from utils.logging_utils import logger
-from tasks import Task1, Task2, Task3
-from config import streamlit_filepath_webapp, streamlit_exe_filepath
-import subprocess
-
-
-def main():
-    """
-    Main function to run the tasks and start the Streamlit app.
-    
-    Args:
-        None
-        
-    Returns:
-        None
-    """
-    logger.info('Starting the main function...')
-    logger.info('Downloading the dataset...')
-    # Download latest version of the dataset
-    path = download_dataset("rtatman/blog-authorship-corpus")
-    logger.info(f'Dataset downloaded to {path}')
-    logger.info('Loading the dataset into a DataFrame...')
-    # Load dataset
-    df = load_dataset_to_dataframe(path)
-
-    # iterate over all tasks
-    for task in [Task1(), Task2(), Task3()]:
-        logger.info(f'Starting task: {task.__class__.__name__} ...')
-        task.run(df)
-        logger.info(f'Finished task: {task.__class__.__name__} ...')
-
-    logger.info('All tasks completed successfully!')
-
-    # Start the streamlit app
-    logger.info('Starting streamlit app to visualize results...')
-    subprocess.run([streamlit_exe_filepath, "run", streamlit_filepath_webapp, "--server.port", "8501"], check=True)
-
-
-if __name__ == '__main__':
-    main()
+from utils.data_utils import get_results_directory, RESULTS_DIRECTORY_VARIABLE
+from utils.dataset_utils import download_dataset, get_dataset_fingerprint, convert_dataset_to_parquet
+from utils.logging_utils import logger
+from utils.metrics import metrics, SamplingProfiler
+from utils.similarity import SIMILARITY_BACKENDS
+from utils.normalization import NORMALIZERS
+from utils.word_count_index import parse_filter
+from tasks import TaskScheduler, Ingestor, Previewer
+import tasks as task_modules
+from config import streamlit_filepath_webapp, streamlit_exe_filepath
+import argparse
+import subprocess
+import os
+
+TASK_NAMES = ['Task1', 'Task2', 'Task3', 'Task4', 'Task5']
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse the command line arguments.
+
+    Args:
+        None
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Analyze the blog authorship corpus and visualize the results.")
+    parser.add_argument("--tasks", nargs='+', choices=TASK_NAMES, default=TASK_NAMES,
+                        help="Tasks to run (default: all tasks).")
+    parser.add_argument("--dataset", default=None, metavar="PATH",
+                        help="Path to a dataset file or a directory with dataset files, used instead of downloading "
+                             "the dataset.")
+    parser.add_argument("--output-dir", default=None,
+                        help="Directory of the results, the run report and the metrics (default: results).")
+    parser.add_argument("--no-ui", action="store_true",
+                        help="Do not start the Streamlit app after the tasks, e.g. in a batch job.")
+    parser.add_argument("--no-checkpoints", action="store_true",
+                        help="Do not checkpoint the completed shards of the tasks. By default an interrupted run "
+                             "resumes every unfinished task from its last completed shard.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of worker processes used by the tasks (default: 1, serial execution).")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="Stream the dataset in chunks of this many rows instead of loading it into memory.")
+    parser.add_argument("--concurrency", type=int, default=os.cpu_count() or 1,
+                        help="Maximal number of independent tasks running at once (default: number of CPUs).")
+    parser.add_argument("--similarity-backend", choices=list(SIMILARITY_BACKENDS), default="brute",
+                        help="Backend finding the most similar words in task 2 - exact 'brute' or approximate 'lsh' "
+                             "over the FastText embeddings, or 'levenshtein' comparing the words by their edit "
+                             "distance without any model.")
+    parser.add_argument("--lsh-tables", type=int, default=8,
+                        help="Number of hash tables of the 'lsh' backend, more tables give higher recall.")
+    parser.add_argument("--lsh-window", type=int, default=8,
+                        help="Number of candidate words compared with every word in each hash table of the 'lsh' "
+                             "backend, a wider window gives higher recall.")
+    parser.add_argument("--task1-filter", type=parse_filter, action="append", default=None, dest="task1_filters",
+                        help="Filter of the texts of task 1, e.g. 'gender==male' or 'topic in Arts,Science'. "
+                             "Repeat for more filters combined by AND (default: female authors aged 20 to 30).")
+    parser.add_argument("--task1-words", type=int, default=10,
+                        help="Number of the most common words of task 1 (default: 10).")
+    parser.add_argument("--task1-approximate", type=int, default=None, metavar="CAPACITY",
+                        help="Count the words of task 1 approximately in a fixed memory, monitoring at most CAPACITY "
+                             "words (Space-Saving). The counts are reported with their maximal error.")
+    parser.add_argument("--task1-index", action=argparse.BooleanOptionalAction, default=None,
+                        help="Answer task 1 from the word count index of the dataset, every new --task1-filter slice "
+                             "is then a sum of the selected rows of the index instead of a full run (default: on "
+                             "for the --task1-filter slices counted exactly and without a normalizer).")
+    parser.add_argument("--normalizer", choices=NORMALIZERS, default=None,
+                        help="Fold the inflected forms of the words of tasks 1 and 2, e.g. thinking, thinks and think, "
+                             "by an NLTK stemmer or the WordNet lemmatizer (default: no normalization).")
+    parser.add_argument("--task5-words", type=int, default=5,
+                        help="Number of the most common words of every author in the profiles of task 5 (default: 5).")
+    parser.add_argument("--ingest", nargs='+', default=None, metavar="PATH",
+                        help="Ingest new CSV batches of posts into the persisted task states instead of processing "
+                             "the whole dataset, batches already ingested are skipped.")
+    parser.add_argument("--preview", type=float, default=None, metavar="FRACTION",
+                        help="Preview the results on a stratified sample of FRACTION of the posts (by gender, age band "
+                             "and topic) instead of the full run, with confidence intervals of the estimates. "
+                             "The previews are saved as {task}_preview and the app is not started.")
+    parser.add_argument("--preview-error", type=float, default=None, metavar="TARGET",
+                        help="Grow the preview sample until the relative errors of the estimates are within TARGET, "
+                             "e.g. 0.01 for 1%%. The preview starts from --preview or from 1%% of the posts.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Sample the stack of the main process and save it to results/profile.folded.")
+    return parser.parse_args()
+
+
+def prepare_dataset(args: argparse.Namespace) -> str:
+    """
+    Download the dataset, unless a dataset path is given, and convert it to the columnar format.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+        str: The path to the dataset.
+    """
+    if args.dataset is None:
+        logger.info('Downloading the dataset...')
+        # Download latest version of the dataset
+        with metrics.stage('download_dataset'):
+            path = download_dataset("rtatman/blog-authorship-corpus")
+        logger.info(f'Dataset downloaded to {path}')
+    else:
+        path = args.dataset
+    if os.path.isdir(path):
+        logger.info('Converting the dataset to the columnar format...')
+        with metrics.stage('convert_dataset_to_parquet'):
+            # the conversion is done just once, every following load reads only the needed columns and rows
+            columnar_path = convert_dataset_to_parquet(path)
+        logger.info(f'Columnar dataset stored to {columnar_path}')
+    return path
+
+
+def run_tasks(tasks: list, args: argparse.Namespace) -> None:
+    """
+    Download the dataset and run the tasks on it.
+
+    Args:
+        tasks (list): The tasks to run.
+        args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+        None
+    """
+    path = prepare_dataset(args)
+    with metrics.stage('get_dataset_fingerprint'):
+        dataset_fingerprint = get_dataset_fingerprint(path)
+    scheduler = TaskScheduler(path, dataset_fingerprint, workers=args.workers, chunksize=args.chunksize,
+                              concurrency=args.concurrency, checkpoints=not args.no_checkpoints)
+    for task in tasks:
+        scheduler.add(task)
+    # the tasks with the same dataset, parameters and code as in a previous run are restored from the cache,
+    # the tasks interrupted in a previous run resume from their checkpoints
+    scheduler.run()
+
+
+def preview_tasks(tasks: list, args: argparse.Namespace) -> None:
+    """
+    Download the dataset and preview the results of the tasks on a stratified sample of the posts.
+
+    Args:
+        tasks (list): The tasks to preview.
+        args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+        None
+    """
+    path = prepare_dataset(args)
+    previewer = Previewer(path, fraction=args.preview or 0.01, error_target=args.preview_error)
+    for task in tasks:
+        previewer.preview(task)
+
+
+def main():
+    """
+    Main function to run the tasks and start the Streamlit app, unless it is disabled.
+    
+    Args:
+        None
+        
+    Returns:
+        None
+    """
+    args = parse_arguments()
+    if args.output_dir is not None:
+        # the task processes and the web app inherit the directory of the results
+        os.environ[RESULTS_DIRECTORY_VARIABLE] = args.output_dir
+    profiler = None
+    if args.profile:
+        profiler = SamplingProfiler()
+        profiler.start()
+    logger.info('Starting the main function...')
+
+    use_task1_index = args.task1_index
+    if use_task1_index is None:
+        # the slices are answered from the index unless the words are counted approximately or normalized
+        use_task1_index = args.task1_filters is not None and args.task1_approximate is None \
+            and args.normalizer is None
+    task_options = {
+        'Task1': {'filters': args.task1_filters, 'n_words': args.task1_words,
+                  'approximate_capacity': args.task1_approximate, 'normalizer': args.normalizer,
+                  'use_index': use_task1_index},
+        'Task2': {'normalizer': args.normalizer},
+        'Task5': {'n_top_words': args.task5_words},
+    }
+    if 'Task2' in args.tasks:
+        # the similarity backends are loaded just for Task2, the other tasks do not need scikit-learn
+        from utils.similarity import get_similarity_backend
+
+        similarity_options = {}
+        if args.similarity_backend == 'lsh':
+            similarity_options = {'n_tables': args.lsh_tables, 'window': args.lsh_window}
+        task_options['Task2']['similarity_backend'] = get_similarity_backend(args.similarity_backend,
+                                                                             **similarity_options)
+    # the task modules are imported just for the selected tasks
+    tasks = [getattr(task_modules, name)(**task_options.get(name, {})) for name in TASK_NAMES if name in args.tasks]
+
+    if args.ingest:
+        # only the new batches are processed, the results are computed from the states of all ingested batches
+        ingestor = Ingestor(tasks)
+        for batch_path in args.ingest:
+            ingestor.ingest(batch_path)
+        ingestor.save_results()
+    elif args.preview is not None or args.preview_error is not None:
+        preview_tasks(tasks, args)
+    else:
+        run_tasks(tasks, args)
+
+    logger.info('All tasks completed successfully!')
+    # the stages of this run - the JSON run report and the metrics for the Prometheus textfile collector
+    metrics.write_report(os.path.join(get_results_directory(), 'run_report.json'))
+    metrics.write_prometheus(os.path.join(get_results_directory(), 'metrics.prom'))
+    if profiler is not None:
+        profiler.stop()
+        profiler.write(os.path.join(get_results_directory(), 'profile.folded'))
+    if args.no_ui or args.preview is not None or args.preview_error is not None:
+        return
+
+    # Start the streamlit app
+    logger.info('Starting streamlit app to visualize results...')
+    subprocess.run([streamlit_exe_filepath, "run", streamlit_filepath_webapp, "--server.port", "8501"], check=True)
+
+
+if __name__ == '__main__':
+    main()
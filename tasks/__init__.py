@@ -1,9 +1,29 @@
-from .task_1 import Task1
-from .task_2 import Task2
-from .task_3 import Task3
-
-__all__ = [
-    "Task1",
-    "Task2",
-    "Task3"
-]
\ No newline at end of file
+import importlib
+
+# the task modules are imported on the first access of their names, so a run of Task3 does not load
+# gensim and scikit-learn needed just by Task2
+_LAZY_IMPORTS = {
+    "Task1": ".task_1",
+    "Task2": ".task_2",
+    "Task3": ".task_3",
+    "Task4": ".task_4",
+    "Task5": ".task_5",
+    "TaskScheduler": ".scheduler",
+    "Ingestor": ".ingestion",
+    "Previewer": ".preview",
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+    # later accesses do not go through __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,90 @@
+from utils.logging_utils import logger
+
+from typing import Any
+import shutil
+import pickle
+import os
+
+
+class ShardCheckpoint:
+    """
+    The partial results of the completed shards of an interrupted task run. Every shard (a range of the preprocessed
+    items, or the chunks of the streamed dataset merged so far) is saved as soon as it is completed, so a run
+    interrupted e.g. by a preempted machine resumes from the last completed shard instead of from the start.
+    The directory is derived from the cache key of the task results, the partial results of other data, parameters
+    or code are never mixed.
+
+    Attributes:
+        directory (str): The directory with the partial results of the shards.
+
+    Methods:
+        load(name: str) -> Any | None:
+            Load the partial result of a completed shard.
+        save(name: str, partial: Any) -> None:
+            Save the partial result of a completed shard.
+        clear() -> None:
+            Remove the partial results after the task is finished.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Initialize the ShardCheckpoint class.
+
+        Args:
+            directory (str): The directory with the partial results of the shards.
+
+        Returns:
+            None
+        """
+        self.directory = directory
+
+    def load(self, name: str) -> Any | None:
+        """
+        Load the partial result of a completed shard.
+
+        Args:
+            name (str): The name of the shard.
+
+        Returns:
+            Any | None: The partial result, None if the shard was not completed.
+        """
+        path = os.path.join(self.directory, f"{name}.pkl")
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except (EOFError, pickle.UnpicklingError) as e:
+            logger.warning(f"Checkpoint {path} can not be loaded, the shard is computed again: {e}")
+            return None
+
+    def save(self, name: str, partial: Any) -> None:
+        """
+        Save the partial result of a completed shard.
+
+        Args:
+            name (str): The name of the shard.
+            partial (Any): The partial result.
+
+        Returns:
+            None
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{name}.pkl")
+        # write into a temporary file first, so an interrupted save never leaves a broken checkpoint
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(partial, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def clear(self) -> None:
+        """
+        Remove the partial results after the task is finished.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,239 @@
+from .task import Task
+from .scheduler import get_task_parameters
+from utils.dataset_utils import load_dataset_to_dataframe
+from utils.logging_utils import logger
+from utils.metrics import metrics
+from utils.text_processing import get_cleaning_rules_fingerprint
+from config import cache_directory
+
+from datetime import datetime, timezone
+import pandas as pd
+import argparse
+import hashlib
+import shutil
+import pickle
+import json
+import os
+
+LEDGER_FILENAME = "ledger.json"
+# file in the state directory naming the directory of the current generation
+CURRENT_GENERATION_FILENAME = "CURRENT"
+# number of bytes of a batch file hashed at once
+HASH_BLOCK_SIZE = 1 << 20
+
+
+class Ingestor:
+    """
+    Incremental ingestion of new batches of posts. Every task keeps a persisted state (Task.update_state) -
+    the word counts of Task1, the embedded words and their nearest neighbours of Task2, the running sums
+    of Task3 - and every new batch is processed just by itself and folded into the states, so the cost
+    of an ingestion grows with the size of the new batch, not with the size of the whole corpus.
+
+    The ingested batches are recorded in a ledger by the content hash of their files, a batch already
+    in the ledger is skipped, so ingesting the same file again does not change the results. The ledger
+    and the states are saved together as a new generation, an interrupted ingestion leaves the previous
+    generation in place.
+
+    Attributes:
+        tasks (dict[str, Task]): The tasks by their names.
+        directory (str): The directory with the generations of the ledger and the states.
+        ledger (dict): The ingested batches and the total number of the ingested rows.
+        states (dict[str, Any]): The states of the tasks by their names.
+
+    Methods:
+        ingest(path: str) -> bool:
+            Ingest a batch of posts, unless it was already ingested.
+        save_results() -> None:
+            Save the results of the tasks computed from their states.
+    """
+
+    def __init__(self, tasks: list[Task], directory: str | None = None):
+        """
+        Initialize the Ingestor class and load the current generation of the states.
+
+        Args:
+            tasks (list[Task]): The tasks updated by the ingested batches.
+            directory (str | None): The directory of the states, derived from the tasks and their parameters
+                in the cache directory if None.
+
+        Returns:
+            None
+        """
+        self.tasks = {task.__class__.__name__: task for task in tasks}
+        self.directory = directory or get_ingestion_directory(tasks)
+        self.ledger = {'rows': 0, 'batches': []}
+        self.states = {name: None for name in self.tasks}
+
+        generation_directory = self._get_current_generation_directory()
+        if generation_directory is not None:
+            with open(os.path.join(generation_directory, LEDGER_FILENAME), encoding='utf-8') as f:
+                self.ledger = json.load(f)
+            for name in self.tasks:
+                with open(os.path.join(generation_directory, f"{name}.pkl"), 'rb') as f:
+                    self.states[name] = pickle.load(f)
+            logger.info(f"Loaded the states of {len(self.ledger['batches'])} ingested batches "
+                        f"from {generation_directory}")
+
+    def ingest(self, path: str) -> bool:
+        """
+        Ingest a batch of posts, unless it was already ingested. The rows of the batch continue
+        the row positions of the previously ingested batches.
+
+        Args:
+            path (str): The path to the csv, csv.gz, parquet or xlsx file with the posts.
+
+        Returns:
+            bool: Whether the batch was ingested, False if it was already in the ledger.
+        """
+        batch_hash = get_file_hash(path)
+        if any(batch['sha256'] == batch_hash for batch in self.ledger['batches']):
+            logger.info(f"Batch {path} was already ingested, skipping it")
+            return False
+
+        # just the columns used by any of the tasks are read
+        columns = list(dict.fromkeys(column for task in self.tasks.values() for column in task.columns))
+        with metrics.stage('ingest.load') as measurement:
+            batch = load_dataset_to_dataframe(path, columns=columns)
+            batch.index = pd.RangeIndex(self.ledger['rows'], self.ledger['rows'] + len(batch))
+            measurement['items'] = len(batch)
+        logger.info(f"Ingesting {len(batch)} posts from {path}")
+
+        states = {}
+        for name, task in self.tasks.items():
+            # the batch is not in the token store of the dataset, the texts are cleaned directly
+            task.token_store = None
+            with metrics.stage(f'{name}.ingest', len(batch)):
+                partial = task.map_shard(task.preprocess_data(batch))
+                states[name] = task.update_state(self.states[name], partial)
+
+        ledger = {
+            'rows': self.ledger['rows'] + len(batch),
+            'batches': self.ledger['batches'] + [{
+                'sha256': batch_hash,
+                'path': os.path.abspath(path),
+                'rows': len(batch),
+                'ingested_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            }],
+        }
+        self._save_generation(ledger, states)
+        self.ledger, self.states = ledger, states
+        return True
+
+    def save_results(self) -> None:
+        """
+        Save the results of the tasks computed from their states.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        for name, task in self.tasks.items():
+            if self.states[name] is None:
+                logger.warning(f"No batch was ingested, there are no results of {name}")
+                continue
+            with metrics.stage(f'{name}.finalize_state'):
+                task.save_results(task.finalize_state(self.states[name]))
+
+    def _get_current_generation_directory(self) -> str | None:
+        """
+        Get the directory of the current generation of the states.
+
+        Args:
+            None
+
+        Returns:
+            str | None: The directory of the current generation, None if nothing was ingested.
+        """
+        current_path = os.path.join(self.directory, CURRENT_GENERATION_FILENAME)
+        if not os.path.exists(current_path):
+            return None
+        with open(current_path, encoding='utf-8') as f:
+            directory = os.path.join(self.directory, f.read().strip())
+        return directory if os.path.exists(os.path.join(directory, LEDGER_FILENAME)) else None
+
+    def _save_generation(self, ledger: dict, states: dict) -> None:
+        """
+        Save the ledger and the states as the current generation and remove the previous generation.
+
+        Args:
+            ledger (dict): The ingested batches and the total number of the ingested rows.
+            states (dict): The states of the tasks by their names.
+
+        Returns:
+            None
+        """
+        previous_directory = self._get_current_generation_directory()
+        generation = f"{len(ledger['batches']):06d}-{ledger['batches'][-1]['sha256'][:16]}"
+        generation_directory = os.path.join(self.directory, generation)
+
+        # write into a temporary directory first, so an interrupted save never leaves a broken generation
+        tmp_directory = f"{generation_directory}.tmp-{os.getpid()}"
+        os.makedirs(tmp_directory, exist_ok=True)
+        for name, state in states.items():
+            with open(os.path.join(tmp_directory, f"{name}.pkl"), 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(os.path.join(tmp_directory, LEDGER_FILENAME), 'w', encoding='utf-8') as f:
+            json.dump(ledger, f, indent=2)
+        shutil.rmtree(generation_directory, ignore_errors=True)
+        os.replace(tmp_directory, generation_directory)
+
+        tmp_current_path = os.path.join(self.directory, f"{CURRENT_GENERATION_FILENAME}.tmp-{os.getpid()}")
+        with open(tmp_current_path, 'w', encoding='utf-8') as f:
+            f.write(generation)
+        os.replace(tmp_current_path, os.path.join(self.directory, CURRENT_GENERATION_FILENAME))
+
+        if previous_directory is not None and previous_directory != generation_directory:
+            shutil.rmtree(previous_directory, ignore_errors=True)
+        logger.info(f"States of {len(ledger['batches'])} ingested batches saved to {generation_directory}")
+
+
+def get_ingestion_directory(tasks: list[Task]) -> str:
+    """
+    Get the directory of the ingestion states of the tasks. The directory changes when the tasks
+    or their parameters change, the states of other parameters are not mixed.
+
+    Args:
+        tasks (list[Task]): The tasks.
+
+    Returns:
+        str: The directory of the ingestion states.
+    """
+    hasher = hashlib.sha256()
+    for task in tasks:
+        hasher.update(task.__class__.__name__.encode('utf-8'))
+        hasher.update(get_task_parameters(task).encode('utf-8'))
+        if task.uses_token_store:
+            # the cleaned words depend on the vocabulary as well
+            hasher.update(get_cleaning_rules_fingerprint().encode('utf-8'))
+    return os.path.join(cache_directory, "ingestion", hasher.hexdigest()[:32])
+
+
+def get_file_hash(path: str) -> str:
+    """
+    Computes a content hash of the file.
+
+    Args:
+        path (str): The path to the file.
+
+    Returns:
+        str: The hex digest of the file content.
+    """
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while block := f.read(HASH_BLOCK_SIZE):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+if __name__ == '__main__':
+    from tasks import Task1, Task2, Task3, Task4, Task5
+
+    parser = argparse.ArgumentParser(description="Ingest new CSV batches of posts and update the task results.")
+    parser.add_argument("paths", nargs='+', help="Paths to the CSV files with the new posts.")
+    args = parser.parse_args()
+    ingestor = Ingestor([Task1(), Task2(), Task3(), Task4(), Task5()])
+    for batch_path in args.paths:
+        ingestor.ingest(batch_path)
+    ingestor.save_results()
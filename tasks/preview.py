@@ -0,0 +1,156 @@
+from .task import Task
+from .task_4 import Task4
+from utils.data_utils import save_results
+from utils.dataset_utils import load_dataset_to_dataframe, load_dataset_rows
+from utils.logging_utils import logger
+from utils.metrics import metrics
+from utils.sampling import StratifiedSample, draw_stratified_sample
+
+from pandas import DataFrame
+import pandas as pd
+import argparse
+
+# the columns the posts are stratified by, the age is stratified by the age bands of Task4
+STRATA_COLUMNS = ['gender', 'age', 'topic']
+# the fraction of the sample is grown at most this many times to reach the error target
+MAX_PREVIEW_ROUNDS = 5
+# the grown fraction is a bit larger than the one predicted from the error, so the target is usually
+# reached in the next round
+FRACTION_MARGIN = 1.2
+
+
+class Previewer:
+    """
+    The preview mode of the tasks. A task runs on a stratified random sample of the posts - stratified by gender,
+    age band and topic - instead of the whole dataset, and estimates its result over all posts with confidence
+    intervals (see Task.preview). With an error target the sample grows until the relative errors
+    of the estimates are within the target, so it is cheap to decide whether a full run is worth it.
+
+    Attributes:
+        path_to_dataset (str): The path to the dataset files.
+        fraction (float): The fraction of the posts of every stratum in the sample.
+        error_target (float | None): The largest relative error of the estimates, the sample of the fraction
+            is used as it is if None.
+        confidence (float): The confidence level of the intervals.
+        seed (int): The seed of the random sample.
+
+    Methods:
+        preview(task: Task) -> DataFrame | None:
+            Compute the preview of the result of a task and save it.
+        draw_sample(data: DataFrame, fraction: float) -> StratifiedSample:
+            Draw a stratified sample of the posts by their strata columns.
+    """
+
+    def __init__(self, path_to_dataset: str, fraction: float = 0.01, error_target: float | None = None,
+                 confidence: float = 0.95, seed: int = 0):
+        """
+        Initialize the Previewer class.
+
+        Args:
+            path_to_dataset (str): The path to the dataset files.
+            fraction (float): The fraction of the posts of every stratum in the sample, the initial fraction
+                if there is an error target.
+            error_target (float | None): The largest relative error of the estimates, e.g. 0.01 for 1%. The sample
+                grows until the relative errors of all estimates are within the target. The sample of the fraction
+                is used as it is if None.
+            confidence (float): The confidence level of the intervals.
+            seed (int): The seed of the random sample, the samples of the same seed are nested.
+
+        Returns:
+            None
+        """
+        if not 0 < fraction <= 1:
+            raise ValueError(f"The sample fraction has to be in (0, 1], got {fraction}.")
+        self.path_to_dataset = path_to_dataset
+        self.fraction = fraction
+        self.error_target = error_target
+        self.confidence = confidence
+        self.seed = seed
+
+    def preview(self, task: Task) -> DataFrame | None:
+        """
+        Compute the preview of the result of a task from a stratified sample of the posts and save it
+        as the result {task name}_preview. The full result of the task is not changed. The tasks which can not
+        estimate their results from a sample (see Task.estimates_preview) are skipped.
+
+        Args:
+            task (Task): The task.
+
+        Returns:
+            DataFrame | None: The preview of the result, None if the task was skipped.
+        """
+        name = task.__class__.__name__
+        if not task.estimates_preview:
+            logger.warning(f"{name} can not estimate its result from a sample, it is not previewed")
+            return None
+        # the preview always cleans the sampled texts, it does not need the token store or checkpoints
+        task.token_store = None
+        task.checkpoint = None
+        # the texts are loaded just for the sampled posts, the posts are sampled from the strata columns
+        with metrics.stage(f'{name}.preview_load') as measurement:
+            strata = load_dataset_to_dataframe(self.path_to_dataset, columns=STRATA_COLUMNS, filters=task.filters)
+            measurement['items'] = len(strata)
+
+        fraction = self.fraction
+        for round_number in range(1, MAX_PREVIEW_ROUNDS + 1):
+            sample = self.draw_sample(strata, fraction)
+            logger.info(f"Previewing {name} on a sample of {len(sample)} of {len(strata)} posts "
+                        f"({fraction:.2%} of every stratum)")
+            with metrics.stage(f'{name}.preview_load_sample', len(sample)):
+                data = load_dataset_rows(self.path_to_dataset, strata.index[sample.positions], columns=task.columns)
+            with metrics.stage(f'{name}.preview', len(sample)):
+                result = task.preview(data, sample, self.confidence)
+            if self.error_target is None or fraction >= 1:
+                break
+            error = result['relative_error'].max()
+            if not error > self.error_target:
+                break
+            if round_number < MAX_PREVIEW_ROUNDS:
+                # the standard errors shrink with the square root of the sample size
+                fraction = min(1.0, fraction * (error / self.error_target) ** 2 * FRACTION_MARGIN)
+                logger.info(f"The relative error {error:.2%} is above the target {self.error_target:.2%}, "
+                            f"growing the sample to {fraction:.2%}")
+            else:
+                logger.warning(f"The relative error {error:.2%} is still above the target {self.error_target:.2%} "
+                               f"after {MAX_PREVIEW_ROUNDS} rounds")
+
+        save_results(f"{name}_preview", result)
+        logger.info(f"Preview of {name} at {self.confidence:.0%} confidence:\n"
+                    f"{result.to_string(index=False, max_rows=20)}")
+        return result
+
+    def draw_sample(self, data: DataFrame, fraction: float) -> StratifiedSample:
+        """
+        Draw a stratified sample of the posts, the strata are the combinations of gender, age band
+        and topic. The posts with missing values form strata of their own.
+
+        Args:
+            data (DataFrame): The strata columns of the posts.
+            fraction (float): The fraction of the posts of every stratum in the sample.
+
+        Returns:
+            StratifiedSample: The sample, its positions are the positions of the rows of the data.
+        """
+        age_bands = pd.cut(data['age'], bins=Task4.age_bins, labels=Task4.age_labels, right=False)
+        strata = data[['gender', 'topic']].assign(age_band=age_bands) \
+            .groupby(['gender', 'age_band', 'topic'], observed=True, dropna=False).ngroup()
+        return draw_stratified_sample(strata.to_numpy(), fraction, self.seed)
+
+
+if __name__ == '__main__':
+    from tasks import Task1, Task2, Task3, Task4, Task5
+
+    parser = argparse.ArgumentParser(description="Preview the task results on a stratified sample of the posts.")
+    parser.add_argument("path", help="Path to the dataset file or to the directory with the dataset files.")
+    parser.add_argument("--tasks", nargs='+', choices=['Task1', 'Task2', 'Task3', 'Task4', 'Task5'],
+                        default=['Task1', 'Task3'],
+                        help="Tasks to preview (default: Task1 and Task3).")
+    parser.add_argument("--fraction", type=float, default=0.01, help="Sampled fraction of every stratum.")
+    parser.add_argument("--error", type=float, default=None,
+                        help="Largest relative error of the estimates, the sample grows until it is reached.")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Confidence level of the intervals.")
+    args = parser.parse_args()
+    previewer = Previewer(args.path, fraction=args.fraction, error_target=args.error, confidence=args.confidence)
+    task_classes = {'Task1': Task1, 'Task2': Task2, 'Task3': Task3, 'Task4': Task4, 'Task5': Task5}
+    for task_name in args.tasks:
+        previewer.preview(task_classes[task_name]())
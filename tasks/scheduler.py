@@ -0,0 +1,380 @@
+from .task import Task
+from .checkpoint import ShardCheckpoint
+from utils.data_utils import get_results_directory, get_results_filename
+from utils.dataset_utils import load_dataset_to_dataframe, iter_dataset_chunks, iter_dataset_texts
+from utils.text_processing import get_cleaning_rules_fingerprint
+from utils.token_store import TokenStore, load_or_build_token_store
+from utils.word_count_index import load_or_build_word_count_index
+from utils.logging_utils import logger
+from utils.metrics import metrics
+from config import cache_directory, project_directory
+
+from concurrent.futures import ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
+import importlib.util
+import hashlib
+import ast
+import shutil
+import json
+import os
+
+
+class TaskScheduler:
+    """
+    Runs the tasks as a DAG. A task runs when all tasks it depends on (Task.depends_on) are finished,
+    independent tasks run concurrently in separate processes. The inputs shared by the tasks are not tasks
+    of the DAG - the token store is built before the tasks using it start and the word count index is
+    loaded by the task answered from it, both are keyed by the dataset and cached across runs. The results
+    of every task are cached under a key derived from the dataset, the task parameters and the task code,
+    a task with a cached result is not run again and its results are restored from the cache. The completed
+    shards of a running task are checkpointed under the same key, a task interrupted before it finished
+    resumes from its last completed shard in the next run.
+
+    Attributes:
+        path_to_dataset (str): The path to the dataset files.
+        dataset_fingerprint (str): The content hash of the dataset.
+        workers (int): The number of worker processes used by every task.
+        chunksize (int | None): The number of rows in one chunk if the dataset is streamed.
+        concurrency (int): The maximal number of tasks running at once.
+        checkpoints (bool): Whether the completed shards of the tasks are checkpointed.
+        tasks (dict[str, Task]): The tasks by their names.
+
+    Methods:
+        add(task: Task) -> None:
+            Add the task to the DAG.
+        get_task_key(task: Task) -> str:
+            Get the cache key of the results of the task.
+        run() -> None:
+            Run all tasks whose results are not cached.
+    """
+
+    def __init__(self, path_to_dataset: str, dataset_fingerprint: str, workers: int = 1,
+                 chunksize: int | None = None, concurrency: int = 1, checkpoints: bool = True):
+        """
+        Initialize the TaskScheduler class.
+
+        Args:
+            path_to_dataset (str): The path to the dataset files.
+            dataset_fingerprint (str): The content hash of the dataset.
+            workers (int): The number of worker processes used by every task.
+            chunksize (int | None): The number of rows in one chunk if the dataset is streamed.
+            concurrency (int): The maximal number of tasks running at once.
+            checkpoints (bool): Whether the completed shards of the tasks are checkpointed.
+
+        Returns:
+            None
+        """
+        self.path_to_dataset = path_to_dataset
+        self.dataset_fingerprint = dataset_fingerprint
+        self.workers = workers
+        self.chunksize = chunksize
+        self.concurrency = concurrency
+        self.checkpoints = checkpoints
+        self.tasks = {}
+
+    def add(self, task: Task) -> None:
+        """
+        Add the task to the DAG. The tasks it depends on have to be added before it.
+
+        Args:
+            task (Task): The task.
+
+        Returns:
+            None
+        """
+        name = task.__class__.__name__
+        missing = [dependency for dependency in task.depends_on if dependency not in self.tasks]
+        if missing:
+            raise ValueError(f"{name} depends on {missing}, which are not added to the scheduler.")
+        self.tasks[name] = task
+
+    def get_task_key(self, task: Task) -> str:
+        """
+        Get the cache key of the results of the task. The key changes when the dataset, the parameters
+        or the code of the task or of any task it depends on changes.
+
+        Args:
+            task (Task): The task.
+
+        Returns:
+            str: The cache key.
+        """
+        hasher = hashlib.sha256()
+        hasher.update(self.dataset_fingerprint.encode('utf-8'))
+        hasher.update(get_task_parameters(task).encode('utf-8'))
+        hasher.update(get_code_fingerprint(task.__class__).encode('utf-8'))
+        if task.uses_token_store:
+            # the cleaned words depend on the vocabulary as well
+            hasher.update(get_cleaning_rules_fingerprint().encode('utf-8'))
+        for dependency in task.depends_on:
+            hasher.update(self.get_task_key(self.tasks[dependency]).encode('utf-8'))
+        return hasher.hexdigest()[:32]
+
+    def run(self) -> None:
+        """
+        Run all tasks whose results are not cached, every task as soon as the tasks it depends on are finished.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        keys = {name: self.get_task_key(task) for name, task in self.tasks.items()}
+        pending = {}
+        for name, task in self.tasks.items():
+            if restore_cached_results(task, keys[name]):
+                logger.info(f'Results of {name} restored from the cache')
+            else:
+                pending[name] = task
+        if not pending:
+            logger.info('All task results are cached')
+            return
+
+        token_store = None
+        if any(task.uses_token_store for task in pending.values()):
+            token_store = self._load_token_store()
+            # the normalized forms are saved in the store before the tasks start, so the task processes load them
+            for normalizer in {task.normalizer for task in pending.values() if task.uses_token_store} - {None}:
+                token_store.get_normalizer(normalizer)
+
+        finished = set(self.tasks) - set(pending)
+        running: dict[Future, str] = {}
+        with ProcessPoolExecutor(max_workers=max(1, min(self.concurrency, len(pending)))) as executor:
+            while pending or running:
+                ready = [name for name, task in pending.items() if set(task.depends_on) <= finished]
+                for name in ready[:max(0, self.concurrency - len(running))]:
+                    logger.info(f'Starting task: {name} ...')
+                    checkpoint = self._get_checkpoint(name, keys[name])
+                    running[executor.submit(run_task, pending.pop(name), self.path_to_dataset, token_store,
+                                            self.workers, self.chunksize, checkpoint)] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    # raise the exception of the failed task, the stages measured in the task process are kept
+                    metrics.merge(future.result())
+                    store_results(self.tasks[name], keys[name])
+                    if self.checkpoints:
+                        # the results are cached, the partial results of the shards are not needed any more
+                        self._get_checkpoint(name, keys[name]).clear()
+                    finished.add(name)
+                    logger.info(f'Finished task: {name} ...')
+
+    def _get_checkpoint(self, name: str, key: str) -> ShardCheckpoint | None:
+        """
+        Get the checkpoint of the completed shards of the task.
+
+        Args:
+            name (str): The name of the task.
+            key (str): The cache key of the results of the task.
+
+        Returns:
+            ShardCheckpoint | None: The checkpoint, None if the shards are not checkpointed.
+        """
+        if not self.checkpoints:
+            return None
+        # the streamed chunks are checkpointed by their number, which depends on the chunk size
+        layout = 'loaded' if self.chunksize is None else f'chunks-{self.chunksize}'
+        return ShardCheckpoint(os.path.join(cache_directory, "checkpoints", name, f"{key}-{layout}"))
+
+    def _load_token_store(self) -> TokenStore:
+        """
+        Load the tokenized dataset shared by the tasks working with cleaned words.
+
+        Args:
+            None
+
+        Returns:
+            TokenStore: The token store of the dataset.
+        """
+        # tokenize the dataset once, the tokenized corpus is shared by all tasks and reused across runs
+        logger.info('Loading the tokenized dataset...')
+        if self.chunksize is None:
+            texts = iter_dataset_texts(self.path_to_dataset)
+        else:
+            texts = (text for chunk in iter_dataset_chunks(self.path_to_dataset, self.chunksize, ['text'])
+                     for text in chunk['text'])
+        with metrics.stage('load_token_store'):
+            return load_or_build_token_store(texts, self.dataset_fingerprint)
+
+
+def run_task(task: Task, path_to_dataset: str, token_store: TokenStore | None, workers: int,
+             chunksize: int | None, checkpoint: ShardCheckpoint | None = None) -> dict[str, dict]:
+    """
+    Load the data of the task and run it, or answer it from the word count index of the dataset. The function runs
+    in a separate process, the stages measured there are returned to the scheduler.
+
+    Args:
+        task (Task): The task.
+        path_to_dataset (str): The path to the dataset files.
+        token_store (TokenStore | None): The tokenized dataset.
+        workers (int): The number of worker processes used by the task.
+        chunksize (int | None): The number of rows in one chunk if the dataset is streamed.
+        checkpoint (ShardCheckpoint | None): The partial results of the shards completed by an interrupted run.
+
+    Returns:
+        dict[str, dict]: The metrics of the stages of the task.
+    """
+    # the process can be forked from the scheduler, just the stages of this task are returned
+    metrics.reset()
+    if task.uses_word_count_index:
+        # the slice is a sum of the selected rows of the index, the texts are not loaded or cleaned again
+        with metrics.stage(f'{task.__class__.__name__}.load_index'):
+            index = load_or_build_word_count_index(path_to_dataset, token_store=token_store)
+        task.run_index(index)
+        return metrics.records
+    if chunksize is None:
+        logger.info('Loading the dataset into a DataFrame...')
+        # every task loads just the columns and rows it needs
+        with metrics.stage(f'{task.__class__.__name__}.load') as measurement:
+            data = load_dataset_to_dataframe(path_to_dataset, columns=task.columns, filters=task.filters)
+            measurement['items'] = len(data)
+    else:
+        # in the streaming mode every task reads just the columns it needs chunk by chunk
+        data = iter_dataset_chunks(path_to_dataset, chunksize, task.columns)
+    task.run(data, token_store=token_store, workers=workers, checkpoint=checkpoint)
+    return metrics.records
+
+
+def get_task_parameters(task: Task) -> str:
+    """
+    Get the parameters of the task - the public class attributes and the attributes of the instance
+    configuring it, serialized in a stable way.
+
+    Args:
+        task (Task): The task.
+
+    Returns:
+        str: The serialized parameters.
+    """
+    parameters = {}
+    for cls in reversed(task.__class__.__mro__):
+        parameters.update({name: value for name, value in vars(cls).items()
+                           if not name.startswith('_') and not callable(value) and not isinstance(value, property)
+                           and not isinstance(value, (staticmethod, classmethod))})
+    parameters.update({name: value for name, value in vars(task).items()
+                       if name not in ('task_method', 'token_store', 'checkpoint') and not name.startswith('_')})
+    return json.dumps(parameters, sort_keys=True, default=_serialize_parameter)
+
+
+def _serialize_parameter(value) -> dict | str:
+    # objects configuring the task (e.g. the similarity backend) are identified by their class and attributes
+    if hasattr(value, '__dict__'):
+        return {'class': f"{value.__class__.__module__}.{value.__class__.__qualname__}", **vars(value)}
+    return repr(value)
+
+
+def get_code_fingerprint(cls: type) -> str:
+    """
+    Computes a hash of the source code of the task - the modules of the task class and its base classes
+    and all project modules they import, directly or indirectly.
+
+    Args:
+        cls (type): The task class.
+
+    Returns:
+        str: The hex digest of the source code.
+    """
+    modules = {}
+    stack = [base.__module__ for base in cls.__mro__ if base is not object]
+    while stack:
+        name = stack.pop()
+        try:
+            # finding a submodule imports its parent packages, the third-party packages are skipped before
+            # (e.g. nltk.stem imported inside a function would import nltk and scikit-learn)
+            spec = None
+            if name not in modules and _is_project_module(name.partition('.')[0]):
+                spec = importlib.util.find_spec(name)
+        except (ImportError, AttributeError, ValueError):
+            # the name is not a module (e.g. a class imported from a module)
+            spec = None
+        # the built-in and frozen modules have no source file, their origin is not a path (e.g. 'built-in')
+        if spec is None or not spec.has_location or not _is_project_file(spec.origin):
+            continue
+        modules[name] = spec.origin
+        with open(spec.origin, 'rb') as f:
+            tree = ast.parse(f.read())
+        package = name if spec.submodule_search_locations else name.rpartition('.')[0]
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                stack.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom):
+                imported = importlib.util.resolve_name('.' * node.level + (node.module or ''), package)
+                stack.append(imported)
+                # the imported names can be submodules of the package
+                stack.extend(f"{imported}.{alias.name}" for alias in node.names)
+
+    hasher = hashlib.sha256()
+    for name in sorted(modules):
+        hasher.update(name.encode('utf-8'))
+        with open(modules[name], 'rb') as f:
+            hasher.update(f.read())
+    return hasher.hexdigest()
+
+
+def _is_project_module(name: str) -> bool:
+    # finding a top-level module does not import it
+    spec = importlib.util.find_spec(name)
+    return spec is not None and (spec.has_location and _is_project_file(spec.origin)
+                                 or any(_is_project_file(path) for path in spec.submodule_search_locations or []))
+
+
+def _is_project_file(path: str) -> bool:
+    path = os.path.abspath(path)
+    return path.startswith(project_directory + os.sep) and os.sep + 'site-packages' + os.sep not in path
+
+
+def get_results_cache_directory(task: Task, key: str) -> str:
+    """
+    Get the cache directory of the results of the task.
+
+    Args:
+        task (Task): The task.
+        key (str): The cache key of the results.
+
+    Returns:
+        str: The directory with the cached results.
+    """
+    return os.path.join(cache_directory, "results", task.__class__.__name__, key)
+
+
+def store_results(task: Task, key: str) -> None:
+    """
+    Copy the results of the finished task to the cache.
+
+    Args:
+        task (Task): The task.
+        key (str): The cache key of the results.
+
+    Returns:
+        None
+    """
+    directory = get_results_cache_directory(task, key)
+    # write into a temporary directory first, so an interrupted copy never leaves incomplete results
+    tmp_directory = f"{directory}.tmp-{os.getpid()}"
+    os.makedirs(tmp_directory, exist_ok=True)
+    for name in task.output_names:
+        shutil.copy2(os.path.join(get_results_directory(), get_results_filename(name, task.results_format)),
+                     tmp_directory)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_directory, directory)
+
+
+def restore_cached_results(task: Task, key: str) -> bool:
+    """
+    Copy the cached results of the task to the results directory.
+
+    Args:
+        task (Task): The task.
+        key (str): The cache key of the results.
+
+    Returns:
+        bool: Whether the results were cached.
+    """
+    directory = get_results_cache_directory(task, key)
+    files = [get_results_filename(name, task.results_format) for name in task.output_names]
+    if not all(os.path.exists(os.path.join(directory, file)) for file in files):
+        return False
+    os.makedirs(get_results_directory(), exist_ok=True)
+    for file in files:
+        shutil.copy2(os.path.join(directory, file), os.path.join(get_results_directory(), file))
+    return True
@@ -1,62 +1,581 @@
-from utils.data_utils import save_results
-from pandas import DataFrame
-
-
-class Task:
-    """
-    This class is a base class for all tasks in the project. It provides a structure for preprocessing data,
-    running the task, and preparing the output format.
-
-    Attributes:
-        task_method (callable): The method to be used for processing the data.
-
-    Methods:
-        preprocess_data(data: DataFrame) -> DataFrame:
-            Preprocess the data for the task. This method should be overridden in subclasses.
-        run(data: DataFrame) -> None:
-            Run the task method on the preprocessed data. This method should be overridden in subclasses.
-    """
-
-    def __init__(self):
-        """
-        Initialize the Task class.
-
-        Args:
-            None
-
-        Returns:
-            None
-        """
-        self.task_method = None
-
-    def preprocess_data(self, data: DataFrame) -> list[str]:
-        """
-        Preprocess the data for the task. This method should be overridden in subclasses.
-
-        Args:
-            data (DataFrame): The input data.
-
-        Returns:
-            list[str]: A list of texts.
-        """
-        pass
-
-    def run(self, data: DataFrame) -> None:
-        """
-        Run the task method on the preprocessed data. Each task should implement its own run method.
-
-        Args:
-            data (DataFrame): The input data.
-
-        Returns:
-            str: The result of the task method.
-        """
-        # Preprocess the data
-        preprocessed_data = self.preprocess_data(data)
-        # Run the task method
-        result = self.task_method(preprocessed_data)
-
-        # Save the result
-        save_results(self.__class__.__name__, result)
-
-
+from utils.data_utils import save_results, iter_batches
+from utils.logging_utils import logger
+from utils.metrics import metrics
+from utils.text_processing import get_cleaned_token_ids_from_texts, get_english_vocabulary_mask, \
+    get_english_words_array
+from utils.token_store import TokenStore
+from utils.normalization import TokenNormalizer, get_english_token_normalizer
+from utils.sampling import StratifiedSample
+from utils.word_count_index import WordCountIndex
+from .checkpoint import ShardCheckpoint
+from concurrent.futures import ProcessPoolExecutor, Future
+from collections import deque
+from functools import reduce
+from itertools import islice
+from pandas import DataFrame
+from typing import Any, Iterable, Iterator
+from tqdm import tqdm
+import numpy as np
+
+
+class Task:
+    """
+    This class is a base class for all tasks in the project. It provides a structure for preprocessing data,
+    running the task, and preparing the output format.
+
+    Attributes:
+        task_method (callable): The method to be used for processing the data.
+        uses_token_store (bool): Whether the task works with cleaned words and can read them from a token store.
+        token_store (TokenStore | None): The tokenized corpus attached for the current run.
+        checkpoint (ShardCheckpoint | None): The partial results of the completed shards attached for the current
+            run, the run is not checkpointed if None.
+        columns (list[str]): The dataset columns used by the task, only these are loaded.
+        filters (list[tuple]): The row filters applied while loading the data for the task.
+        word_filter (dict): The predicates of the cleaned words used by the task, see get_vocabulary_mask.
+        normalizer (str | None): The normalizer folding the inflected forms of the cleaned words (see NORMALIZERS),
+            the words are not normalized if None.
+        cleaning_batch_size (int): The number of posts cleaned in one batch.
+        checkpoint_shard_size (int): The number of posts in one checkpointed shard of a serial run.
+        depends_on (list[str]): The names of the tasks whose results have to be finished before this task runs.
+            The artifacts derived from the dataset are declared by uses_token_store and uses_word_count_index
+            instead, the scheduler prepares them for the tasks. None of the tasks of the project reads the results
+            of another task, so they are all independent.
+        results_format (str): The file format of the results saved by the task, 'csv' or 'parquet'.
+        uses_word_count_index (bool): Whether the task is answered from the word count index of the dataset
+            instead of the texts, see query_index.
+        estimates_preview (bool): Whether the task estimates its result over all posts from a sample of them,
+            see preview.
+        output_names (list[str]): The names of the results saved by the task.
+
+    Methods:
+        preprocess_data(data: DataFrame) -> DataFrame:
+            Preprocess the data for the task. This method should be overridden in subclasses.
+        get_token_normalizer() -> TokenNormalizer | None:
+            Get the normalizer of the token IDs of the cleaned words.
+        get_cleaned_words_vocabulary() -> np.ndarray:
+            Get the vocabulary indexed by the token IDs of the cleaned words.
+        get_cleaned_words_mask() -> np.ndarray:
+            Get the mask of the token IDs of the words kept by the word filter.
+        iter_cleaned_token_id_batches(items: Iterable) -> Iterator[np.ndarray]:
+            Iterate over the token IDs of the cleaned words of batches of the preprocessed posts.
+        iter_cleaned_post_token_id_batches(items: Iterable) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+            Iterate over the token IDs of batches of the preprocessed posts with the number of tokens of every post.
+        iter_cleaned_word_batches(items: Iterable) -> Iterator[np.ndarray]:
+            Iterate over the cleaned words of batches of the preprocessed posts.
+        map_shard(items: list) -> Any:
+            Compute the partial result of one shard of the preprocessed data.
+        merge(left: Any, right: Any) -> Any:
+            Merge two partial results. The merge has to be associative.
+        finalize(partial: Any) -> DataFrame:
+            Compute the final result from the merged partial result.
+        update_state(state: Any | None, partial: Any) -> Any:
+            Update the persisted state of the incremental ingestion with the partial result of a new batch.
+        finalize_state(state: Any) -> DataFrame:
+            Compute the final result from the persisted state of the incremental ingestion.
+        preview(data: DataFrame, sample: StratifiedSample, confidence: float) -> DataFrame:
+            Compute the preview of the result from a stratified sample of the posts.
+        query_index(index: WordCountIndex) -> DataFrame:
+            Compute the result from the word count index of the dataset.
+        run_index(index: WordCountIndex) -> None:
+            Compute the result from the word count index of the dataset and save it.
+        save_results(result: DataFrame | dict[str, DataFrame]) -> None:
+            Save the results of the task under their output names.
+        run_parallel(items: list, workers: int) -> DataFrame:
+            Run the task method on shards of the preprocessed data in a process pool.
+        run_checkpointed(items: list) -> DataFrame:
+            Run the task method serially on shards of the preprocessed data, checkpointing every shard.
+        run_streaming(chunks: Iterable[DataFrame], workers: int) -> DataFrame:
+            Run the task method on the dataset streamed in chunks.
+        run(data: DataFrame | Iterable[DataFrame], token_store: TokenStore | None = None, workers: int = 1,
+            checkpoint: ShardCheckpoint | None = None) -> None:
+            Run the task method on the preprocessed data. This method should be overridden in subclasses.
+    """
+    uses_token_store = False
+    columns = ['text']
+    filters = []
+    word_filter = {}
+    normalizer = None
+    cleaning_batch_size = 10_000
+    checkpoint_shard_size = 20_000
+    depends_on = []
+    results_format = 'csv'
+    uses_word_count_index = False
+    estimates_preview = False
+
+    def __init__(self):
+        """
+        Initialize the Task class.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self.task_method = None
+        self.token_store = None
+        self.checkpoint = None
+
+    @property
+    def output_names(self) -> list[str]:
+        return [self.__class__.__name__]
+
+    def preprocess_data(self, data: DataFrame) -> list[str]:
+        """
+        Preprocess the data for the task. This method should be overridden in subclasses.
+
+        Args:
+            data (DataFrame): The input data.
+
+        Returns:
+            list[str]: A list of texts.
+        """
+        pass
+
+    def get_token_normalizer(self) -> TokenNormalizer | None:
+        """
+        Get the normalizer of the token IDs of the cleaned words - of the vocabulary of the token store
+        if it is attached, of the English vocabulary otherwise.
+
+        Args:
+            None
+
+        Returns:
+            TokenNormalizer | None: The normalizer, None if the words are not normalized.
+        """
+        if self.normalizer is None:
+            return None
+        if self.token_store is not None:
+            return self.token_store.get_normalizer(self.normalizer)
+        return get_english_token_normalizer(self.normalizer)
+
+    def get_cleaned_words_vocabulary(self) -> np.ndarray:
+        """
+        Get the vocabulary indexed by the token IDs of the cleaned words - the normalized forms if the words
+        are normalized, the vocabulary of the token store if it is attached, the English vocabulary otherwise.
+
+        Args:
+            None
+
+        Returns:
+            np.ndarray: Words indexed by their token ID.
+        """
+        token_normalizer = self.get_token_normalizer()
+        if token_normalizer is not None:
+            return token_normalizer.vocabulary
+        if self.token_store is not None:
+            return self.token_store.vocabulary
+        return get_english_words_array()
+
+    def get_cleaned_words_mask(self) -> np.ndarray:
+        """
+        Get the mask of the token IDs of the cleaned words (before the normalization) kept by the word filter
+        of the task. If the words are normalized, the predicates are evaluated on the normalized forms.
+
+        Args:
+            None
+
+        Returns:
+            np.ndarray: Boolean mask over the vocabulary of the token store or the English vocabulary.
+        """
+        token_normalizer = self.get_token_normalizer()
+        if token_normalizer is not None:
+            return token_normalizer.get_vocabulary_mask(**self.word_filter)
+        if self.token_store is not None:
+            return self.token_store.get_vocabulary_mask(**self.word_filter)
+        return get_english_vocabulary_mask(**self.word_filter)
+
+    def iter_cleaned_token_id_batches(self, items: Iterable) -> Iterator[np.ndarray]:
+        """
+        Iterate over the token IDs of the cleaned words of batches of the preprocessed posts, only the words
+        satisfying the word filter of the task are kept. If a token store is attached, the items are positions
+        of the posts in the dataset and the token IDs are read from the store, otherwise the items are texts
+        and they are cleaned batch by batch. The IDs are normalized if the task has a normalizer, they index
+        get_cleaned_words_vocabulary().
+
+        Args:
+            items (Iterable): The post positions or the texts.
+
+        Returns:
+            Iterator[np.ndarray]: The token IDs of the cleaned words of the posts of each batch, in the order
+                of the posts.
+        """
+        vocabulary_mask = self.get_cleaned_words_mask()
+        token_normalizer = self.get_token_normalizer()
+        for batch in iter_batches(items, self.cleaning_batch_size):
+            with metrics.stage('clean', len(batch)):
+                if self.token_store is not None:
+                    token_ids = self.token_store.get_token_ids_of_posts(batch)
+                    token_ids = token_ids[vocabulary_mask[token_ids]]
+                else:
+                    token_ids, _ = get_cleaned_token_ids_from_texts(batch, vocabulary_mask)
+            if token_normalizer is not None:
+                with metrics.stage('normalize', len(token_ids)):
+                    token_ids = token_normalizer.normalize_token_ids(token_ids)
+            yield token_ids
+
+    def iter_cleaned_post_token_id_batches(self, items: Iterable) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+        """
+        Iterate over the token IDs of the cleaned words of batches of the preprocessed posts with the number
+        of the kept tokens of every post, see iter_cleaned_token_id_batches.
+
+        Args:
+            items (Iterable): The post positions or the texts.
+
+        Returns:
+            Iterator[tuple[np.ndarray, np.ndarray]]: The token IDs of the cleaned words of the posts of each batch,
+                in the order of the posts, and the number of the token IDs of every post.
+        """
+        vocabulary_mask = self.get_cleaned_words_mask()
+        token_normalizer = self.get_token_normalizer()
+        for batch in iter_batches(items, self.cleaning_batch_size):
+            with metrics.stage('clean', len(batch)):
+                if self.token_store is not None:
+                    token_ids = self.token_store.get_token_ids_of_posts(batch)
+                    positions = np.asarray(batch, dtype=np.int64)
+                    ends = np.cumsum(self.token_store.offsets[positions + 1] - self.token_store.offsets[positions])
+                    # the tokens kept before the end of every post
+                    kept_before = np.concatenate([[0], np.cumsum(vocabulary_mask[token_ids])])[ends]
+                    lengths = np.diff(kept_before, prepend=0)
+                    token_ids = token_ids[vocabulary_mask[token_ids]]
+                else:
+                    token_ids, offsets = get_cleaned_token_ids_from_texts(batch, vocabulary_mask)
+                    lengths = np.diff(offsets)
+            if token_normalizer is not None:
+                with metrics.stage('normalize', len(token_ids)):
+                    token_ids = token_normalizer.normalize_token_ids(token_ids)
+            yield token_ids, lengths
+
+    def iter_cleaned_word_batches(self, items: Iterable) -> Iterator[np.ndarray]:
+        """
+        Iterate over the cleaned words of batches of the preprocessed posts, see iter_cleaned_token_id_batches.
+
+        Args:
+            items (Iterable): The post positions or the texts.
+
+        Returns:
+            Iterator[np.ndarray]: The cleaned words of the posts of each batch, in the order of the posts.
+        """
+        vocabulary = self.get_cleaned_words_vocabulary()
+        for token_ids in self.iter_cleaned_token_id_batches(items):
+            yield vocabulary[token_ids]
+
+    def select_posts(self, data: DataFrame) -> list:
+        """
+        Convert the selected rows to the items processed by the task method - positions of the posts
+        in the dataset if a token store is attached, texts otherwise.
+
+        Args:
+            data (DataFrame): The selected rows of the dataset.
+
+        Returns:
+            list: The post positions or the texts.
+        """
+        if self.token_store is not None:
+            # the dataset index holds the row positions the token store was built with
+            return data.index.tolist()
+        return data['text'].tolist()
+
+    def map_shard(self, items: list) -> Any:
+        """
+        Compute the partial result of one shard of the preprocessed data. This method should be overridden
+        in subclasses.
+
+        Args:
+            items (list): The shard of the preprocessed data.
+
+        Returns:
+            Any: The partial result of the shard.
+        """
+        raise NotImplementedError(f"{self.__class__.__name__} does not support the map/reduce execution")
+
+    def merge(self, left: Any, right: Any) -> Any:
+        """
+        Merge two partial results. The merge has to be associative, the left partial result always
+        belongs to the shards preceding the right one. This method should be overridden in subclasses.
+
+        Args:
+            left (Any): The partial result of the preceding shards.
+            right (Any): The partial result of the following shards.
+
+        Returns:
+            Any: The merged partial result.
+        """
+        raise NotImplementedError(f"{self.__class__.__name__} does not support the map/reduce execution")
+
+    def finalize(self, partial: Any) -> DataFrame:
+        """
+        Compute the final result from the merged partial result. This method should be overridden in subclasses.
+
+        Args:
+            partial (Any): The partial result of all shards.
+
+        Returns:
+            DataFrame: The result of the task.
+        """
+        raise NotImplementedError(f"{self.__class__.__name__} does not support the map/reduce execution")
+
+    def update_state(self, state: Any | None, partial: Any) -> Any:
+        """
+        Update the persisted state of the incremental ingestion with the partial result of a new batch of posts.
+        By default the state is the merged partial result of all ingested batches, subclasses can keep
+        more in the state (e.g. intermediate results of finalize) to update it incrementally.
+
+        Args:
+            state (Any | None): The state of the previously ingested batches, None for the first batch.
+            partial (Any): The partial result of the new batch.
+
+        Returns:
+            Any: The updated state.
+        """
+        return partial if state is None else self.merge(state, partial)
+
+    def finalize_state(self, state: Any) -> DataFrame:
+        """
+        Compute the final result from the persisted state of the incremental ingestion.
+
+        Args:
+            state (Any): The state of all ingested batches.
+
+        Returns:
+            DataFrame: The result of the task.
+        """
+        return self.finalize(state)
+
+    def preview(self, data: DataFrame, sample: StratifiedSample, confidence: float) -> DataFrame:
+        """
+        Compute the preview of the result from a stratified sample of the posts. The tasks with estimates_preview
+        estimate their results over all posts with the weights of the sample and report the confidence intervals
+        of the estimates in the columns ci_low and ci_high and their relative errors in the column relative_error.
+        The results of the other tasks, e.g. the profiles of the authors, can not be estimated from a sample.
+
+        Args:
+            data (DataFrame): The sampled posts, loaded with the columns and the filters of the task.
+            sample (StratifiedSample): The sample, its strata are in the order of the rows of the data.
+            confidence (float): The confidence level of the intervals.
+
+        Returns:
+            DataFrame: The preview of the result.
+        """
+        raise NotImplementedError(f"{self.__class__.__name__} can not estimate its result from a sample.")
+
+    def query_index(self, index: WordCountIndex) -> DataFrame:
+        """
+        Compute the result from the word count index of the dataset instead of the texts. Only the tasks counting
+        the cleaned words of the selected posts can be answered from the index.
+
+        Args:
+            index (WordCountIndex): The word count index of the dataset.
+
+        Returns:
+            DataFrame: The result of the task.
+        """
+        raise NotImplementedError(f"{self.__class__.__name__} can not be answered from the word count index.")
+
+    def save_results(self, result: DataFrame | dict[str, DataFrame]) -> None:
+        """
+        Save the results of the task under their output names. A task with more results (see output_names)
+        returns them from finalize as a dict by their names, a task with a single result returns just the result.
+
+        Args:
+            result (DataFrame | dict[str, DataFrame]): The result of the task, or its results by their names.
+
+        Returns:
+            None
+        """
+        results = result if isinstance(result, dict) else {self.__class__.__name__: result}
+        for name in self.output_names:
+            save_results(name, results[name], self.results_format)
+
+    def run_index(self, index: WordCountIndex) -> None:
+        """
+        Compute the result from the word count index of the dataset and save it, the texts are not loaded
+        or cleaned.
+
+        Args:
+            index (WordCountIndex): The word count index of the dataset.
+
+        Returns:
+            None
+        """
+        with metrics.stage(self.__class__.__name__):
+            result = self.query_index(index)
+            with metrics.stage('save_results'):
+                self.save_results(result)
+
+    def run_parallel(self, items: list, workers: int) -> DataFrame:
+        """
+        Run the task method on shards of the preprocessed data in a process pool and merge the partial
+        results in the order of the shards, so the result is the same as the one of the serial run.
+
+        Args:
+            items (list): The preprocessed data.
+            workers (int): The number of worker processes.
+
+        Returns:
+            DataFrame: The result of the task.
+        """
+        # use more shards than workers to balance the load of the workers
+        n_shards = min(len(items), workers * 4) or 1
+        logger.info(f"Running {self.__class__.__name__} on {n_shards} shards with {workers} workers")
+        partials = self._map_shards(items, -(-len(items) // n_shards), workers)
+        return self.finalize(reduce(self.merge, partials))
+
+    def run_checkpointed(self, items: list) -> DataFrame:
+        """
+        Run the task method serially on shards of the preprocessed data. The partial result of every shard
+        is checkpointed, so an interrupted run resumes from the last completed shard. The partial results
+        are merged in the order of the shards, so the result is the same as the one of the task method.
+
+        Args:
+            items (list): The preprocessed data.
+
+        Returns:
+            DataFrame: The result of the task.
+        """
+        return self.finalize(reduce(self.merge, self._map_shards(items, self.checkpoint_shard_size, 1)))
+
+    def _map_shards(self, items: list, shard_size: int, workers: int) -> list:
+        """
+        Compute the partial results of the shards of the preprocessed data, in a process pool if there
+        are more workers. The partial results of the shards completed by an interrupted run are loaded
+        from the checkpoint, every newly completed shard is saved to it.
+
+        Args:
+            items (list): The preprocessed data.
+            shard_size (int): The number of items in one shard.
+            workers (int): The number of worker processes, the shards are mapped serially if it is 1.
+
+        Returns:
+            list: The partial results in the order of the shards.
+        """
+        # the shards are named by their items, so a shard of another layout is never loaded
+        bounds = [(start, min(start + shard_size, len(items))) for start in range(0, len(items), shard_size)]
+        bounds = bounds or [(0, 0)]
+        partials = [None if self.checkpoint is None else self.checkpoint.load(f"items-{start}-{end}")
+                    for start, end in bounds]
+        n_completed = sum(partial is not None for partial in partials)
+        if n_completed:
+            logger.info(f"Resuming {self.__class__.__name__} from {n_completed} of {len(bounds)} completed shards")
+
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            futures = {} if executor is None else {
+                i: executor.submit(self._map_shard_in_worker, items[start:end])
+                for i, (start, end) in enumerate(bounds) if partials[i] is None
+            }
+            # the shards are completed in their order
+            for i, (start, end) in enumerate(tqdm(bounds, desc=f"Processing shards - {self.__class__.__name__}")):
+                if partials[i] is not None:
+                    continue
+                if executor is None:
+                    partials[i] = self.map_shard(items[start:end])
+                else:
+                    partials[i], records = futures[i].result()
+                    metrics.merge(records)
+                if self.checkpoint is not None:
+                    self.checkpoint.save(f"items-{start}-{end}", partials[i])
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return partials
+
+    def run_streaming(self, chunks: Iterable[DataFrame], workers: int) -> DataFrame:
+        """
+        Run the task method on the dataset streamed in chunks. Each chunk is preprocessed and mapped separately
+        and its partial result is merged right away, so just a few chunks are held in memory at once.
+        The merged partial result is checkpointed after every chunk, an interrupted run skips the chunks
+        merged before.
+
+        Args:
+            chunks (Iterable[DataFrame]): The chunks of the dataset.
+            workers (int): The number of worker processes, the chunks are processed serially if it is 1.
+
+        Returns:
+            DataFrame: The result of the task.
+        """
+        partial, n_chunks = None, 0
+        saved = None if self.checkpoint is None else self.checkpoint.load("chunks")
+        if saved is not None:
+            partial, n_chunks = saved['partial'], saved['chunks']
+            logger.info(f"Resuming {self.__class__.__name__} after {n_chunks} completed chunks")
+            chunks = islice(chunks, n_chunks, None)
+
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # bound the number of chunks in flight to bound the memory, futures are merged in the chunk order
+                pending: deque[Future] = deque()
+                for chunk in tqdm(chunks, desc=f"Processing chunks - {self.__class__.__name__}"):
+                    pending.append(executor.submit(self._map_shard_in_worker, self.preprocess_data(chunk)))
+                    if len(pending) >= workers * 2:
+                        partial = self._merge_worker_partial(partial, pending.popleft().result())
+                        n_chunks = self._save_chunks_checkpoint(partial, n_chunks)
+                while pending:
+                    partial = self._merge_worker_partial(partial, pending.popleft().result())
+                    n_chunks = self._save_chunks_checkpoint(partial, n_chunks)
+        else:
+            for chunk in tqdm(chunks, desc=f"Processing chunks - {self.__class__.__name__}"):
+                partial = self._merge_partial(partial, self.map_shard(self.preprocess_data(chunk)))
+                n_chunks = self._save_chunks_checkpoint(partial, n_chunks)
+
+        if partial is None:
+            # the dataset is empty
+            partial = self.map_shard(self.preprocess_data(DataFrame(columns=self.columns)))
+        return self.finalize(partial)
+
+    def _save_chunks_checkpoint(self, partial: Any, n_chunks: int) -> int:
+        # the partial result of all chunks merged so far, returns the number of the merged chunks
+        if self.checkpoint is not None:
+            self.checkpoint.save("chunks", {'partial': partial, 'chunks': n_chunks + 1})
+        return n_chunks + 1
+
+    def _merge_partial(self, partial: Any, new_partial: Any) -> Any:
+        return new_partial if partial is None else self.merge(partial, new_partial)
+
+    def _map_shard_in_worker(self, items: list) -> tuple[Any, dict[str, dict]]:
+        # runs in a worker process, the stages measured there are sent back together with the partial result
+        metrics.reset()
+        return self.map_shard(items), metrics.records
+
+    def _merge_worker_partial(self, partial: Any, worker_result: tuple[Any, dict[str, dict]]) -> Any:
+        new_partial, records = worker_result
+        metrics.merge(records)
+        return self._merge_partial(partial, new_partial)
+
+    def run(self, data: DataFrame | Iterable[DataFrame], token_store: TokenStore | None = None,
+            workers: int = 1, checkpoint: ShardCheckpoint | None = None) -> None:
+        """
+        Run the task method on the preprocessed data. Each task should implement its own run method.
+
+        Args:
+            data (DataFrame | Iterable[DataFrame]): The input data, or the chunks of the streamed input data.
+            token_store (TokenStore | None): The tokenized dataset, used by tasks working with cleaned words.
+            workers (int): The number of worker processes, the data is processed serially if it is 1.
+            checkpoint (ShardCheckpoint | None): The partial results of the shards completed by an interrupted run,
+                every completed shard is saved to it. The run is not checkpointed if None.
+
+        Returns:
+            str: The result of the task method.
+        """
+        self.token_store = token_store if self.uses_token_store else None
+        self.checkpoint = checkpoint
+        with metrics.stage(self.__class__.__name__):
+            if not isinstance(data, DataFrame):
+                with metrics.stage('run_streaming'):
+                    result = self.run_streaming(data, workers)
+            else:
+                # Preprocess the data
+                with metrics.stage('preprocess_data', len(data)):
+                    preprocessed_data = self.preprocess_data(data)
+                # Run the task method
+                with metrics.stage('task_method', len(preprocessed_data)):
+                    if workers > 1:
+                        result = self.run_parallel(preprocessed_data, workers)
+                    elif checkpoint is not None:
+                        result = self.run_checkpointed(preprocessed_data)
+                    else:
+                        result = self.task_method(preprocessed_data)
+
+            # Save the result
+            with metrics.stage('save_results'):
+                self.save_results(result)
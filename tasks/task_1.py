@@ -1,102 +1,303 @@
-from .task import Task
-from utils.logging_utils import logger
-from utils.text_processing import get_cleaned_words_from_text
-
-from tqdm import tqdm
-from pandas import DataFrame
-from collections import Counter
-
-
-class Task1(Task):
-    """
-    This class implements the first task of the project. It is responsible for processing the text data
-    and finding the most common words across selected texts.
-
-    Attributes:
-        task_method (callable): The method to be used for processing the data.
-
-    Methods:
-        preprocess_data(data: DataFrame) -> list[str]:
-            Preprocess the data for task 1. Applying filters for gender and age.
-            
-        _task_method(texts: list[str]) -> str:
-            Process the texts to find the most common words across selected texts.
-            
-        prepare_string_output_format(data: list[tuple]) -> str:
-            Prepare the output format for the task.
-    """
-    def __init__(self):
-        """
-        Initialize the Task1 class.
-
-        Args:
-            None
-
-        Returns:
-            None
-        """
-        super().__init__()
-        self.task_method = self._task_method
-
-    def preprocess_data(self, data: DataFrame) -> list[str]:
-        """
-        Preprocess the data for task 1. Applying filters for gender and age.
-
-        Args:
-            data (DataFrame): The input data.
-
-        Returns:
-            list[str]: A list of texts.
-        """
-        logger.info("Preprocessing data for task 1 - applying filters")
-        # applying these specific filters
-        selected_data = data[(data['gender'] == 'female') & (data['age'] >= 20) & (data['age'] <= 30)]
-        selected_data = selected_data['text'].tolist()
-        logger.info(f"Selected {len(selected_data)} texts for task 1")
-        return selected_data
-
-    def _task_method(self, texts: list[str]) -> DataFrame:
-        """
-        Process the texts to find the most common words across selected texts.
-
-        Args:
-            texts (list[str]): The input texts.
-
-        Returns:
-            DataFrame: A DataFrame with the most common words and their counts.
-        """
-        all_words = []
-        logger.info("Processing texts - extracting keywords")
-
-        for text in tqdm(texts, desc="Processing texts - extracting keywords"):
-            # Clean the text
-            cleaned_words = get_cleaned_words_from_text(text)
-            # save just those words with at least 5 chars and with no vowels at the end or at the beginning
-            cleaned_words = [word
-                             for word in cleaned_words
-                             if (len(word) >= 5 and word[-1] not in 'aeiou' and word[0] not in 'aeiou')]
-            all_words.extend(cleaned_words)
-
-        logger.info("Counting occurrences of words")
-
-        # Count the occurrences of each word
-        word_counts = Counter(all_words)
-
-        # get 10 most common words
-        most_common_words = word_counts.most_common(10)
-        return self.prepare_dataframe_output_format(most_common_words)
-
-    @staticmethod
-    def prepare_dataframe_output_format(data: list[tuple]) -> DataFrame:
-        """
-        Prepare the output format for the task.
-
-        Args:
-            data (list[tuple]): The most common words and their counts.
-
-        Returns:
-           DataFrame: A DataFrame with the most common words and their counts.
-        """
-        df = DataFrame(data, columns=['word', 'count'])
-
-        return df
+from .task import Task
+from utils.logging_utils import logger
+from utils.metrics import metrics
+from utils.dataset_utils import apply_filters
+from utils.data_utils import iter_batches
+from utils.sampling import StratifiedSample
+from utils.text_processing import get_cleaned_token_ids_from_texts
+from utils.word_count_index import WordCountIndex
+from utils.word_counters import WordCounter, ExactWordCounter, SpaceSavingWordCounter
+
+from scipy import sparse
+from tqdm import tqdm
+from pandas import DataFrame
+import numpy as np
+
+
+class Task1(Task):
+    """
+    This class implements the first task of the project. It is responsible for processing the text data
+    and finding the most common words across selected texts.
+
+    Attributes:
+        task_method (callable): The method to be used for processing the data.
+        filters (list[tuple]): The filters selecting the texts, female authors aged 20 to 30 by default.
+        n_words (int): The number of the most common words.
+        approximate_capacity (int | None): The number of the words monitored by the approximate counter,
+            the words are counted exactly if None.
+        normalizer (str | None): The normalizer folding the inflected forms of the words, e.g. 'porter',
+            the words are not normalized if None.
+
+    Methods:
+        preprocess_data(data: DataFrame) -> list[str]:
+            Preprocess the data for task 1. Applying the filters.
+            
+        _task_method(texts: list[str]) -> str:
+            Process the texts to find the most common words across selected texts.
+
+        create_word_counter() -> WordCounter:
+            Create the counter of the word occurrences.
+
+        map_shard(texts: list) -> WordCounter:
+            Count the occurrences of the selected words in a shard of the texts.
+
+        merge(left: WordCounter, right: WordCounter) -> WordCounter:
+            Merge the word occurrences of two shards.
+
+        finalize(word_counts: WordCounter) -> DataFrame:
+            Get the most common words from the word occurrences.
+
+        query_index(index: WordCountIndex) -> DataFrame:
+            Get the most common words from the word count index.
+
+        preview(data: DataFrame, sample: StratifiedSample, confidence: float) -> DataFrame:
+            Estimate the most common words and their counts from a stratified sample of the posts.
+            
+        prepare_string_output_format(data: list[tuple]) -> str:
+            Prepare the output format for the task.
+    """
+    uses_token_store = True
+    columns = ['gender', 'age', 'text']
+    # the filters applied in preprocess_data, pushed down to the dataset read
+    filters = [('gender', '==', 'female'), ('age', '>=', 20), ('age', '<=', 30)]
+    # save just those words with at least 5 chars and with no vowels at the end or at the beginning
+    word_filter = {'min_length': 5, 'excluded_first_letters': 'aeiou', 'excluded_last_letters': 'aeiou'}
+    # the number of the bootstrap resamples of the preview, the stability of the ranking is estimated from them
+    preview_resamples = 200
+    estimates_preview = True
+
+    def __init__(self, filters: list[tuple] | None = None, n_words: int = 10,
+                 approximate_capacity: int | None = None, normalizer: str | None = None, use_index: bool = False):
+        """
+        Initialize the Task1 class.
+
+        Args:
+            filters (list[tuple] | None): The filters selecting the texts as (column, operator, value) tuples
+                combined by AND, e.g. [('topic', 'in', ['Arts', 'Science'])]. The default filters if None.
+            n_words (int): The number of the most common words.
+            approximate_capacity (int | None): The number of the words monitored by the approximate Space-Saving
+                counter with a fixed memory, the words are counted exactly if None. The counts of the approximate
+                counter are reported with their maximal error.
+            normalizer (str | None): The normalizer folding the inflected forms of the words (see NORMALIZERS),
+                so e.g. thinking, thinks and think are counted together. The word filter applies
+                to the normalized forms. The words are not normalized if None.
+            use_index (bool): Whether to answer the task from the word count index of the dataset, a new slice
+                of the dataset is then a sum of the selected rows of the index instead of a full run.
+                The index counts the words exactly and without the normalization.
+
+        Returns:
+            None
+        """
+        if use_index and (approximate_capacity is not None or normalizer is not None):
+            raise ValueError("The word count index counts the words exactly and before the normalization, "
+                             "it can not be used with the approximate counting or a normalizer.")
+        super().__init__()
+        self.task_method = self._task_method
+        if filters is not None:
+            self.filters = list(filters)
+            # the filtered columns are loaded as well, the streamed chunks are filtered in preprocess_data
+            self.columns = list(dict.fromkeys([column for column, _, _ in self.filters] + ['text']))
+        self.n_words = n_words
+        self.approximate_capacity = approximate_capacity
+        if normalizer is not None:
+            self.normalizer = normalizer
+        if use_index:
+            self.uses_word_count_index = True
+
+    def preprocess_data(self, data: DataFrame) -> list:
+        """
+        Preprocess the data for task 1. Applying the filters.
+
+        Args:
+            data (DataFrame): The input data.
+
+        Returns:
+            list: A list of texts, or positions of the posts if a token store is attached.
+        """
+        logger.info("Preprocessing data for task 1 - applying filters")
+        # the filters are applied again, the streamed chunks and the CSV fallback are not filtered while reading
+        selected_data = apply_filters(data, self.filters)
+        selected_data = self.select_posts(selected_data)
+        logger.info(f"Selected {len(selected_data)} texts for task 1")
+        return selected_data
+
+    def _task_method(self, texts: list) -> DataFrame:
+        """
+        Process the texts to find the most common words across selected texts.
+
+        Args:
+            texts (list): The input texts, or positions of the posts if a token store is attached.
+
+        Returns:
+            DataFrame: A DataFrame with the most common words and their counts.
+        """
+        logger.info("Processing texts - extracting keywords")
+        word_counts = self.map_shard(tqdm(texts, desc="Processing texts - extracting keywords"))
+        return self.finalize(word_counts)
+
+    def create_word_counter(self) -> WordCounter:
+        """
+        Create the counter of the word occurrences, exact or approximate by the approximate capacity.
+
+        Args:
+            None
+
+        Returns:
+            WordCounter: The empty counter.
+        """
+        if self.approximate_capacity is not None:
+            return SpaceSavingWordCounter(self.approximate_capacity)
+        return ExactWordCounter(len(self.get_cleaned_words_vocabulary()))
+
+    def map_shard(self, texts: list) -> WordCounter:
+        """
+        Count the occurrences of the selected words in a shard of the texts. The token IDs of every batch
+        are counted right away, the words of the shard are never collected.
+
+        Args:
+            texts (list): The input texts, or positions of the posts if a token store is attached.
+
+        Returns:
+            WordCounter: The occurrences of the words in the shard.
+        """
+        word_counts = self.create_word_counter()
+        for token_ids in self.iter_cleaned_token_id_batches(texts):
+            with metrics.stage('count', len(token_ids)):
+                word_counts.update(token_ids)
+        return word_counts
+
+    def merge(self, left: WordCounter, right: WordCounter) -> WordCounter:
+        """
+        Merge the word occurrences of two shards.
+
+        Args:
+            left (WordCounter): The occurrences of the words in the preceding shards.
+            right (WordCounter): The occurrences of the words in the following shards.
+
+        Returns:
+            WordCounter: The merged occurrences of the words.
+        """
+        return left.merge(right)
+
+    def finalize(self, word_counts: WordCounter) -> DataFrame:
+        """
+        Get the most common words from the word occurrences.
+
+        Args:
+            word_counts (WordCounter): The occurrences of the words in all texts.
+
+        Returns:
+            DataFrame: A DataFrame with the most common words and their counts, with the maximal overestimation
+                of the counts if the words were counted approximately.
+        """
+        logger.info("Counting occurrences of words")
+
+        # get the most common words
+        with metrics.stage('sort', word_counts.n_tokens):
+            most_common_words = word_counts.most_common(self.n_words)
+        vocabulary = self.get_cleaned_words_vocabulary()
+        df = self.prepare_dataframe_output_format([(vocabulary[token_id], count)
+                                                   for token_id, count, _ in most_common_words])
+        if self.approximate_capacity is not None:
+            # the true count of a word is between count - error and count
+            df['error'] = [error for _, _, error in most_common_words]
+            logger.info(f"Approximate counts of {word_counts.n_tokens} words, the words which are not monitored "
+                        f"occur at most {word_counts.max_error} times")
+        return df
+
+    def query_index(self, index: WordCountIndex) -> DataFrame:
+        """
+        Get the most common words from the word count index instead of counting the words of the texts,
+        any slice of the dataset is answered by a sum of the selected rows of the index. Words with the same
+        count are ordered by their first occurrence in the selected texts, like in the run of the task.
+
+        Args:
+            index (WordCountIndex): The word count index of the dataset.
+
+        Returns:
+            DataFrame: A DataFrame with the most common words and their counts.
+        """
+        if self.normalizer is not None:
+            raise ValueError("The word count index counts the words before the normalization, "
+                             "the normalized words have to be counted by running the task.")
+        with metrics.stage('query_index', len(index)):
+            return index.get_top_words(self.filters, self.n_words, self.word_filter)
+
+    def preview(self, data: DataFrame, sample: StratifiedSample, confidence: float) -> DataFrame:
+        """
+        Estimate the most common words and their counts in all selected texts from a stratified sample of them.
+        The counts of the candidate words are estimated with their confidence intervals, the stability
+        of the ranking is estimated by resampling the sample - the probability of every word to be among
+        the most common words and the interval of its rank.
+
+        Args:
+            data (DataFrame): The sampled posts, loaded with the columns and the filters of the task.
+            sample (StratifiedSample): The sample, its strata are in the order of the rows of the data.
+            confidence (float): The confidence level of the intervals.
+
+        Returns:
+            DataFrame: A DataFrame with the most common words, their estimated counts with the confidence intervals
+                and relative errors, the probabilities of the words to be among the most common words
+                and the intervals of their ranks.
+        """
+        texts = self.preprocess_data(data)
+        vocabulary = self.get_cleaned_words_vocabulary()
+        vocabulary_mask = self.get_cleaned_words_mask()
+        token_normalizer = self.get_token_normalizer()
+        # the occurrences of the words in every sampled post, one row per post
+        occurrences = []
+        for batch in iter_batches(texts, self.cleaning_batch_size):
+            with metrics.stage('clean', len(batch)):
+                token_ids, offsets = get_cleaned_token_ids_from_texts(batch, vocabulary_mask)
+                if token_normalizer is not None:
+                    token_ids = token_normalizer.normalize_token_ids(token_ids)
+                posts = np.repeat(np.arange(len(batch)), np.diff(offsets))
+                occurrences.append(sparse.csr_matrix((np.ones(len(token_ids)), (posts, token_ids)),
+                                                     shape=(len(batch), len(vocabulary))))
+        occurrences = sparse.vstack(occurrences, format='csc') if occurrences \
+            else sparse.csc_matrix((0, len(vocabulary)))
+
+        with metrics.stage('estimate', len(texts)):
+            # the words ranked just below the most common ones can swap with them in the resamples
+            estimates = occurrences.T @ sample.weights
+            candidates = np.argsort(-estimates, kind='stable')[:max(5 * self.n_words, 50)]
+            candidates = candidates[estimates[candidates] > 0]
+            values = occurrences[:, candidates].toarray()
+            counts, half_widths = sample.estimate_totals(values, confidence)
+
+            resampled_counts = sample.bootstrap_totals(values, self.preview_resamples)
+            order = np.argsort(-resampled_counts, axis=1, kind='stable')
+            ranks = np.empty_like(order)
+            ranks[np.arange(len(order))[:, np.newaxis], order] = np.arange(len(candidates))
+        n_words = min(self.n_words, len(candidates))
+        same_set = (ranks[:, :n_words] < n_words).all(axis=1).mean()
+        same_order = (ranks[:, :n_words] == np.arange(n_words)).all(axis=1).mean()
+        logger.info(f"The top {n_words} words of the preview are the same in {same_set:.0%} and in the same order "
+                    f"in {same_order:.0%} of {self.preview_resamples} resamples of the sample")
+
+        df = self.prepare_dataframe_output_format(list(zip(vocabulary[candidates[:n_words]],
+                                                           np.round(counts[:n_words]).astype(np.int64))))
+        df['ci_low'] = np.maximum(counts[:n_words] - half_widths[:n_words], 0)
+        df['ci_high'] = counts[:n_words] + half_widths[:n_words]
+        df['relative_error'] = half_widths[:n_words] / counts[:n_words]
+        df['top_probability'] = (ranks[:, :n_words] < self.n_words).mean(axis=0)
+        # the ranks are 1-based like the rows of the result
+        tail = (1 - confidence) / 2
+        df['rank_low'] = np.quantile(ranks[:, :n_words], tail, axis=0, method='lower') + 1
+        df['rank_high'] = np.quantile(ranks[:, :n_words], 1 - tail, axis=0, method='higher') + 1
+        return df
+
+    @staticmethod
+    def prepare_dataframe_output_format(data: list[tuple]) -> DataFrame:
+        """
+        Prepare the output format for the task.
+
+        Args:
+            data (list[tuple]): The most common words and their counts.
+
+        Returns:
+           DataFrame: A DataFrame with the most common words and their counts.
+        """
+        df = DataFrame(data, columns=['word', 'count'])
+
+        return df
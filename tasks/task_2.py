@@ -1,120 +1,274 @@
-from .task import Task
-from utils.logging_utils import logger
-from utils.text_processing import get_cleaned_words_from_text
-
-from tqdm import tqdm
-from pandas import DataFrame
-import numpy as np
-from gensim.models import FastText
-from sklearn.neighbors import NearestNeighbors
-
-class Task2(Task):
-    """
-    This class implements the second task of the project. It is responsible for processing the text data
-    and finding the most similar words using FastText and NearestNeighbors.
-
-    Attributes:
-        task_method (callable): The method to be used for processing the data.
-
-    Methods:
-        preprocess_data(data: DataFrame) -> list[str]:
-            Preprocess the data for task 2. No filters are applied.
-
-        _task_method(texts: list[str]) -> str:
-            Process the texts to find the most similar words using FastText and NearestNeighbors.
-
-        prepare_string_output_format(data: list[tuple]) -> str:
-            Prepare the output format for the task.
-    """
-    def __init__(self):
-        """
-        Initialize the Task2 class.
-
-        Args:
-            None
-
-        Returns:
-            None
-        """
-        super().__init__()
-        self.task_method = self._task_method
-
-    def preprocess_data(self, data: DataFrame) -> list[str]:
-        """
-        Preprocess the data for task 2. No filters are applied.
-
-        Args:
-            data (DataFrame): The input data.
-
-        Returns:
-            list[str]: A list of texts.
-        """
-        logger.info("Preprocessing data for task 2 - applying filters")
-        selected_data = data['text'].tolist()
-        logger.info(f"Selected {len(selected_data)} texts for task 2")
-        return selected_data
-
-    def _task_method(self, texts: list[str]) -> DataFrame:
-        """
-        Process the texts to find the most similar words using FastText and NearestNeighbors.
-
-        Args:
-            texts (list[str]): The input texts.
-
-        Returns:
-            DataFrame: A DataFrame with the most similar words and their distances.
-        """
-        all_words = []
-        logger.info("Processing texts - extracting keywords")
-
-        for text in tqdm(texts, desc="Processing texts - extracting keywords"):
-            # Clean the text
-            cleaned_words = get_cleaned_words_from_text(text)
-            # save just those words with at least 6 chars and at most 45 chars
-            # (45 is number of letters for the longest word in English)
-            # + using just words with letters
-            cleaned_words = [word
-                             for word in cleaned_words
-                             if (6 <= len(word) <= 45)]
-            all_words.extend(cleaned_words)
-        logger.info('Extracting unique words')
-        # get list of unique words to simplify the process
-        unique_words = list(set(all_words))
-
-        logger.info('Vectorizing words using FastText')
-        # using FastText model to get word embeddings
-        model = FastText(sentences=[[w] for w in unique_words], vector_size=50, min_count=1)
-        # Get embeddings
-        embeddings = np.array([model.wv[w] for w in unique_words])
-
-        logger.info('Finding most similar words using NearestNeighbors')
-        # setting n_neighbors to 2 to get the most similar pairs of words (first index is the word itself)
-        nn = NearestNeighbors(n_neighbors=2, metric='cosine').fit(embeddings)
-        distances, indices = nn.kneighbors(embeddings)
-
-        logger.info('Sorting distances and indices')
-        # sorting the distances + pairs of words
-        sorted_distances = sorted(zip(distances, indices), key=lambda x: x[0][1])
-        # get 50 most similar pairs of words
-        most_similar_pairs = [
-            (unique_words[i], unique_words[j], d[0][1]) for d, (i, j) in zip(sorted_distances[:50], indices[:50])
-        ]
-        return self.prepare_string_output_format(most_similar_pairs)
-
-    @staticmethod
-    def prepare_string_output_format(data: list[tuple]) -> DataFrame:
-        """
-        Prepare the output format for the task.
-
-        Args:
-            data (list[tuple]): The input data.
-
-        Returns:
-            DataFrame: A DataFrame with the most similar words and their distances.
-        """
-
-        df = DataFrame(data, columns=['word1', 'word2', 'distance'])
-
-        return df
-
-
+from .task import Task
+from utils.logging_utils import logger
+from utils.metrics import metrics
+from utils.similarity import SimilarityBackend, BruteForceBackend, select_most_similar_pairs
+from utils.embeddings import load_or_train_embeddings
+
+from tqdm import tqdm
+from pandas import DataFrame
+import numpy as np
+
+class Task2(Task):
+    """
+    This class implements the second task of the project. It is responsible for processing the text data
+    and finding the most similar words using FastText and a similarity backend, or using a similarity backend
+    comparing the words directly (e.g. by their edit distance).
+
+    Attributes:
+        task_method (callable): The method to be used for processing the data.
+        similarity_backend (SimilarityBackend): The backend finding the nearest word of every word.
+        n_pairs (int): The number of the most similar pairs of words in the result.
+        normalizer (str | None): The normalizer folding the inflected forms of the words, e.g. 'wordnet',
+            the words are not normalized if None.
+
+    Methods:
+        preprocess_data(data: DataFrame) -> list[str]:
+            Preprocess the data for task 2. No filters are applied.
+
+        _task_method(texts: list[str]) -> str:
+            Process the texts to find the most similar words using FastText and the similarity backend.
+
+        map_shard(texts: list) -> set[str]:
+            Extract the unique words from a shard of the texts.
+
+        merge(left: set[str], right: set[str]) -> set[str]:
+            Merge the unique words of two shards.
+
+        finalize(unique_words: set[str]) -> DataFrame:
+            Find the most similar words using FastText and the similarity backend.
+
+        update_state(state: dict | None, unique_words: set[str]) -> dict:
+            Add the new words to the embedded words and update their nearest neighbours.
+
+        _represent_words(words: list[str], n_new_words: int) -> np.ndarray:
+            Get the FastText embeddings of the words, or the words if the backend compares them directly.
+
+        finalize_state(state: dict) -> DataFrame:
+            Select the most similar words from the nearest neighbours of the state.
+
+        prepare_string_output_format(data: list[tuple]) -> str:
+            Prepare the output format for the task.
+    """
+    uses_token_store = True
+    # save just those words with at least 6 chars and at most 45 chars
+    # (45 is number of letters for the longest word in English)
+    word_filter = {'min_length': 6, 'max_length': 45}
+    # parameters of the FastText model embedding the words
+    embedding_params = {'vector_size': 50, 'min_count': 1}
+
+    def __init__(self, similarity_backend: SimilarityBackend | None = None, n_pairs: int = 50,
+                 normalizer: str | None = None):
+        """
+        Initialize the Task2 class.
+
+        Args:
+            similarity_backend (SimilarityBackend | None): The backend finding the nearest word of every word,
+                the exact brute force search is used if None.
+            n_pairs (int): The number of the most similar pairs of words in the result.
+            normalizer (str | None): The normalizer folding the inflected forms of the words (see NORMALIZERS),
+                so e.g. thinking and thinks are compared just once as think. The words are not normalized if None.
+
+        Returns:
+            None
+        """
+        super().__init__()
+        self.task_method = self._task_method
+        self.similarity_backend = similarity_backend or BruteForceBackend()
+        self.n_pairs = n_pairs
+        if normalizer is not None:
+            self.normalizer = normalizer
+
+    def preprocess_data(self, data: DataFrame) -> list:
+        """
+        Preprocess the data for task 2. No filters are applied.
+
+        Args:
+            data (DataFrame): The input data.
+
+        Returns:
+            list: A list of texts, or positions of the posts if a token store is attached.
+        """
+        logger.info("Preprocessing data for task 2 - applying filters")
+        selected_data = self.select_posts(data)
+        logger.info(f"Selected {len(selected_data)} texts for task 2")
+        return selected_data
+
+    def _task_method(self, texts: list) -> DataFrame:
+        """
+        Process the texts to find the most similar words using FastText and the similarity backend.
+
+        Args:
+            texts (list): The input texts, or positions of the posts if a token store is attached.
+
+        Returns:
+            DataFrame: A DataFrame with the most similar words and their distances.
+        """
+        logger.info("Processing texts - extracting keywords")
+        unique_words = self.map_shard(tqdm(texts, desc="Processing texts - extracting keywords"))
+        return self.finalize(unique_words)
+
+    def map_shard(self, texts: list) -> set[str]:
+        """
+        Extract the unique words from a shard of the texts.
+
+        Args:
+            texts (list): The input texts, or positions of the posts if a token store is attached.
+
+        Returns:
+            set[str]: The unique words of the shard.
+        """
+        unique_words = set()
+        for cleaned_words in self.iter_cleaned_word_batches(texts):
+            with metrics.stage('count', len(cleaned_words)):
+                unique_words.update(cleaned_words.tolist())
+        return unique_words
+
+    def merge(self, left: set[str], right: set[str]) -> set[str]:
+        """
+        Merge the unique words of two shards.
+
+        Args:
+            left (set[str]): The unique words of the preceding shards.
+            right (set[str]): The unique words of the following shards.
+
+        Returns:
+            set[str]: The union of the unique words.
+        """
+        left |= right
+        return left
+
+    def finalize(self, unique_words: set[str]) -> DataFrame:
+        """
+        Find the most similar words using FastText and the similarity backend.
+
+        Args:
+            unique_words (set[str]): The unique words of all texts.
+
+        Returns:
+            DataFrame: A DataFrame with the most similar words and their distances.
+        """
+        logger.info('Extracting unique words')
+        # sort the unique words, so the order does not depend on the way the words were collected
+        unique_words = sorted(unique_words)
+
+        embeddings = self._represent_words(unique_words, len(unique_words))
+
+        logger.info(f'Finding most similar words using {self.similarity_backend.__class__.__name__}')
+        with metrics.stage('knn', len(unique_words)):
+            distances, neighbours = self.similarity_backend.find_nearest_neighbours(embeddings)
+        return self._select_most_similar_pairs(unique_words, distances, neighbours)
+
+    def update_state(self, state: dict | None, unique_words: set[str]) -> dict:
+        """
+        Add the new words of a batch to the embedded words. Just the new words are embedded, and only the pairs
+        with a new word are compared to update the nearest neighbours, the embeddings of the other words
+        are reused from the embedding cache.
+
+        Args:
+            state (dict | None): The sorted words with the distances and indices of their nearest neighbours
+                and the index of the similarity backend, None for the first batch.
+            unique_words (set[str]): The unique words of the new batch.
+
+        Returns:
+            dict: The updated state.
+        """
+        if state is None:
+            words = sorted(unique_words)
+            embeddings = self._represent_words(words, len(words))
+            index = self.similarity_backend.create_index()
+            with metrics.stage('knn', len(words)):
+                distances, neighbours = self.similarity_backend.find_nearest_neighbours(embeddings, index)
+            return {'words': words, 'distances': distances, 'neighbours': neighbours, 'index': index}
+
+        new_words = unique_words.difference(state['words'])
+        if not new_words:
+            return state
+        logger.info(f'Adding {len(new_words)} new words to {len(state["words"])} words')
+        words = sorted(new_words.union(state['words']))
+        embeddings = self._represent_words(words, len(new_words))
+        with metrics.stage('knn', len(new_words)):
+            # the indices of the words shift, the neighbours of the previous words are moved to the new indices
+            previous_rows = np.searchsorted(np.array(words, dtype=object), np.array(state['words'], dtype=object))
+            distances = np.full(len(words), np.inf)
+            neighbours = np.full(len(words), -1, dtype=np.int64)
+            distances[previous_rows] = state['distances']
+            has_neighbour = state['neighbours'] >= 0
+            neighbours[previous_rows[has_neighbour]] = previous_rows[state['neighbours'][has_neighbour]]
+            # the index of the backend holds the previous words, just the new words are added to it
+            index = state.get('index')
+            if index is None:
+                index = self.similarity_backend.create_index()
+            distances, neighbours = self.similarity_backend.update_nearest_neighbours(
+                embeddings, distances, neighbours, np.setdiff1d(np.arange(len(words)), previous_rows), index)
+        return {'words': words, 'distances': distances, 'neighbours': neighbours, 'index': index}
+
+    def _represent_words(self, words: list[str], n_new_words: int) -> np.ndarray:
+        """
+        Get the representations of the words compared by the similarity backend - the FastText embeddings,
+        or the words themselves if the backend compares the words directly and no model is needed.
+
+        Args:
+            words (list[str]): The sorted words.
+            n_new_words (int): The number of the words added since the last call, for the metrics.
+
+        Returns:
+            np.ndarray: The embeddings of the words, one row per word, or the array of the words.
+        """
+        if not self.similarity_backend.uses_embeddings:
+            return np.array(words, dtype=object)
+        logger.info('Vectorizing words using FastText')
+        with metrics.stage('embed', n_new_words):
+            # the model is cached, just the words missing in the cached vocabulary are embedded
+            return load_or_train_embeddings(words, **self.embedding_params)
+
+    def finalize_state(self, state: dict) -> DataFrame:
+        """
+        Select the most similar words from the nearest neighbours of the state.
+
+        Args:
+            state (dict): The sorted words with the distances and indices of their nearest neighbours.
+
+        Returns:
+            DataFrame: A DataFrame with the most similar words and their distances.
+        """
+        return self._select_most_similar_pairs(state['words'], state['distances'], state['neighbours'])
+
+    def _select_most_similar_pairs(self, words: list[str], distances: np.ndarray, neighbours: np.ndarray) \
+            -> DataFrame:
+        """
+        Select the most similar pairs of words from the nearest neighbours of the words.
+
+        Args:
+            words (list[str]): The sorted words.
+            distances (np.ndarray): The distance of every word to its nearest neighbour.
+            neighbours (np.ndarray): The index of the nearest neighbour of every word.
+
+        Returns:
+            DataFrame: A DataFrame with the most similar words and their distances.
+        """
+        logger.info(f'Selecting {self.n_pairs} most similar pairs of words')
+        with metrics.stage('sort', len(words)):
+            # only the smallest distances are selected and sorted
+            most_similar_pairs = [
+                (words[i], words[j], d)
+                for i, j, d in select_most_similar_pairs(distances, neighbours, self.n_pairs)
+            ]
+        return self.prepare_string_output_format(most_similar_pairs)
+
+    @staticmethod
+    def prepare_string_output_format(data: list[tuple]) -> DataFrame:
+        """
+        Prepare the output format for the task.
+
+        Args:
+            data (list[tuple]): The input data.
+
+        Returns:
+            DataFrame: A DataFrame with the most similar words and their distances.
+        """
+
+        df = DataFrame(data, columns=['word1', 'word2', 'distance'])
+
+        return df
+
+
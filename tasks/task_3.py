@@ -1,88 +1,249 @@
-from .task import Task
-from utils.logging_utils import logger
-from utils.consts import dollar_pattern
-from utils.finance_utils import parse_dollar_amount
-
-from pandas import DataFrame
-
-
-class Task3(Task):
-    """
-    This class implements the third task of the project. It is responsible for processing the text data
-    and finding the total sum of dollar amounts across selected texts.
-
-    Attributes:
-        task_method (callable): The method to be used for processing the data.
-
-    Methods:
-        preprocess_data(data: DataFrame) -> list[str]:
-            Preprocess the data for task 3. No filters are applied.
-
-        _task_method(texts: list[str]) -> str:
-            Process the texts to find the total sum of dollar amounts.
-
-        prepare_string_output_format(data: int) -> str:
-            Prepare the output format for the task.
-    """
-    def __init__(self):
-        """
-        Initialize the Task3 class.
-
-        Args:
-            None
-        Returns:
-            None
-        """
-        super().__init__()
-        self.task_method = self._task_method
-
-    def preprocess_data(self, data: DataFrame) -> list[str]:
-        """
-        Preprocess the data for task 3. No filters are applied.
-
-        Args:
-            data (DataFrame): The input data.
-        Returns:
-            list[str]: A list of texts.
-        """
-        logger.info("Preprocessing data for task 3 - applying filters")
-        selected_data = data['text'].tolist()
-        logger.info(f"Selected {len(selected_data)} texts for task 3")
-        return selected_data
-
-    def _task_method(self, texts: list[str]) -> DataFrame:
-        """
-        Process the texts to find the total sum of dollar amounts.
-
-        Args:
-            texts (list[str]): A list of texts.
-        Returns:
-            DataFrame: The formatted output with the total sum of dollar amounts.
-        """
-        total_sum = 0
-        logger.info("Processing texts - extracting dollar amounts")
-        for text in texts:
-            # Find all dollar amounts in the text
-            matches = dollar_pattern.finditer(text)
-            for match in matches:
-                dollar_value = match.group()
-                # if dollar value is found parse it
-                dollar_value = parse_dollar_amount(dollar_value)
-                if dollar_value:
-                    total_sum += dollar_value
-        logger.info("Extracting dollar amounts - done")
-        return self.prepare_string_output_format(total_sum)
-
-    @staticmethod
-    def prepare_string_output_format(data: int) -> DataFrame:
-        """
-        Prepare the output format for the task.
-
-        Args:
-            data (int): The total sum of dollar amounts.
-
-        Returns:
-            DataFrame: The formatted output with the total sum of dollar amounts.
-        """
-        df = DataFrame({'Total Dollar Amount Billion $': [data / 1e9]})
+from .task import Task
+from utils.logging_utils import logger
+from utils.metrics import metrics
+from utils.extraction import get_extraction_engine
+from utils.sampling import StratifiedSample
+
+from pandas import DataFrame
+from fractions import Fraction
+import pandas as pd
+import numpy as np
+import math
+
+
+class Task3(Task):
+    """
+    This class implements the third task of the project. It is responsible for processing the text data
+    and finding the total sum of dollar amounts across selected texts. The sums of dollar amounts
+    per post, author, topic and date are returned as additional results, see output_names.
+
+    Attributes:
+        task_method (callable): The method to be used for processing the data.
+        breakdowns (dict[str, str]): The additional results, the name of the result and the column
+            the dollar amounts are summed by.
+        extraction_patterns (list[str]): The patterns of the extraction engine summed as the dollar amounts.
+
+    Methods:
+        preprocess_data(data: DataFrame) -> DataFrame:
+            Preprocess the data for task 3. No filters are applied.
+
+        _task_method(data: DataFrame) -> dict[str, DataFrame]:
+            Process the texts to find the total sum of dollar amounts and the sums of the breakdowns.
+
+        map_shard(data: DataFrame) -> DataFrame:
+            Extract the dollar amounts from a shard of the posts.
+
+        merge(left: DataFrame, right: DataFrame) -> DataFrame:
+            Merge the dollar amounts of two shards.
+
+        finalize(dollar_values: DataFrame) -> dict[str, DataFrame]:
+            Sum the dollar amounts in total and by the breakdowns.
+
+        update_state(state: dict | None, dollar_values: DataFrame) -> dict:
+            Add the dollar amounts of a new batch to the running sums.
+
+        finalize_state(state: dict) -> dict[str, DataFrame]:
+            Format the total and the running sums of the breakdowns.
+
+        preview(data: DataFrame, sample: StratifiedSample, confidence: float) -> DataFrame:
+            Estimate the total sum and the number of dollar amounts from a stratified sample of the posts.
+
+        prepare_results(total_sum: float, breakdowns: dict[str, DataFrame]) -> dict[str, DataFrame]:
+            Prepare the results of the task by their output names.
+
+        prepare_string_output_format(data: int) -> str:
+            Prepare the output format for the task.
+    """
+    columns = ['id', 'topic', 'date', 'text']
+    estimates_preview = True
+    breakdowns = {'by_post': 'row', 'by_author': 'id', 'by_topic': 'topic', 'by_date': 'date'}
+    # the patterns of the summed amounts, e.g. adding 'usd_code' sums the amounts like USD 5m as well
+    extraction_patterns = ['usd']
+
+    def __init__(self):
+        """
+        Initialize the Task3 class.
+
+        Args:
+            None
+        Returns:
+            None
+        """
+        super().__init__()
+        self.task_method = self._task_method
+
+    @property
+    def output_names(self) -> list[str]:
+        return [self.__class__.__name__] + [f"{self.__class__.__name__}_{name}" for name in self.breakdowns]
+
+    def preprocess_data(self, data: DataFrame) -> DataFrame:
+        """
+        Preprocess the data for task 3. No filters are applied.
+
+        Args:
+            data (DataFrame): The input data.
+        Returns:
+            DataFrame: The posts with the columns of the breakdowns and the text.
+        """
+        logger.info("Preprocessing data for task 3 - applying filters")
+        selected_data = data[self.columns].rename_axis('row')
+        logger.info(f"Selected {len(selected_data)} texts for task 3")
+        return selected_data
+
+    def _task_method(self, data: DataFrame) -> dict[str, DataFrame]:
+        """
+        Process the texts to find the total sum of dollar amounts and the sums of the breakdowns.
+
+        Args:
+            data (DataFrame): The preprocessed posts.
+        Returns:
+            dict[str, DataFrame]: The formatted total sum of dollar amounts and the sums of the breakdowns,
+                by their output names.
+        """
+        logger.info("Processing texts - extracting dollar amounts")
+        dollar_values = self.map_shard(data)
+        logger.info("Extracting dollar amounts - done")
+        return self.finalize(dollar_values)
+
+    def map_shard(self, data: DataFrame) -> DataFrame:
+        """
+        Extract the dollar amounts from a shard of the posts.
+
+        Args:
+            data (DataFrame): The preprocessed posts.
+        Returns:
+            DataFrame: The dollar amounts found in the texts with the columns of their posts, indexed by the row
+                positions of the posts.
+        """
+        with metrics.stage('extract', len(data)):
+            # all patterns are extracted by a single scan of the texts
+            values = get_extraction_engine(tuple(self.extraction_patterns)).extract(data['text'])
+            amounts = values.loc[values['value'] != 0, ['value']].rename(columns={'value': 'amount'})
+            return amounts.join(data.drop(columns='text'))
+
+    def merge(self, left: DataFrame, right: DataFrame) -> DataFrame:
+        """
+        Merge the dollar amounts of two shards.
+
+        Args:
+            left (DataFrame): The dollar amounts of the preceding shards.
+            right (DataFrame): The dollar amounts of the following shards.
+        Returns:
+            DataFrame: The merged dollar amounts.
+        """
+        return pd.concat([left, right])
+
+    def finalize(self, dollar_values: DataFrame) -> dict[str, DataFrame]:
+        """
+        Sum the dollar amounts in total and by the breakdowns.
+
+        Args:
+            dollar_values (DataFrame): The dollar amounts found in all texts.
+        Returns:
+            dict[str, DataFrame]: The formatted total sum of dollar amounts and the sums of the breakdowns,
+                by their output names.
+        """
+        dollar_values = dollar_values.reset_index()
+        breakdowns = {}
+        for name, column in self.breakdowns.items():
+            with metrics.stage('aggregate', len(dollar_values)):
+                breakdowns[name] = dollar_values.groupby(column, observed=True)['amount'].agg(['sum', 'count'])
+
+        # exact summation, so the total does not depend on the order of the amounts or on the sharding
+        total_sum = math.fsum(dollar_values['amount'])
+        return self.prepare_results(total_sum, breakdowns)
+
+    def update_state(self, state: dict | None, dollar_values: DataFrame) -> dict:
+        """
+        Add the dollar amounts of a new batch to the running sums, the amounts themselves are not kept.
+
+        Args:
+            state (dict | None): The sums and counts of the breakdowns and the total of the previous batches,
+                None for the first batch.
+            dollar_values (DataFrame): The dollar amounts found in the texts of the new batch.
+        Returns:
+            dict: The updated sums.
+        """
+        dollar_values = dollar_values.reset_index()
+        breakdowns = {}
+        for name, column in self.breakdowns.items():
+            with metrics.stage('aggregate', len(dollar_values)):
+                breakdown = dollar_values.groupby(column, observed=True)['amount'].agg(['sum', 'count'])
+                if state is not None:
+                    breakdown = state['breakdowns'][name].add(breakdown, fill_value=0).astype({'count': 'int64'})
+            breakdowns[name] = breakdown
+        # the total is kept as an exact fraction, so it does not depend on the way the posts were split to batches
+        total = sum(map(Fraction, dollar_values['amount']), state['total'] if state is not None else Fraction(0))
+        return {'breakdowns': breakdowns, 'total': total}
+
+    def finalize_state(self, state: dict) -> dict[str, DataFrame]:
+        """
+        Format the total and the running sums of the breakdowns.
+
+        Args:
+            state (dict): The sums and counts of the breakdowns and the total of all batches.
+        Returns:
+            dict[str, DataFrame]: The formatted total sum of dollar amounts and the sums of the breakdowns,
+                by their output names.
+        """
+        # the float of the exact sum is rounded the same way as math.fsum
+        return self.prepare_results(float(state['total']), state['breakdowns'])
+
+    def prepare_results(self, total_sum: float, breakdowns: dict[str, DataFrame]) -> dict[str, DataFrame]:
+        """
+        Prepare the results of the task by their output names, the breakdowns are sorted by the sums.
+
+        Args:
+            total_sum (float): The total sum of dollar amounts.
+            breakdowns (dict[str, DataFrame]): The sums and counts of the dollar amounts by the breakdowns.
+
+        Returns:
+            dict[str, DataFrame]: The formatted total and the sorted breakdowns by their output names.
+        """
+        results = {self.__class__.__name__: self.prepare_string_output_format(total_sum)}
+        for name, breakdown in breakdowns.items():
+            results[f"{self.__class__.__name__}_{name}"] = breakdown.sort_values('sum', ascending=False).reset_index()
+        return results
+
+    def preview(self, data: DataFrame, sample: StratifiedSample, confidence: float) -> DataFrame:
+        """
+        Estimate the total sum and the number of dollar amounts in all texts from a stratified sample of them,
+        with their confidence intervals. The breakdowns are not saved.
+
+        Args:
+            data (DataFrame): The sampled posts, loaded with the columns of the task.
+            sample (StratifiedSample): The sample, its strata are in the order of the rows of the data.
+            confidence (float): The confidence level of the intervals.
+
+        Returns:
+            DataFrame: The estimates with their confidence intervals and relative errors.
+        """
+        data = self.preprocess_data(data)
+        dollar_values = self.map_shard(data)
+        with metrics.stage('estimate', len(data)):
+            # the sum and the number of the dollar amounts of every sampled post, zeros for the posts without any
+            per_post = dollar_values['amount'].groupby(level=0).agg(['sum', 'count']).reindex(data.index, fill_value=0)
+            per_post['sum'] /= 1e9
+            estimates, half_widths = sample.estimate_totals(per_post.to_numpy(), confidence)
+        return DataFrame({
+            'result': ['Total Dollar Amount Billion $', 'Number of Dollar Amounts'],
+            'estimate': estimates,
+            'ci_low': np.maximum(estimates - half_widths, 0),
+            'ci_high': estimates + half_widths,
+            'relative_error': np.divide(half_widths, np.abs(estimates), out=np.zeros_like(half_widths),
+                                        where=estimates != 0),
+        })
+
+    @staticmethod
+    def prepare_string_output_format(data: int) -> DataFrame:
+        """
+        Prepare the output format for the task.
+
+        Args:
+            data (int): The total sum of dollar amounts.
+
+        Returns:
+            DataFrame: The formatted output with the total sum of dollar amounts.
+        """
+        df = DataFrame({'Total Dollar Amount Billion $': [data / 1e9]})
         return df
\ No newline at end of file
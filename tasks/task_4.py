@@ -0,0 +1,157 @@
+from .task import Task
+from utils.logging_utils import logger
+from utils.metrics import metrics
+
+from utils.sampling import StratifiedSample
+
+from scipy import sparse
+from pandas import DataFrame
+import pandas as pd
+import numpy as np
+
+
+class Task4(Task):
+    """
+    This class implements the aggregates of the dataset used by the web app. It counts the posts in every
+    combination of gender, age band, topic and sign, so the charts of the app are computed from this small
+    table instead of the whole dataset.
+
+    Attributes:
+        task_method (callable): The method to be used for processing the data.
+        group_columns (list[str]): The columns the posts are counted by.
+        age_bins (list[float]): The edges of the age bands, the bands include the left edge.
+        age_labels (list[str]): The labels of the age bands.
+
+    Methods:
+        preprocess_data(data: DataFrame) -> DataFrame:
+            Preprocess the data for task 4. Assign the age bands.
+
+        _task_method(data: DataFrame) -> DataFrame:
+            Count the posts in the groups.
+
+        map_shard(data: DataFrame) -> pd.Series:
+            Count the posts of a shard in the groups.
+
+        merge(left: pd.Series, right: pd.Series) -> pd.Series:
+            Merge the counts of two shards.
+
+        finalize(counts: pd.Series) -> DataFrame:
+            Prepare the table of the counts.
+
+        preview(data: DataFrame, sample: StratifiedSample, confidence: float) -> DataFrame:
+            Estimate the number of posts in the groups from a stratified sample of the posts.
+    """
+    columns = ['gender', 'age', 'topic', 'sign']
+    estimates_preview = True
+    group_columns = ['gender', 'age_band', 'topic', 'sign']
+    age_bins = [0, 18, 25, 35, 45, np.inf]
+    age_labels = ['<18', '18-24', '25-34', '35-44', '45+']
+
+    def __init__(self):
+        """
+        Initialize the Task4 class.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        super().__init__()
+        self.task_method = self._task_method
+
+    def preprocess_data(self, data: DataFrame) -> DataFrame:
+        """
+        Preprocess the data for task 4. Assign the age bands, no filters are applied.
+
+        Args:
+            data (DataFrame): The input data.
+
+        Returns:
+            DataFrame: The group columns of the posts.
+        """
+        logger.info("Preprocessing data for task 4 - assigning age bands")
+        selected_data = data[['gender', 'topic', 'sign']].assign(
+            age_band=pd.cut(data['age'], bins=self.age_bins, labels=self.age_labels, right=False).astype(object))
+        logger.info(f"Selected {len(selected_data)} posts for task 4")
+        return selected_data[self.group_columns]
+
+    def _task_method(self, data: DataFrame) -> DataFrame:
+        """
+        Count the posts in the groups.
+
+        Args:
+            data (DataFrame): The preprocessed posts.
+
+        Returns:
+            DataFrame: The number of posts in every group.
+        """
+        logger.info("Counting posts by gender, age band, topic and sign")
+        return self.finalize(self.map_shard(data))
+
+    def map_shard(self, data: DataFrame) -> pd.Series:
+        """
+        Count the posts of a shard in the groups.
+
+        Args:
+            data (DataFrame): The preprocessed posts.
+
+        Returns:
+            pd.Series: The number of posts indexed by the groups.
+        """
+        with metrics.stage('count', len(data)):
+            # the posts with missing values are kept, every chart drops the missing values of its own columns
+            return data.groupby(self.group_columns, observed=True, dropna=False).size()
+
+    def merge(self, left: pd.Series, right: pd.Series) -> pd.Series:
+        """
+        Merge the counts of two shards.
+
+        Args:
+            left (pd.Series): The counts of the preceding shards.
+            right (pd.Series): The counts of the following shards.
+
+        Returns:
+            pd.Series: The merged counts.
+        """
+        return pd.concat([left, right]).groupby(level=self.group_columns, observed=True, dropna=False).sum()
+
+    def finalize(self, counts: pd.Series) -> DataFrame:
+        """
+        Prepare the table of the counts, sorted by the groups.
+
+        Args:
+            counts (pd.Series): The number of posts in every group.
+
+        Returns:
+            DataFrame: The group columns and the number of posts in the column 'count'.
+        """
+        return counts.rename('count').reset_index().sort_values(self.group_columns, ignore_index=True)
+
+    def preview(self, data: DataFrame, sample: StratifiedSample, confidence: float) -> DataFrame:
+        """
+        Estimate the number of posts in every group over all posts from a stratified sample of them,
+        with their confidence intervals. The groups without any sampled post are not estimated.
+
+        Args:
+            data (DataFrame): The sampled posts, loaded with the columns of the task.
+            sample (StratifiedSample): The sample, its strata are in the order of the rows of the data.
+            confidence (float): The confidence level of the intervals.
+
+        Returns:
+            DataFrame: The group columns, the estimated number of posts in the column 'count' and its confidence
+                interval and relative error, sorted by the groups.
+        """
+        groups = self.preprocess_data(data).groupby(self.group_columns, observed=True, dropna=False)
+        with metrics.stage('estimate', len(data)):
+            # the estimated total of the indicator of a group is the number of posts in the group
+            codes = groups.ngroup().to_numpy()
+            indicators = sparse.csr_matrix((np.ones(len(codes)), (np.arange(len(codes)), codes)),
+                                           shape=(len(codes), groups.ngroups))
+            counts, half_widths = sample.estimate_totals(indicators, confidence)
+        df = groups.size().rename('count').reset_index()
+        df['count'] = np.round(counts).astype(np.int64)
+        df['ci_low'] = np.maximum(counts - half_widths, 0)
+        df['ci_high'] = counts + half_widths
+        df['relative_error'] = half_widths / counts
+        return df.sort_values(self.group_columns, ignore_index=True)
@@ -0,0 +1,223 @@
+from .task import Task
+from utils.logging_utils import logger
+from utils.metrics import metrics
+from utils.extraction import get_extraction_engine
+from utils.text_processing import get_vocabulary_mask
+
+from scipy import sparse
+from pandas import DataFrame
+import numpy as np
+
+# the word counts of this many batches are summed before they are added to the word counts of the shard,
+# so the growing counts are not copied for every batch
+PENDING_BATCHES = 16
+
+
+class Task5(Task):
+    """
+    This class implements the author profiles. For every author it computes the number of posts, the total
+    and the distinct cleaned words, the type/token ratio, the average post length, the number and the sum
+    of the dollar amounts and the most common words. The authors are coded by integers and all per-author
+    values are computed by segmented array reductions over the posts and the words sorted by the author,
+    there is no loop over the authors.
+
+    Attributes:
+        task_method (callable): The method to be used for processing the data.
+        n_top_words (int): The number of the most common words of every author.
+        top_word_filter (dict): The predicates of the words counted as the most common words of an author,
+            see get_vocabulary_mask.
+        extraction_patterns (list[str]): The patterns of the extraction engine counted as the dollar amounts.
+
+    Methods:
+        preprocess_data(data: DataFrame) -> DataFrame:
+            Preprocess the data for task 5. No filters are applied.
+
+        _task_method(data: DataFrame) -> DataFrame:
+            Compute the profiles of the authors.
+
+        map_shard(data: DataFrame) -> dict:
+            Compute the partial profiles of the authors of a shard of the posts.
+
+        merge(left: dict, right: dict) -> dict:
+            Merge the partial profiles of two shards.
+
+        finalize(profiles: dict) -> DataFrame:
+            Compute the profile table from the partial profiles.
+    """
+    uses_token_store = True
+    columns = ['id', 'text']
+    results_format = 'parquet'
+    # the most common words of an author without the short function words
+    top_word_filter = {'min_length': 4}
+    extraction_patterns = ['usd']
+    # the per-post sums of the partial profiles, in the order of the profile columns
+    post_sums = ['posts', 'characters', 'dollar_count', 'dollar_sum']
+
+    def __init__(self, n_top_words: int = 5):
+        """
+        Initialize the Task5 class.
+
+        Args:
+            n_top_words (int): The number of the most common words of every author.
+
+        Returns:
+            None
+        """
+        super().__init__()
+        self.task_method = self._task_method
+        self.n_top_words = n_top_words
+
+    def preprocess_data(self, data: DataFrame) -> DataFrame:
+        """
+        Preprocess the data for task 5. No filters are applied.
+
+        Args:
+            data (DataFrame): The input data.
+
+        Returns:
+            DataFrame: The author IDs and the texts of the posts, indexed by the row positions of the posts.
+        """
+        logger.info("Preprocessing data for task 5 - selecting authors")
+        selected_data = data[self.columns].rename_axis('row')
+        logger.info(f"Selected {len(selected_data)} posts for task 5")
+        return selected_data
+
+    def _task_method(self, data: DataFrame) -> DataFrame:
+        """
+        Compute the profiles of the authors.
+
+        Args:
+            data (DataFrame): The preprocessed posts.
+
+        Returns:
+            DataFrame: The profiles of the authors.
+        """
+        logger.info("Processing texts - computing author profiles")
+        return self.finalize(self.map_shard(data))
+
+    def map_shard(self, data: DataFrame) -> dict:
+        """
+        Compute the partial profiles of the authors of a shard of the posts - the per-post sums and the counts
+        of the words of every author. The authors are coded by their position in the sorted author IDs
+        of the shard.
+
+        Args:
+            data (DataFrame): The preprocessed posts.
+
+        Returns:
+            dict: The sorted author IDs, the per-post sums of the authors (one row per author, one column
+                per post_sums) and the sparse matrix of the word counts of the authors.
+        """
+        authors, author_codes = np.unique(data['id'].to_numpy(), return_inverse=True)
+        with metrics.stage('extract', len(data)):
+            values = get_extraction_engine(tuple(self.extraction_patterns)).extract(data['text'])
+            amounts = values.loc[values['value'] != 0, 'value']
+            # the positions of the posts with the amounts in the shard
+            amount_posts = data.index.get_indexer(amounts.index)
+
+        with metrics.stage('aggregate', len(data)):
+            sums = np.zeros((len(authors), len(self.post_sums)))
+            sums[:, 0] = np.bincount(author_codes, minlength=len(authors))
+            sums[:, 1] = np.bincount(author_codes, weights=data['text'].str.len().fillna(0).to_numpy(),
+                                     minlength=len(authors))
+            sums[:, 2] = np.bincount(author_codes[amount_posts], minlength=len(authors))
+            sums[:, 3] = np.bincount(author_codes[amount_posts], weights=amounts.to_numpy(), minlength=len(authors))
+
+        vocabulary_size = len(self.get_cleaned_words_vocabulary())
+        word_counts = sparse.csr_matrix((len(authors), vocabulary_size), dtype=np.int64)
+        pending = []
+        start = 0
+        for token_ids, lengths in self.iter_cleaned_post_token_id_batches(self.select_posts(data)):
+            with metrics.stage('aggregate', len(token_ids)):
+                token_authors = np.repeat(author_codes[start:start + len(lengths)], lengths)
+                # the duplicate (author, word) pairs are summed by the conversion, a single sort of the pairs
+                pending.append(sparse.csr_matrix((np.ones(len(token_ids), dtype=np.int64), (token_authors, token_ids)),
+                                                 shape=word_counts.shape))
+                if len(pending) == PENDING_BATCHES:
+                    word_counts = word_counts + sum(pending[1:], pending[0])
+                    pending = []
+            start += len(lengths)
+        if pending:
+            word_counts = word_counts + sum(pending[1:], pending[0])
+        return {'authors': authors, 'sums': sums, 'word_counts': word_counts}
+
+    def merge(self, left: dict, right: dict) -> dict:
+        """
+        Merge the partial profiles of two shards, the authors of both shards are coded again by their position
+        in the union of the author IDs.
+
+        Args:
+            left (dict): The partial profiles of the preceding shards.
+            right (dict): The partial profiles of the following shards.
+
+        Returns:
+            dict: The merged partial profiles.
+        """
+        authors = np.union1d(left['authors'], right['authors'])
+        sums = np.zeros((len(authors), len(self.post_sums)))
+        word_counts = sparse.csr_matrix((len(authors), left['word_counts'].shape[1]), dtype=np.int64)
+        for partial in (left, right):
+            codes = np.searchsorted(authors, partial['authors'])
+            sums[codes] += partial['sums']
+            # the rows of the authors of the partial result moved to the merged codes
+            recoding = sparse.csr_matrix((np.ones(len(codes), dtype=np.int64), (codes, np.arange(len(codes)))),
+                                         shape=(len(authors), len(codes)))
+            word_counts += recoding @ partial['word_counts']
+        return {'authors': authors, 'sums': sums, 'word_counts': word_counts}
+
+    def finalize(self, profiles: dict) -> DataFrame:
+        """
+        Compute the profile table from the partial profiles of all posts. The most common words of all authors
+        are selected by one sort of the word counts by the author, the count and the word.
+
+        Args:
+            profiles (dict): The partial profiles of all posts.
+
+        Returns:
+            DataFrame: One row per author with the columns author, posts, tokens, distinct_tokens, type_token_ratio,
+                average_post_length (in characters), dollar_count, dollar_sum and top_words (separated by spaces),
+                sorted by the author ID.
+        """
+        authors, sums, word_counts = profiles['authors'], profiles['sums'], profiles['word_counts'].tocsr()
+        word_counts.eliminate_zeros()
+        with metrics.stage('aggregate', word_counts.nnz):
+            tokens = np.asarray(word_counts.sum(axis=1)).ravel()
+            distinct_tokens = np.diff(word_counts.indptr)
+
+        with metrics.stage('sort', word_counts.nnz):
+            vocabulary = self.get_cleaned_words_vocabulary()
+            word_authors = np.repeat(np.arange(len(authors)), distinct_tokens)
+            keep = get_vocabulary_mask(vocabulary, **self.top_word_filter)[word_counts.indices]
+            word_authors, words, counts = word_authors[keep], word_counts.indices[keep], word_counts.data[keep]
+            # the words of every author by the descending count, words with the same count in the alphabetical order,
+            # so the order does not depend on the vocabulary of the token IDs
+            alphabetical = np.empty(len(vocabulary), dtype=np.int64)
+            alphabetical[np.argsort(vocabulary.astype(str), kind='stable')] = np.arange(len(vocabulary))
+            order = np.lexsort((alphabetical[words], -counts, word_authors))
+            word_authors, words = word_authors[order], words[order]
+            author_starts = np.searchsorted(word_authors, np.arange(len(authors)))
+            ranks = np.arange(len(words)) - author_starts[word_authors]
+            top = ranks < self.n_top_words
+            word_authors, words = word_authors[top], words[top]
+
+            # the top words of every author joined by a segmented sum of the strings
+            top_words = np.full(len(authors), '', dtype=object)
+            with_words, segment_starts = np.unique(word_authors, return_index=True)
+            if len(words):
+                separated = np.char.add(vocabulary[words].astype(str), ' ').astype(object)
+                top_words[with_words] = np.char.rstrip(np.add.reduceat(separated, segment_starts).astype(str))
+
+        posts = sums[:, 0].astype(np.int64)
+        df = DataFrame({
+            'author': authors,
+            'posts': posts,
+            'tokens': tokens,
+            'distinct_tokens': distinct_tokens,
+            'type_token_ratio': np.divide(distinct_tokens, tokens, out=np.zeros(len(authors)), where=tokens > 0),
+            'average_post_length': sums[:, 1] / np.maximum(posts, 1),
+            'dollar_count': sums[:, 2].astype(np.int64),
+            'dollar_sum': sums[:, 3],
+            'top_words': top_words,
+        })
+        logger.info(f"Profiles of {len(df)} authors")
+        return df
@@ -0,0 +1,29 @@
+import os
+import sys
+
+# the tests import the project packages the same way as main.py, from the project directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def posts() -> pd.DataFrame:
+    # posts with the schema of blogtext.csv, a part of them with dollar amounts
+    generator = np.random.default_rng(0)
+    n_posts = 600
+    words = np.array(['money', 'market', 'blog', 'today', 'price', 'friends', 'school', 'music'])
+    amounts = np.array(['$5', '$1,200', '$3.5m', '$2 billion', '$40k', '$0.99', '$7 bn', ''])
+    texts = [' '.join(generator.choice(words, 12)) + ' ' + ' '.join(generator.choice(amounts, 2))
+             for _ in range(n_posts)]
+    return pd.DataFrame({
+        'id': generator.integers(1000, 1030, n_posts),
+        'gender': generator.choice(['male', 'female'], n_posts),
+        'age': generator.integers(13, 48, n_posts),
+        'topic': generator.choice(['Arts', 'Technology', 'Student', 'indUnk'], n_posts),
+        'sign': generator.choice(['Aries', 'Taurus', 'Leo'], n_posts),
+        'date': [f"{day},May,2004" for day in generator.integers(1, 29, n_posts)],
+        'text': texts,
+    })
@@ -0,0 +1,76 @@
+from tasks.checkpoint import ShardCheckpoint
+from tasks import Task3
+import pandas as pd
+import pytest
+
+
+class Interrupted(Exception):
+    pass
+
+
+def create_task(checkpoint: ShardCheckpoint, interrupt_after: int | None = None) -> tuple[Task3, list[int]]:
+    # the task records the sizes of the shards it maps, and it is interrupted after the given number of them,
+    # as by a preempted machine
+    task = Task3()
+    task.checkpoint_shard_size = 50
+    task.checkpoint = checkpoint
+    mapped = []
+    map_shard = task.map_shard
+
+    def interrupted_map_shard(items):
+        if len(mapped) == interrupt_after:
+            raise Interrupted()
+        mapped.append(len(items))
+        return map_shard(items)
+
+    task.map_shard = interrupted_map_shard
+    return task, mapped
+
+
+def assert_results_equal(result: dict, expected: dict):
+    assert result.keys() == expected.keys()
+    for name in expected:
+        pd.testing.assert_frame_equal(result[name], expected[name])
+
+
+def test_checkpoint_saves_loads_and_clears(tmp_path):
+    checkpoint = ShardCheckpoint(str(tmp_path / 'Task3'))
+    assert checkpoint.load('items-0-10') is None
+    checkpoint.save('items-0-10', {'partial': [1, 2]})
+    assert checkpoint.load('items-0-10') == {'partial': [1, 2]}
+    # a truncated checkpoint is computed again instead of failing the run
+    (tmp_path / 'Task3' / 'items-10-20.pkl').write_bytes(b'')
+    assert checkpoint.load('items-10-20') is None
+    checkpoint.clear()
+    assert not (tmp_path / 'Task3').exists()
+
+
+def test_interrupted_run_resumes_from_completed_shards(tmp_path, posts):
+    expected = Task3().task_method(Task3().preprocess_data(posts))
+    checkpoint = ShardCheckpoint(str(tmp_path / 'Task3'))
+
+    task, _ = create_task(checkpoint, interrupt_after=4)
+    with pytest.raises(Interrupted):
+        task.run_checkpointed(task.preprocess_data(posts))
+
+    task, mapped = create_task(checkpoint)
+    result = task.run_checkpointed(task.preprocess_data(posts))
+    # just the 8 of 12 shards not completed before the interruption are mapped again
+    assert mapped == [50] * 8
+    assert_results_equal(result, expected)
+
+
+def test_interrupted_streaming_run_resumes_after_completed_chunks(tmp_path, posts):
+    expected = Task3().task_method(Task3().preprocess_data(posts))
+    checkpoint = ShardCheckpoint(str(tmp_path / 'Task3'))
+    chunks = [posts.iloc[start:start + 100] for start in range(0, len(posts), 100)]
+
+    task, _ = create_task(checkpoint, interrupt_after=2)
+    with pytest.raises(Interrupted):
+        task.run_streaming(iter(chunks), workers=1)
+
+    task, mapped = create_task(checkpoint)
+    result = task.run_streaming(iter(chunks), workers=1)
+    # the chunks merged before the interruption are skipped
+    assert mapped == [100] * 4
+    assert_results_equal(result, expected)
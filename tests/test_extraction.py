@@ -0,0 +1,66 @@
+from utils.consts import dollar_pattern
+from utils.extraction import ExtractionEngine
+from utils.finance_utils import parse_dollar_amount
+import pandas as pd
+import random
+import pytest
+
+TEXTS = [
+    "It cost $5m, then $5 million and finally $5-bn.",
+    "Prices: $1,000, $1,000.50, $12,345,678.9 and $1234,567.",
+    "The fee was $3.5K or $2 thousand, the loan $7 bill and $7 Billion.",
+    "Refunds of -$20 and ($35) and $(40) are still amounts.",
+    "Nothing here, just $ signs $ and $, and 5 dollars.",
+    "A price of $0 and $0.00 is no amount, $00.5 is one.",
+    "Glued $5M$6B$7K and $8mbn and $9 millionaire.",
+    "",
+]
+# the dollar sign is repeated, so the random texts contain many amounts
+FRAGMENTS = ["$", "$", "$", "5", "12", ",", "000", ".", "75", "m", "M", "bn", " million", " Billion", "-", " ",
+             "thousand", "(", ")", "k", "x", "USD", "€", "%"]
+
+
+def get_baseline_amounts(text: str) -> list[float]:
+    # the non-zero amounts summed by Task3 before the extraction engine, in the order of the matches
+    amounts = [parse_dollar_amount(match.group()) for match in dollar_pattern.finditer(text)]
+    return [amount for amount in amounts if amount]
+
+
+def get_engine_amounts(texts: list[str], patterns: list[str] | None = None) -> list[list[float]]:
+    values = ExtractionEngine(patterns or ['usd']).extract(pd.Series(texts))
+    values = values[values['value'] != 0]
+    return [values.loc[values.index == position, 'value'].tolist() for position in range(len(texts))]
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_usd_amounts_match_baseline(text):
+    assert get_engine_amounts([text]) == [get_baseline_amounts(text)]
+
+
+def test_usd_amounts_match_baseline_on_random_texts():
+    generator = random.Random(0)
+    texts = [''.join(generator.choices(FRAGMENTS, k=generator.randint(0, 40))) for _ in range(2000)]
+    assert get_engine_amounts(texts) == [get_baseline_amounts(text) for text in texts]
+
+
+@pytest.mark.parametrize('text, amount', [
+    ("$5m", 5e6), ("$5 million", 5e6), ("$5M", 5e6), ("$5 - million", 5e6),
+    ("$2bn", 2e9), ("$2 bill", 2e9), ("$2B", 2e9), ("$3k", 3e3), ("$3 thousand", 3e3),
+    ("-$4", 4), ("($4)", 4), ("$1,234.5", 1234.5),
+])
+def test_usd_magnitudes_and_signs(text, amount):
+    # the sign and the parentheses of negative amounts are not a part of the match, as in parse_dollar_amount
+    assert get_engine_amounts([text]) == [[amount]]
+
+
+def test_overlapping_match_is_dropped():
+    # the number 5 of $5% is a part of the dollar amount, so it is not extracted as a percentage as well
+    values = ExtractionEngine(['usd', 'percent']).extract(pd.Series(["$5% and 7%"]))
+    assert values['pattern'].tolist() == ['usd', 'percent']
+    assert values['value'].tolist() == [5, 7]
+
+
+def test_values_keep_index_labels_of_texts():
+    values = ExtractionEngine(['usd']).extract(pd.Series(["$1", None, "$2 and $3"], index=[10, 20, 30]))
+    assert values.index.tolist() == [10, 30, 30]
+    assert values['value'].tolist() == [1, 2, 3]
@@ -0,0 +1,79 @@
+from tasks.ingestion import Ingestor
+from tasks import Task3, Task4
+from utils.data_utils import RESULTS_DIRECTORY_VARIABLE
+from utils.dataset_utils import load_dataset_to_dataframe
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def batches(tmp_path, posts) -> list[str]:
+    # the posts split into three batch files
+    paths = []
+    for position, start in enumerate(range(0, len(posts), 200)):
+        path = tmp_path / f"batch-{position}.csv"
+        posts.iloc[start:start + 200].to_csv(path, index=False)
+        paths.append(str(path))
+    return paths
+
+
+def get_expected_results(task, paths: list[str]) -> dict[str, pd.DataFrame]:
+    # the results of the task run on all batches at once
+    data = pd.concat([load_dataset_to_dataframe(path, columns=task.columns) for path in paths], ignore_index=True)
+    return get_results(task, task.task_method(task.preprocess_data(data)))
+
+
+def get_results(task, result) -> dict[str, pd.DataFrame]:
+    # the results by their output names sorted by their first column, the breakdowns of Task3 are sorted
+    # by their sums and the order of their ties depends on the batches
+    results = result if isinstance(result, dict) else {task.__class__.__name__: result}
+    return {name: results[name].sort_values(list(results[name].columns[:1]), kind='stable', ignore_index=True)
+            for name in task.output_names}
+
+
+def assert_results_equal(result: dict, expected: dict):
+    assert result.keys() == expected.keys()
+    for name in expected:
+        # the sums of the batches are added in another order than the sums of all posts
+        pd.testing.assert_frame_equal(result[name], expected[name], check_dtype=False, check_categorical=False)
+
+
+@pytest.mark.parametrize('task_class', [Task3, Task4])
+def test_ingested_batches_match_the_run_on_all_posts(tmp_path, batches, task_class):
+    ingestor = Ingestor([task_class()], directory=str(tmp_path / 'ingestion'))
+    assert all(ingestor.ingest(path) for path in batches)
+    task = ingestor.tasks[task_class.__name__]
+    result = get_results(task, task.finalize_state(ingestor.states[task_class.__name__]))
+    assert_results_equal(result, get_expected_results(task_class(), batches))
+
+
+def test_ingestion_resumes_from_the_saved_states(tmp_path, batches, monkeypatch):
+    directory = str(tmp_path / 'ingestion')
+    ingestor = Ingestor([Task3()], directory=directory)
+    ingestor.ingest(batches[0])
+
+    # the ingestion of the second batch is interrupted while its states are saved
+    def interrupted_save_generation(ledger, states):
+        raise KeyboardInterrupt()
+
+    ingestor = Ingestor([Task3()], directory=directory)
+    monkeypatch.setattr(ingestor, '_save_generation', interrupted_save_generation)
+    with pytest.raises(KeyboardInterrupt):
+        ingestor.ingest(batches[1])
+
+    # the next run loads the states of the first batch, the batch already in the ledger is skipped
+    ingestor = Ingestor([Task3()], directory=directory)
+    assert ingestor.ledger['rows'] == 200
+    assert not ingestor.ingest(batches[0])
+    assert ingestor.ingest(batches[1]) and ingestor.ingest(batches[2])
+    assert [batch['rows'] for batch in ingestor.ledger['batches']] == [200, 200, 200]
+
+    task = ingestor.tasks['Task3']
+    result = get_results(task, task.finalize_state(ingestor.states['Task3']))
+    assert_results_equal(result, get_expected_results(Task3(), batches))
+
+    # the results of all outputs of the task are saved
+    monkeypatch.setenv(RESULTS_DIRECTORY_VARIABLE, str(tmp_path / 'results'))
+    ingestor.save_results()
+    assert sorted(path.name for path in (tmp_path / 'results').iterdir()) == \
+        sorted(f"{name}_results.csv" for name in task.output_names)
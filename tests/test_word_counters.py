@@ -0,0 +1,78 @@
+from utils.word_counters import ExactWordCounter, SpaceSavingWordCounter
+from collections import Counter
+from functools import reduce
+import numpy as np
+import pytest
+
+VOCABULARY_SIZE = 500
+
+
+def get_tokens(seed: int, n_tokens: int = 20_000) -> np.ndarray:
+    # Zipfian token IDs, like the words of the posts, with many ties among the rare tokens
+    generator = np.random.default_rng(seed)
+    return np.minimum(generator.zipf(1.3, n_tokens) - 1, VOCABULARY_SIZE - 1).astype(np.int64)
+
+
+def count_batches(counter_factory, tokens: np.ndarray, n_shards: int, batch_size: int):
+    # every shard is counted batch by batch, the counters of the shards are merged in their order
+    counters = []
+    for shard in np.array_split(tokens, n_shards):
+        counter = counter_factory()
+        for start in range(0, len(shard), batch_size):
+            counter.update(shard[start:start + batch_size])
+        counters.append(counter)
+    return reduce(lambda left, right: left.merge(right), counters)
+
+
+@pytest.mark.parametrize('n_shards, batch_size', [(1, 20_000), (1, 777), (3, 1000), (7, 50)])
+def test_exact_counter_matches_collections_counter(n_shards, batch_size):
+    tokens = get_tokens(0)
+    counter = count_batches(lambda: ExactWordCounter(VOCABULARY_SIZE), tokens, n_shards, batch_size)
+    # tokens with the same count are ordered by their first occurrence, as by Counter.most_common
+    expected = [(token_id, count, 0) for token_id, count in Counter(tokens.tolist()).most_common(100)]
+    assert counter.most_common(100) == expected
+    assert counter.n_tokens == len(tokens)
+
+
+def test_exact_counter_of_empty_batches():
+    counter = ExactWordCounter(VOCABULARY_SIZE)
+    counter.update(np.zeros(0, dtype=np.int64))
+    assert counter.most_common(10) == []
+    assert counter.merge(ExactWordCounter(VOCABULARY_SIZE)).n_tokens == 0
+
+
+def test_exact_counters_of_different_vocabularies_are_not_merged():
+    with pytest.raises(ValueError):
+        ExactWordCounter(VOCABULARY_SIZE).merge(ExactWordCounter(VOCABULARY_SIZE + 1))
+
+
+@pytest.mark.parametrize('capacity, n_shards, batch_size', [(50, 1, 20_000), (50, 1, 500), (100, 4, 1000),
+                                                            (20, 9, 300)])
+def test_space_saving_counter_bounds_the_counts(capacity, n_shards, batch_size):
+    tokens = get_tokens(1)
+    counter = count_batches(lambda: SpaceSavingWordCounter(capacity), tokens, n_shards, batch_size)
+    true_counts = Counter(tokens.tolist())
+    assert counter.n_tokens == len(tokens)
+    assert len(counter.token_ids) <= capacity
+    # the counts never underestimate, the true count is at least the count minus its error
+    for token_id, count, error in counter.most_common(capacity):
+        assert count - error <= true_counts[token_id] <= count
+    # every token occurring more than n_tokens / capacity times is monitored
+    monitored = set(counter.token_ids.tolist())
+    assert {token_id for token_id, count in true_counts.items() if count > len(tokens) / capacity} <= monitored
+    # a token which is not monitored occurs at most max_error times
+    assert all(count <= counter.max_error for token_id, count in true_counts.items() if token_id not in monitored)
+
+
+def test_space_saving_counter_is_exact_within_its_capacity():
+    tokens = get_tokens(2)
+    counter = count_batches(lambda: SpaceSavingWordCounter(VOCABULARY_SIZE), tokens, 5, 1000)
+    exact = count_batches(lambda: ExactWordCounter(VOCABULARY_SIZE), tokens, 1, len(tokens))
+    assert counter.max_error == 0
+    # the ties are ordered by the token ID instead of the first occurrence, so the counts are compared as sets
+    assert set(counter.most_common(VOCABULARY_SIZE)) == set(exact.most_common(VOCABULARY_SIZE))
+
+
+def test_space_saving_counter_needs_positive_capacity():
+    with pytest.raises(ValueError):
+        SpaceSavingWordCounter(0)
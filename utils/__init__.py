@@ -1,14 +1,39 @@
-from .dataset_utils import download_dataset, load_dataset_to_dataframe
-from .text_processing import get_cleaned_words_from_text
-from .finance_utils import parse_dollar_amount
-from .logging_utils import logger
-from .consts import dollar_pattern
-
-__all__ = [
-    "download_dataset",
-    "load_dataset_to_dataframe",
-    "get_cleaned_words_from_text",
-    "parse_dollar_amount",
-    "logger",
-    "dollar_pattern",
-]
\ No newline at end of file
+import importlib
+
+# the submodules are imported on the first access of their names, so importing one helper does not load
+# the dependencies of all the others (e.g. kagglehub, pyarrow or the English vocabulary)
+_LAZY_IMPORTS = {
+    "download_dataset": ".dataset_utils",
+    "load_dataset_to_dataframe": ".dataset_utils",
+    "load_dataset_rows": ".dataset_utils",
+    "get_dataset_fingerprint": ".dataset_utils",
+    "iter_dataset_chunks": ".dataset_utils",
+    "iter_dataset_texts": ".dataset_utils",
+    "convert_dataset_to_parquet": ".dataset_utils",
+    "get_cleaned_words_from_text": ".text_processing",
+    "get_cleaned_token_ids_from_texts": ".text_processing",
+    "normalize_words": ".normalization",
+    "TokenNormalizer": ".normalization",
+    "parse_dollar_amount": ".finance_utils",
+    "ExtractionEngine": ".extraction",
+    "get_extraction_engine": ".extraction",
+    "logger": ".logging_utils",
+    "TokenStore": ".token_store",
+    "load_or_build_token_store": ".token_store",
+    "dollar_pattern": ".consts",
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+    # later accesses do not go through __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -1,9 +1,45 @@
-import re
-
-"""
-This file contains constants used in the project.
-"""
-
-dollar_pattern = re.compile(
-    r"\$(\d{1,3}(?:,\d{3})*(?:\.\d+)?|\d+(?:\.\d+)?|\d+)([MBK]|\s*[-]?\s*(million|billion|thousand|bill|bn))?",
-    re.IGNORECASE)
\ No newline at end of file
+import re
+
+"""
+This file contains constants used in the project.
+"""
+
+dollar_pattern = re.compile(
+    r"\$(\d{1,3}(?:,\d{3})*(?:\.\d+)?|\d+(?:\.\d+)?|\d+)([MBK]|\s*[-]?\s*(million|billion|thousand|bill|bn))?",
+    re.IGNORECASE)
+
+# month names of the blog dates ("14,May,2004"), the bloggers' locales produced the names in many languages
+month_names = {
+    'english': ['january', 'february', 'march', 'april', 'may', 'june', 'july', 'august', 'september', 'october',
+                'november', 'december'],
+    'german': ['januar', 'februar', 'märz', 'april', 'mai', 'juni', 'juli', 'august', 'september', 'oktober',
+               'november', 'dezember'],
+    'french': ['janvier', 'février', 'mars', 'avril', 'mai', 'juin', 'juillet', 'août', 'septembre', 'octobre',
+               'novembre', 'décembre'],
+    'spanish': ['enero', 'febrero', 'marzo', 'abril', 'mayo', 'junio', 'julio', 'agosto', 'septiembre', 'octubre',
+                'noviembre', 'diciembre'],
+    'italian': ['gennaio', 'febbraio', 'marzo', 'aprile', 'maggio', 'giugno', 'luglio', 'agosto', 'settembre',
+                'ottobre', 'novembre', 'dicembre'],
+    'portuguese': ['janeiro', 'fevereiro', 'março', 'abril', 'maio', 'junho', 'julho', 'agosto', 'setembro',
+                   'outubro', 'novembro', 'dezembro'],
+    'dutch': ['januari', 'februari', 'maart', 'april', 'mei', 'juni', 'juli', 'augustus', 'september', 'oktober',
+              'november', 'december'],
+    'swedish': ['januari', 'februari', 'mars', 'april', 'maj', 'juni', 'juli', 'augusti', 'september', 'oktober',
+                'november', 'december'],
+    'norwegian': ['januar', 'februar', 'mars', 'april', 'mai', 'juni', 'juli', 'august', 'september', 'oktober',
+                  'november', 'desember'],
+    'finnish': ['tammikuu', 'helmikuu', 'maaliskuu', 'huhtikuu', 'toukokuu', 'kesäkuu', 'heinäkuu', 'elokuu',
+                'syyskuu', 'lokakuu', 'marraskuu', 'joulukuu'],
+    'estonian': ['jaanuar', 'veebruar', 'märts', 'aprill', 'mai', 'juuni', 'juuli', 'august', 'september',
+                 'oktoober', 'november', 'detsember'],
+    'polish': ['styczeń', 'luty', 'marzec', 'kwiecień', 'maj', 'czerwiec', 'lipiec', 'sierpień', 'wrzesień',
+               'październik', 'listopad', 'grudzień'],
+    'czech': ['leden', 'únor', 'březen', 'duben', 'květen', 'červen', 'červenec', 'srpen', 'září', 'říjen',
+              'listopad', 'prosinec'],
+    'romanian': ['ianuarie', 'februarie', 'martie', 'aprilie', 'mai', 'iunie', 'iulie', 'august', 'septembrie',
+                 'octombrie', 'noiembrie', 'decembrie'],
+    'turkish': ['ocak', 'şubat', 'mart', 'nisan', 'mayıs', 'haziran', 'temmuz', 'ağustos', 'eylül', 'ekim',
+                'kasım', 'aralık'],
+    'indonesian': ['januari', 'februari', 'maret', 'april', 'mei', 'juni', 'juli', 'agustus', 'september',
+                   'oktober', 'november', 'desember'],
+}
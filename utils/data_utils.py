@@ -1,24 +1,80 @@
-from pandas import DataFrame
-from utils.logging_utils import logger
-import os
-
-
-def save_results(task_name: str, results: DataFrame) -> None:
-    """
-    Save the results to a file.
-
-    Args:
-        task_name (str): The ID of the task.
-        results (str): The results to be saved.
-
-    Returns:
-        None
-    """
-    os.makedirs("results", exist_ok=True)
-    # Define the output file path
-    output_file_path = f"results/{task_name}_results.csv"
-
-    # Save the results to a CSV file
-    results.to_csv(output_file_path, index=False)
-
-    logger.info(f"Results saved to {output_file_path}")
+from pandas import DataFrame
+from utils.logging_utils import logger
+from itertools import islice
+from typing import Iterable, Iterator
+import os
+
+# environment variable with the directory of the results, inherited by the task processes and the web app
+RESULTS_DIRECTORY_VARIABLE = "BLOG_CORPUS_RESULTS_DIR"
+
+
+def get_results_directory() -> str:
+    """
+    Get the directory of the results. It is set by the environment variable BLOG_CORPUS_RESULTS_DIR,
+    so the task processes and the web app started by the main process save and read the same results.
+
+    Args:
+        None
+
+    Returns:
+        str: The directory of the results, 'results' in the working directory by default.
+    """
+    return os.environ.get(RESULTS_DIRECTORY_VARIABLE, "results")
+
+
+def get_results_filename(task_name: str, file_format: str = 'csv') -> str:
+    """
+    Get the name of the file with the results of a task.
+
+    Args:
+        task_name (str): The ID of the task.
+        file_format (str): The file format of the results, 'csv' or 'parquet'.
+
+    Returns:
+        str: The file name of the results.
+    """
+    return f"{task_name}_results.{file_format}"
+
+
+def save_results(task_name: str, results: DataFrame, file_format: str = 'csv') -> None:
+    """
+    Save the results to a file.
+
+    Args:
+        task_name (str): The ID of the task.
+        results (str): The results to be saved.
+        file_format (str): The file format of the results - 'csv', or 'parquet' for large tables read
+            by columns and pages.
+
+    Returns:
+        None
+    """
+    os.makedirs(get_results_directory(), exist_ok=True)
+    # Define the output file path
+    output_file_path = os.path.join(get_results_directory(), get_results_filename(task_name, file_format))
+
+    # Save the results to a CSV or a Parquet file
+    if file_format == 'parquet':
+        results.to_parquet(output_file_path, index=False)
+    elif file_format == 'csv':
+        results.to_csv(output_file_path, index=False)
+    else:
+        raise ValueError(f"Unsupported results format: {file_format}.")
+
+    logger.info(f"Results saved to {output_file_path}")
+
+
+def iter_batches(items: Iterable, batch_size: int) -> Iterator[list]:
+    """
+    Split the items into batches of fixed size, the last batch can be smaller.
+
+    Args:
+        items (Iterable): The items to be split.
+        batch_size (int): The number of items in one batch.
+
+    Returns:
+        Iterator[list]: The batches of the items.
+    """
+    iterator = iter(items)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
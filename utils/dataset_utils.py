@@ -1,50 +1,522 @@
-import kagglehub
-import pandas as pd
-import os
-
-
-def download_dataset(dataset_name: str) -> str:
-    """
-    Downloads the specified dataset from Kaggle and returns the path to the downloaded files.
-
-    Args:
-        dataset_name (str): The name of the dataset to download.
-
-    Returns:
-        str: The path to the downloaded dataset files.
-    """
-    # download dataset
-    path = kagglehub.dataset_download(dataset_name)
-
-    return path
-
-def load_dataset_to_dataframe(path_to_dataset: str) -> pd.DataFrame:
-    """
-    Loads the dataset from the specified path into a pandas DataFrame.
-
-    Args:
-        path_to_dataset (str): The path to the dataset files.
-
-    Returns:
-        pd.DataFrame: The loaded dataset as a pandas DataFrame.
-    """
-    df = None
-    for file in os.listdir(path_to_dataset):
-        path_to_dataset = os.path.join(path_to_dataset, file)
-        if file.endswith(".csv"):
-            # load dataset
-            df = pd.read_csv(path_to_dataset)
-            break
-        elif file.endswith('.xlsx'):
-            # load dataset
-            df = pd.read_excel(path_to_dataset)
-            break
-        else:
-            raise ValueError(f"Unsupported file format: {file}. Only .csv and .xlsx files are supported.")
-    if df is None:
-        raise ValueError("No valid dataset file found in the specified path.")
-    if os.path.exists(path_to_dataset):
-        # add the dataset path to ENVIRONMENT params to use it streamlit
-        os.environ['DATASET_PATH_TIPSPORT'] = path_to_dataset
-
-    return df
\ No newline at end of file
+from utils.consts import month_names
+from utils.logging_utils import logger
+import pandas as pd
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Iterator
+from config import cache_directory
+import pyarrow.parquet as pq
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow as pa
+import operator
+import hashlib
+import json
+import os
+
+# directory inside the dataset directory with the columnar copy of the dataset
+COLUMNAR_DIRECTORY_NAME = "_columnar"
+
+# column types of the columnar copy of the dataset
+COLUMNAR_DTYPES = {
+    'id': 'int32',
+    'gender': 'category',
+    'age': 'int16',
+    'topic': 'category',
+    'sign': 'category',
+}
+
+# column types of the dataset files read by Arrow, the categorical columns are dictionary encoded
+ARROW_TYPES = {
+    'id': pa.int32(),
+    'gender': pa.dictionary(pa.int32(), pa.string()),
+    'age': pa.int16(),
+    'topic': pa.dictionary(pa.int32(), pa.string()),
+    'sign': pa.dictionary(pa.int32(), pa.string()),
+    'date': pa.string(),
+    'text': pa.string(),
+}
+
+# extensions of the dataset files, a dataset can be split to many files of any of these formats
+DATASET_FILE_EXTENSIONS = ('.csv', '.csv.gz', '.parquet', '.xlsx')
+
+# month numbers by the lower-case month names of all languages
+MONTH_NUMBERS = {name: month for names in month_names.values() for month, name in enumerate(names, start=1)}
+
+FILTER_OPERATORS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+
+def download_dataset(dataset_name: str) -> str:
+    """
+    Downloads the specified dataset from Kaggle and returns the path to the downloaded files.
+
+    Args:
+        dataset_name (str): The name of the dataset to download.
+
+    Returns:
+        str: The path to the downloaded dataset files.
+    """
+    # kagglehub is imported just for the download, the processes reading the local dataset do not need it
+    import kagglehub
+
+    # download dataset
+    path = kagglehub.dataset_download(dataset_name)
+
+    return path
+
+
+def load_dataset_to_dataframe(path_to_dataset: str, columns: list[str] | None = None,
+                              filters: list[tuple] | None = None, parse_dates: bool = False,
+                              workers: int | None = None) -> pd.DataFrame:
+    """
+    Loads the dataset from the specified path into a pandas DataFrame. If the columnar copy of the dataset
+    exists, only the requested columns are read from it and the filters are applied during the read.
+    Otherwise all files of the dataset (csv, csv.gz, parquet and xlsx shards) are read concurrently with typed
+    columns, concatenated in the order of their names and filtered. The index of the DataFrame holds
+    the row positions in the whole dataset.
+
+    Args:
+        path_to_dataset (str): The path to the dataset file or to the directory with the dataset files.
+        columns (list[str] | None): The columns to load, all columns are loaded if None.
+        filters (list[tuple] | None): The row filters as (column, operator, value) tuples combined by AND,
+            e.g. [('age', '>=', 20)]. Supported operators are ==, !=, <, <=, >, >= and in.
+        parse_dates (bool): Whether to convert the blog dates in the date column to datetimes, see parse_blog_dates.
+        workers (int | None): The number of threads reading the dataset files, the number of CPUs if None.
+
+    Returns:
+        pd.DataFrame: The loaded dataset as a pandas DataFrame.
+    """
+    columnar_path = get_columnar_dataset_path(path_to_dataset)
+    if columnar_path is not None and os.path.exists(columnar_path):
+        # the dates are stored as the raw strings, which do not sort like the dates, so the date filters
+        # are applied to the parsed dates after the read
+        date_filters = [condition for condition in filters or [] if condition[0] == 'date']
+        pushed_filters = [condition for condition in filters or [] if condition[0] != 'date']
+        read_columns = columns
+        if columns is not None and date_filters and 'date' not in columns:
+            read_columns = list(columns) + ['date']
+        df = pd.read_parquet(columnar_path, columns=read_columns, filters=pushed_filters or None)
+        df = apply_filters(df, date_filters)
+        if columns is not None:
+            df = df[columns]
+    else:
+        files = list_dataset_files(path_to_dataset)
+        if not files:
+            raise ValueError("No valid dataset file found in the specified path.")
+        read_columns = None
+        if columns is not None:
+            # the filtered columns have to be loaded as well, they are dropped after filtering
+            read_columns = list(columns) + [column for column, _, _ in filters or [] if column not in columns]
+
+        # Arrow parses the files without holding the GIL, the files are read in parallel by threads
+        with ThreadPoolExecutor(max_workers=min(len(files), workers or os.cpu_count() or 1)) as executor:
+            tables = list(executor.map(partial(read_dataset_file, columns=read_columns), files))
+        # the tables are concatenated without copying, the columns are converted to pandas just once
+        df = pa.concat_tables(tables).to_pandas(split_blocks=True, self_destruct=True)
+        del tables
+        df.index = pd.RangeIndex(len(df), name='row')
+        sort_categories(df)
+        df = apply_filters(df, filters)
+        if columns is not None:
+            df = df[columns]
+
+    if parse_dates and 'date' in df.columns:
+        df['date'] = parse_blog_dates(df['date'])
+    return df
+
+
+def load_dataset_rows(path_to_dataset: str, rows: np.ndarray, columns: list[str] | None = None) -> pd.DataFrame:
+    """
+    Loads the rows at the given positions of the dataset, e.g. the rows of a sample. The dataset is read
+    in row groups (or in blocks of the files without the columnar copy) and just the selected rows of every
+    block are kept, so only one block of the unselected rows is in memory at once.
+
+    Args:
+        path_to_dataset (str): The path to the dataset file or to the directory with the dataset files.
+        rows (np.ndarray): The sorted row positions in the whole dataset.
+        columns (list[str] | None): The columns to load, all columns are loaded if None.
+
+    Returns:
+        pd.DataFrame: The rows in the order of their positions, the index holds the positions.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    tables = []
+    start = 0
+    columnar_path = get_columnar_dataset_path(path_to_dataset)
+    if columnar_path is not None and os.path.exists(columnar_path):
+        parquet_file = pq.ParquetFile(columnar_path)
+        # the row positions are the index of the df, the stored positions are not read
+        read_columns = [column for column in parquet_file.schema_arrow.names if column != 'row'] \
+            if columns is None else list(columns)
+        for i in range(parquet_file.num_row_groups):
+            size = parquet_file.metadata.row_group(i).num_rows
+            selected = rows[np.searchsorted(rows, start):np.searchsorted(rows, start + size)] - start
+            if len(selected):
+                # the row groups without the selected rows are not read at all
+                tables.append(parquet_file.read_row_group(i, columns=read_columns).take(pa.array(selected)))
+            start += size
+        if not tables:
+            tables.append(parquet_file.schema_arrow.empty_table().select(read_columns))
+    else:
+        files = list_dataset_files(path_to_dataset)
+        if not files:
+            raise ValueError("No valid dataset file found in the specified path.")
+        for path in files:
+            for block in iter_dataset_file_blocks(path, columns=columns):
+                # the row positions continue across the blocks and the files
+                selected = rows[np.searchsorted(rows, start):np.searchsorted(rows, start + block.num_rows)] - start
+                tables.append(block.take(pa.array(selected)))
+                start += block.num_rows
+
+    df = pa.concat_tables(tables).to_pandas(ignore_metadata=True)
+    df.index = pd.Index(rows[rows < start], name='row')
+    sort_categories(df)
+    if columns is not None:
+        df = df[columns]
+    return df
+
+
+def iter_dataset_file_blocks(path: str, columns: list[str] | None = None) -> Iterator[pa.Table]:
+    """
+    Streams one file of the dataset in blocks of rows with the column types of ARROW_TYPES, see read_dataset_file.
+
+    Args:
+        path (str): The path to the csv, csv.gz, parquet or xlsx file.
+        columns (list[str] | None): The columns to read, all columns are read if None.
+
+    Returns:
+        Iterator[pa.Table]: The blocks of the file in the order of the rows.
+    """
+    if path.endswith('.parquet'):
+        batches = pq.ParquetFile(path).iter_batches(columns=columns)
+    elif path.endswith('.xlsx'):
+        batches = iter([read_dataset_file(path, columns=columns)])
+    else:
+        batches = pa_csv.open_csv(
+            path,
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            convert_options=pa_csv.ConvertOptions(include_columns=columns, column_types=ARROW_TYPES,
+                                                  strings_can_be_null=True))
+    for batch in batches:
+        yield _cast_to_arrow_types(pa.Table.from_batches([batch]) if isinstance(batch, pa.RecordBatch) else batch)
+
+
+def sort_categories(df: pd.DataFrame) -> None:
+    """
+    Sorts the categories of the categorical columns in place like in the columnar copy of the dataset,
+    the values sort the same way as the strings.
+
+    Args:
+        df (pd.DataFrame): The loaded dataset.
+
+    Returns:
+        None
+    """
+    for column in df.select_dtypes('category').columns:
+        df[column] = df[column].cat.reorder_categories(sorted(df[column].cat.categories))
+
+
+def list_dataset_files(path_to_dataset: str) -> list[str]:
+    """
+    Get the files of the dataset sorted by their names. The directories (e.g. the columnar copy) and the files
+    of other formats are skipped.
+
+    Args:
+        path_to_dataset (str): The path to the dataset file or to the directory with the dataset files.
+
+    Returns:
+        list[str]: The paths of the dataset files.
+    """
+    if not os.path.isdir(path_to_dataset):
+        return [path_to_dataset]
+    files = []
+    for file in sorted(os.listdir(path_to_dataset)):
+        path = os.path.join(path_to_dataset, file)
+        if os.path.isdir(path):
+            # skip the directories with artifacts derived from the dataset
+            continue
+        if file.endswith(DATASET_FILE_EXTENSIONS):
+            files.append(path)
+        else:
+            logger.warning(f"Skipping {path}, only {', '.join(DATASET_FILE_EXTENSIONS)} files are supported.")
+    return files
+
+
+def read_dataset_file(path: str, columns: list[str] | None = None) -> pa.Table:
+    """
+    Reads one file of the dataset into an Arrow table with the column types of ARROW_TYPES, so the tables
+    of all files can be concatenated.
+
+    Args:
+        path (str): The path to the csv, csv.gz, parquet or xlsx file.
+        columns (list[str] | None): The columns to read, all columns are read if None.
+
+    Returns:
+        pa.Table: The columns of the file.
+    """
+    if path.endswith('.parquet'):
+        table = pq.read_table(path, columns=columns)
+    elif path.endswith('.xlsx'):
+        table = pa.Table.from_pandas(pd.read_excel(path, usecols=columns), preserve_index=False)
+    else:
+        # the compression of csv.gz files is detected from the extension, the texts can contain line breaks
+        table = pa_csv.read_csv(
+            path,
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            convert_options=pa_csv.ConvertOptions(include_columns=columns, column_types=ARROW_TYPES,
+                                                  strings_can_be_null=True))
+
+    return _cast_to_arrow_types(table)
+
+
+def _cast_to_arrow_types(table: pa.Table) -> pa.Table:
+    # the files of the other formats can hold the columns in other types, e.g. the xlsx files
+    for column, arrow_type in ARROW_TYPES.items():
+        index = table.schema.get_field_index(column)
+        if index < 0 or table.schema.field(index).type == arrow_type:
+            continue
+        if pa.types.is_dictionary(arrow_type):
+            values = pc.dictionary_encode(table.column(index).cast(arrow_type.value_type))
+        else:
+            values = table.column(index).cast(arrow_type)
+        table = table.set_column(index, column, values)
+    return table
+
+
+def apply_filters(df: pd.DataFrame, filters: list[tuple] | None) -> pd.DataFrame:
+    """
+    Applies the row filters to the DataFrame. The filters have the same format as the filters
+    pushed down to the columnar dataset. The raw blog dates are parsed before they are compared,
+    e.g. ('date', '>=', '2004-01-01') compares the dates and not the strings like 25,April,1999.
+
+    Args:
+        df (pd.DataFrame): The input data.
+        filters (list[tuple] | None): The row filters as (column, operator, value) tuples combined by AND.
+
+    Returns:
+        pd.DataFrame: The filtered data.
+    """
+    if not filters:
+        return df
+    mask = pd.Series(True, index=df.index)
+    for column, comparison, value in filters:
+        values = df[column]
+        if column == 'date':
+            if not pd.api.types.is_datetime64_any_dtype(values):
+                values = parse_blog_dates(values)
+            value = pd.to_datetime(value)
+        if comparison == 'in':
+            mask &= values.isin(value)
+        elif comparison in FILTER_OPERATORS:
+            mask &= FILTER_OPERATORS[comparison](values, value)
+        else:
+            raise ValueError(f"Unsupported filter operator: {comparison}.")
+    return df[mask]
+
+
+def get_columnar_dataset_path(path_to_dataset: str) -> str | None:
+    """
+    Get the path of the columnar copy of the dataset. The copy is stored alongside the downloaded dataset,
+    its name holds the signature of the source files (their names, sizes and modification times), so adding,
+    removing or changing a file of the dataset leads to a new copy instead of reading a stale one.
+
+    Args:
+        path_to_dataset (str): The path to the dataset files.
+
+    Returns:
+        str | None: The path of the columnar copy, None if there is no source file to convert
+            or the path is a single file.
+    """
+    if not os.path.isdir(path_to_dataset):
+        # a single file (e.g. an ingested batch) is read directly
+        return None
+    source_files = [file for file in sorted(os.listdir(path_to_dataset)) if file.endswith(DATASET_FILE_EXTENSIONS)
+                    and not os.path.isdir(os.path.join(path_to_dataset, file))]
+    if not source_files:
+        return None
+    signature = [[file, os.stat(os.path.join(path_to_dataset, file)).st_size,
+                  os.stat(os.path.join(path_to_dataset, file)).st_mtime_ns] for file in source_files]
+    signature_key = hashlib.sha256(json.dumps(signature).encode("utf-8")).hexdigest()[:16]
+    name = source_files[0].split('.')[0]
+    return os.path.join(path_to_dataset, COLUMNAR_DIRECTORY_NAME, f"{name}-{signature_key}.parquet")
+
+
+def convert_dataset_to_parquet(path_to_dataset: str) -> str:
+    """
+    Converts the dataset to the columnar Parquet format, so following loads can read just the needed columns
+    and rows instead of parsing the whole CSV. The conversion is done just once, an existing copy of the same
+    source files is reused and the copies of the previous versions of the dataset are removed.
+
+    Args:
+        path_to_dataset (str): The path to the dataset files.
+
+    Returns:
+        str: The path of the columnar copy of the dataset.
+    """
+    columnar_path = get_columnar_dataset_path(path_to_dataset)
+    if columnar_path is None:
+        raise ValueError("No valid dataset file found in the specified path.")
+    if os.path.exists(columnar_path):
+        return columnar_path
+
+    df = load_dataset_to_dataframe(path_to_dataset)
+    for column, dtype in COLUMNAR_DTYPES.items():
+        if column in df.columns:
+            df[column] = df[column].astype(dtype)
+    # keep the row positions of the source dataset, filtered reads still know the position of every row
+    df.index = pd.RangeIndex(len(df), name='row')
+
+    os.makedirs(os.path.dirname(columnar_path), exist_ok=True)
+    tmp_path = f"{columnar_path}.tmp-{os.getpid()}"
+    # small row groups let the reader skip the row groups not matching the filters
+    df.to_parquet(tmp_path, index=True, row_group_size=50_000)
+    os.replace(tmp_path, columnar_path)
+    # the copies of the previous versions of the dataset are never read again
+    columnar_directory = os.path.dirname(columnar_path)
+    for file in os.listdir(columnar_directory):
+        path = os.path.join(columnar_directory, file)
+        if file.endswith('.parquet') and path != columnar_path:
+            logger.info(f"Removing the stale columnar copy {path}")
+            os.remove(path)
+
+    return columnar_path
+
+
+def iter_dataset_chunks(path_to_dataset: str, chunksize: int, columns: list[str] | None = None) \
+        -> Iterator[pd.DataFrame]:
+    """
+    Streams the dataset from the specified path in chunks of fixed size. Only the chunk being processed is
+    kept in memory, so the memory footprint is bounded by the chunk size instead of the dataset size.
+    The index of the chunks continues across the chunks, so it holds the row positions in the whole dataset.
+
+    Args:
+        path_to_dataset (str): The path to the dataset files.
+        chunksize (int): The number of rows in one chunk.
+        columns (list[str] | None): The columns to load, all columns are loaded if None.
+
+    Returns:
+        Iterator[pd.DataFrame]: The chunks of the dataset.
+    """
+    columnar_path = get_columnar_dataset_path(path_to_dataset)
+    if columnar_path is not None and os.path.exists(columnar_path):
+        parquet_file = pq.ParquetFile(columnar_path)
+        batch_columns = None if columns is None else list(columns) + ['row']
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=batch_columns):
+            yield batch.to_pandas()
+        return
+
+    files = list_dataset_files(path_to_dataset)
+    if not files:
+        raise ValueError("No valid dataset file found in the specified path.")
+    row = 0
+    for path in files:
+        if path.endswith('.parquet'):
+            chunks = (batch.to_pandas() for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize,
+                                                                                     columns=columns))
+        elif path.endswith('.xlsx'):
+            data = pd.read_excel(path, usecols=columns)
+            chunks = (data.iloc[start:start + chunksize] for start in range(0, len(data), chunksize))
+        else:
+            chunks = pd.read_csv(path, chunksize=chunksize, usecols=columns)
+        for chunk in chunks:
+            # the row positions continue across the files
+            chunk.index = pd.RangeIndex(row, row + len(chunk), name='row')
+            row += len(chunk)
+            yield chunk
+
+
+def iter_dataset_texts(path_to_dataset: str) -> Iterator[str]:
+    """
+    Iterates over the texts of all posts in the dataset order. Only the text column is loaded.
+
+    Args:
+        path_to_dataset (str): The path to the dataset files.
+
+    Returns:
+        Iterator[str]: The texts of the posts.
+    """
+    yield from load_dataset_to_dataframe(path_to_dataset, columns=['text'])['text']
+
+
+def get_dataset_fingerprint(path_to_dataset: str) -> str:
+    """
+    Computes a content hash of the dataset files. The hash is used as a key for artifacts
+    derived from the dataset, so they are rebuilt only when the dataset changes. The hash is remembered
+    together with the sizes and modification times of the files, it is computed again only when they change.
+
+    Args:
+        path_to_dataset (str): The path to the dataset file or to the directory with dataset files.
+
+    Returns:
+        str: The hex digest of the dataset content.
+    """
+    files = list_dataset_files(path_to_dataset)
+
+    signature = [[os.path.abspath(file), os.stat(file).st_size, os.stat(file).st_mtime_ns] for file in files]
+    signature_key = hashlib.sha256(json.dumps(signature).encode("utf-8")).hexdigest()
+    fingerprints_path = os.path.join(cache_directory, "dataset_fingerprints.json")
+    fingerprints = {}
+    if os.path.exists(fingerprints_path):
+        with open(fingerprints_path, encoding="utf-8") as f:
+            fingerprints = json.load(f)
+    if signature_key in fingerprints:
+        return fingerprints[signature_key]
+
+    hasher = hashlib.sha256()
+    for file in files:
+        hasher.update(os.path.basename(file).encode("utf-8"))
+        with open(file, "rb") as f:
+            # read the file in blocks to keep the memory footprint low
+            for block in iter(lambda: f.read(1 << 20), b""):
+                hasher.update(block)
+
+    fingerprints[signature_key] = hasher.hexdigest()
+    os.makedirs(cache_directory, exist_ok=True)
+    tmp_path = f"{fingerprints_path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(fingerprints, f)
+    os.replace(tmp_path, fingerprints_path)
+    return fingerprints[signature_key]
+
+
+def parse_blog_dates(dates: pd.Series) -> pd.Series:
+    """
+    Converts the blog dates (e.g. "14,May,2004" or "21,Mai,2004") to datetimes. The month names of all languages
+    in month_names are recognized. A dataset has just a few thousand distinct dates, so every distinct date
+    is parsed just once and the parsed dates are cached across calls.
+
+    Args:
+        dates (pd.Series): The blog dates.
+
+    Returns:
+        pd.Series: The datetimes, NaT for the dates which can not be parsed.
+    """
+    codes, unique_dates = pd.factorize(dates)
+    parsed = np.array([_parse_blog_date(str(date)) for date in unique_dates], dtype='datetime64[ns]')
+    # the missing dates have the code -1
+    values = np.append(parsed, np.datetime64('NaT', 'ns'))[codes]
+    return pd.Series(values, index=dates.index, name=dates.name)
+
+
+@lru_cache(maxsize=None)
+def _parse_blog_date(date: str) -> np.datetime64:
+    parts = date.split(',')
+    if len(parts) != 3:
+        return np.datetime64('NaT', 'ns')
+    day, month, year = (part.strip() for part in parts)
+    month_number = MONTH_NUMBERS.get(month.lower().rstrip('.'))
+    if month_number is None or not day.isdigit() or not year.isdigit():
+        return np.datetime64('NaT', 'ns')
+    try:
+        return np.datetime64(f"{int(year):04d}-{month_number:02d}-{int(day):02d}", 'ns')
+    except ValueError:
+        # the day does not exist in the month
+        return np.datetime64('NaT', 'ns')
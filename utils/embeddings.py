@@ -0,0 +1,198 @@
+from utils.logging_utils import logger
+from config import cache_directory
+
+from gensim.models import FastText
+import numpy as np
+import hashlib
+import shutil
+import json
+import os
+
+MODEL_FILENAME = "fasttext.model"
+EMBEDDINGS_FILENAME = "embeddings.npy"
+WORDS_FILENAME = "words.txt"
+# file in the model directory naming the directory of the current version
+CURRENT_VERSION_FILENAME = "CURRENT"
+
+
+def get_vocabulary_fingerprint(words: list[str]) -> str:
+    """
+    Computes a content hash of the sorted vocabulary.
+
+    Args:
+        words (list[str]): The sorted words of the vocabulary.
+
+    Returns:
+        str: The hex digest of the vocabulary.
+    """
+    return hashlib.sha256('\n'.join(words).encode('utf-8')).hexdigest()
+
+
+def get_embedding_model_directory(model_params: dict) -> str:
+    """
+    Get the cache directory of the FastText model trained with the parameters.
+
+    Args:
+        model_params (dict): The parameters of the FastText model.
+
+    Returns:
+        str: The directory with the versions of the model and its embeddings.
+    """
+    key = hashlib.sha256(json.dumps(model_params, sort_keys=True).encode('utf-8')).hexdigest()[:32]
+    return os.path.join(cache_directory, "embeddings", key)
+
+
+def load_or_train_embeddings(words: list[str], **model_params) -> np.ndarray:
+    """
+    Get the FastText embeddings of the words. The model and the embeddings of the last vocabulary are cached,
+    the embeddings of the same vocabulary are loaded memory-mapped. If the vocabulary changed, the cached model
+    is updated just with the added words and only their embeddings are computed, the embeddings of the other
+    words are reused.
+
+    Args:
+        words (list[str]): The sorted words to be embedded.
+        **model_params: The parameters of the FastText model.
+
+    Returns:
+        np.ndarray: The embeddings of the words, one row per word.
+    """
+    model_directory = get_embedding_model_directory(model_params)
+    fingerprint = get_vocabulary_fingerprint(words)
+    version_directory = os.path.join(model_directory, fingerprint[:32])
+    if os.path.exists(os.path.join(version_directory, EMBEDDINGS_FILENAME)):
+        logger.info(f"Loading embeddings from {version_directory}")
+        return np.load(os.path.join(version_directory, EMBEDDINGS_FILENAME), mmap_mode='r')
+
+    current_directory = _get_current_version_directory(model_directory)
+    if current_directory is None:
+        logger.info(f"Training FastText model on {len(words)} words")
+        model = FastText(sentences=[[w] for w in words], **model_params)
+        embeddings = _get_word_vectors(model, words)
+    else:
+        # copy-on-write, the arrays of the cached model are not modified by the update
+        model = FastText.load(os.path.join(current_directory, MODEL_FILENAME), mmap='c')
+        cached_embeddings = np.load(os.path.join(current_directory, EMBEDDINGS_FILENAME), mmap_mode='r')
+        with open(os.path.join(current_directory, WORDS_FILENAME), encoding='utf-8') as f:
+            cached_words = np.array(f.read().split('\n'), dtype=str)[:len(cached_embeddings)]
+
+        words_array = np.array(words, dtype=str)
+        # both vocabularies are sorted, the cached words are found by a binary search
+        cached_positions = np.searchsorted(cached_words, words_array)
+        is_cached = cached_positions < len(cached_words)
+        is_cached[is_cached] = cached_words[cached_positions[is_cached]] == words_array[is_cached]
+        new_words = words_array[~is_cached].tolist()
+        logger.info(f"Updating FastText model with {len(new_words)} new words, "
+                    f"{int(is_cached.sum())} embeddings are reused")
+
+        embeddings = np.empty((len(words), model.wv.vector_size), dtype=np.float32)
+        embeddings[is_cached] = cached_embeddings[cached_positions[is_cached]]
+        if new_words:
+            new_sentences = [[w] for w in new_words]
+            model.build_vocab(new_sentences, update=True)
+            model.train(new_sentences, total_examples=len(new_sentences), epochs=model.epochs)
+            embeddings[~is_cached] = _get_word_vectors(model, new_words)
+        else:
+            # just words were removed, the cached model files are reused by the new version
+            model = None
+
+    _save_version(model_directory, version_directory, model, words, embeddings)
+    return embeddings
+
+
+def _get_word_vectors(model: FastText, words: list[str]) -> np.ndarray:
+    """
+    Get the vectors of the words from the FastText model.
+
+    Args:
+        model (FastText): The trained model.
+        words (list[str]): The words.
+
+    Returns:
+        np.ndarray: The vectors of the words, one row per word.
+    """
+    if not words:
+        return np.zeros((0, model.wv.vector_size), dtype=np.float32)
+    return np.asarray(model.wv[words], dtype=np.float32)
+
+
+def _get_current_version_directory(model_directory: str) -> str | None:
+    """
+    Get the directory of the current version of the cached model.
+
+    Args:
+        model_directory (str): The cache directory of the model.
+
+    Returns:
+        str | None: The directory of the current version, None if nothing is cached.
+    """
+    current_path = os.path.join(model_directory, CURRENT_VERSION_FILENAME)
+    if not os.path.exists(current_path):
+        return None
+    with open(current_path, encoding='utf-8') as f:
+        directory = os.path.join(model_directory, f.read().strip())
+    return directory if os.path.exists(os.path.join(directory, MODEL_FILENAME)) else None
+
+
+def _save_version(model_directory: str, version_directory: str, model: FastText | None, words: list[str],
+                  embeddings: np.ndarray) -> None:
+    """
+    Save the model and the embeddings as the current version and remove the previous version.
+
+    Args:
+        model_directory (str): The cache directory of the model.
+        version_directory (str): The directory of the new version.
+        model (FastText | None): The trained model, the model of the previous version is kept if None.
+        words (list[str]): The sorted embedded words.
+        embeddings (np.ndarray): The embeddings of the words.
+
+    Returns:
+        None
+    """
+    previous_directory = _get_current_version_directory(model_directory)
+
+    # write into a temporary directory first, so an interrupted save never leaves a broken version
+    tmp_directory = f"{version_directory}.tmp-{os.getpid()}"
+    os.makedirs(tmp_directory, exist_ok=True)
+    if model is not None:
+        # the large arrays are stored in separate files, so they can be memory-mapped by the next run
+        model.save(os.path.join(tmp_directory, MODEL_FILENAME), sep_limit=1 << 20)
+    else:
+        for file in os.listdir(previous_directory):
+            if file.startswith(MODEL_FILENAME):
+                # hard links share the unchanged model files instead of writing them again
+                _link_or_copy(os.path.join(previous_directory, file), os.path.join(tmp_directory, file))
+    np.save(os.path.join(tmp_directory, EMBEDDINGS_FILENAME), embeddings)
+    with open(os.path.join(tmp_directory, WORDS_FILENAME), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(words))
+    try:
+        os.replace(tmp_directory, version_directory)
+    except OSError:
+        # the version was saved concurrently by another process
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+
+    tmp_current_path = os.path.join(model_directory, f"{CURRENT_VERSION_FILENAME}.tmp-{os.getpid()}")
+    with open(tmp_current_path, 'w', encoding='utf-8') as f:
+        f.write(os.path.basename(version_directory))
+    os.replace(tmp_current_path, os.path.join(model_directory, CURRENT_VERSION_FILENAME))
+
+    if previous_directory is not None and previous_directory != version_directory:
+        # only the last version is kept, the model arrays are large
+        shutil.rmtree(previous_directory, ignore_errors=True)
+    logger.info(f"Embeddings of {len(words)} words saved to {version_directory}")
+
+
+def _link_or_copy(source: str, destination: str) -> None:
+    """
+    Hard link the file, or copy it if the file system does not support hard links.
+
+    Args:
+        source (str): The path of the existing file.
+        destination (str): The path of the new file.
+
+    Returns:
+        None
+    """
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
@@ -0,0 +1,274 @@
+from functools import lru_cache
+import pyarrow as pa
+import pyarrow.compute as pc
+import argparse
+import numpy as np
+import pandas as pd
+import re
+
+# the number of an amount, with optional thousands separators and decimals - a digit followed by the rest
+# of the number, the scanners start at a digit or at a literal character, so the regex engine skips
+# to the candidate positions quickly instead of trying every alternative at every position
+NUMBER_REST = r"(?:\d{0,2}(?:,\d{3})*(?:\.\d+)?|\d*(?:\.\d+)?)"
+NUMBER = rf"\d{NUMBER_REST}"
+# the magnitude following the number of an amount, e.g. 5M, 5 million or 5-bn
+MAGNITUDE = r"(?i:[MBK]|\s*[-]?\s*(?:million|billion|thousand|bill|bn))"
+# multipliers by the magnitude without spaces and hyphens
+MAGNITUDE_MULTIPLIERS = {
+    'k': 1_000, 'thousand': 1_000,
+    'm': 1_000_000, 'million': 1_000_000,
+    'b': 1_000_000_000, 'bn': 1_000_000_000, 'bill': 1_000_000_000, 'billion': 1_000_000_000,
+}
+
+
+class ExtractionPattern:
+    """
+    A pattern of the values extracted from the texts, e.g. the dollar amounts. A value is a number with
+    an optional magnitude (e.g. 5m or 5 million) marked by its unit either before the number (a prefix,
+    e.g. $5m or USD 5m) or after it (a suffix, e.g. 5 € or 12%). The patterns define just the regex
+    of their marker, the number and the magnitude are shared by all patterns.
+
+    Attributes:
+        name (str): The name of the pattern.
+        unit (str): The unit of the extracted values, e.g. USD or %.
+        triggers (tuple[str, ...]): Strings, at least one of them is a part of every match.
+        prefix (str | None): The case-sensitive regex of the marker before the number including the spaces
+            after it, starting with a literal character. None if the marker follows the number.
+        suffix (str | None): The case-sensitive regex of the marker after the number including the spaces
+            before it. None if the marker precedes the number.
+    """
+
+    def __init__(self, name: str, unit: str, triggers: tuple[str, ...], prefix: str | None = None,
+                 suffix: str | None = None):
+        """
+        Initialize the ExtractionPattern class.
+
+        Args:
+            name (str): The name of the pattern.
+            unit (str): The unit of the extracted values.
+            triggers (tuple[str, ...]): Strings, at least one of them is a part of every match.
+            prefix (str | None): The regex of the marker before the number, without capturing groups.
+            suffix (str | None): The regex of the marker after the number, without capturing groups.
+
+        Returns:
+            None
+        """
+        if (prefix is None) == (suffix is None):
+            raise ValueError(f"The pattern {name} has to have either a prefix or a suffix.")
+        if re.compile(prefix or suffix).groups:
+            raise ValueError(f"The marker of the pattern {name} has to use just non-capturing groups.")
+        self.name = name
+        self.unit = unit
+        self.triggers = triggers
+        self.prefix = prefix
+        self.suffix = suffix
+
+
+EXTRACTION_PATTERNS = {pattern.name: pattern for pattern in [
+    # the dollar amounts of Task 3, the same as utils.consts.dollar_pattern
+    ExtractionPattern('usd', 'USD', ('$',), prefix=r"\$"),
+    ExtractionPattern('usd_code', 'USD', ('USD',), prefix=r"USD\s*"),
+    ExtractionPattern('eur', 'EUR', ('€',), prefix=r"€\s*"),
+    ExtractionPattern('eur_suffix', 'EUR', ('€',), suffix=r"\s*€"),
+    ExtractionPattern('eur_code', 'EUR', ('EUR',), prefix=r"EUR\s*"),
+    ExtractionPattern('gbp', 'GBP', ('£',), prefix=r"£\s*"),
+    ExtractionPattern('gbp_code', 'GBP', ('GBP',), prefix=r"GBP\s*"),
+    ExtractionPattern('percent', '%', ('%', 'percent', 'per cent'), suffix=r"\s*(?:%|percent\b|per cent\b)"),
+]}
+
+
+class ExtractionEngine:
+    """
+    Extracts the values of many patterns from the texts in one scan of the texts per marker position.
+    The markers of all patterns preceding the number are alternatives of one combined scanner, and the markers
+    following the number of another one, so the texts are scanned by at most two regexes whatever
+    the number of the patterns. Adding a pattern adds an alternative to a scanner, not another pass
+    over the texts. Just the texts containing a trigger of any pattern are scanned. A match overlapping
+    a preceding match is dropped, so a number is a part of one value at most.
+
+    Attributes:
+        patterns (list[ExtractionPattern]): The extracted patterns.
+        scanners (list[re.Pattern]): The combined regexes of the markers before and after the numbers.
+
+    Methods:
+        extract(texts: pd.Series) -> pd.DataFrame:
+            Extract the values of all patterns from the texts.
+        aggregate(values: pd.DataFrame) -> pd.DataFrame:
+            Get the number and the sum of the extracted values of every pattern.
+    """
+
+    def __init__(self, patterns: list[str] | None = None):
+        """
+        Initialize the ExtractionEngine class and compile the combined scanners.
+
+        Args:
+            patterns (list[str] | None): The names of the patterns in EXTRACTION_PATTERNS, all patterns if None.
+
+        Returns:
+            None
+        """
+        names = list(EXTRACTION_PATTERNS) if patterns is None else patterns
+        unknown = [name for name in names if name not in EXTRACTION_PATTERNS]
+        if unknown:
+            raise ValueError(f"Unknown extraction patterns: {unknown}. "
+                             f"Supported patterns are {list(EXTRACTION_PATTERNS)}.")
+        self.patterns = [EXTRACTION_PATTERNS[name] for name in names]
+
+        self.scanners = []
+        # the compiled markers of every scanner, the matched marker tells the pattern of the value
+        self._markers = []
+        prefixed = [(code, pattern.prefix) for code, pattern in enumerate(self.patterns) if pattern.prefix]
+        if prefixed:
+            markers = '|'.join(marker for _, marker in prefixed)
+            self.scanners.append(re.compile(rf"(?P<marker>{markers})(?P<number>{NUMBER})(?P<magnitude>{MAGNITUDE})?"))
+            self._markers.append([(code, re.compile(marker)) for code, marker in prefixed])
+        suffixed = [(code, pattern.suffix) for code, pattern in enumerate(self.patterns) if pattern.suffix]
+        if suffixed:
+            markers = '|'.join(marker for _, marker in suffixed)
+            # the number is not a part of a longer number or word, checked after its first digit
+            self.scanners.append(re.compile(rf"(?P<number>\d(?<![\w.,]\d){NUMBER_REST})(?P<magnitude>{MAGNITUDE})?"
+                                            rf"(?P<marker>{markers})"))
+            self._markers.append([(code, re.compile(marker)) for code, marker in suffixed])
+        # the pattern of every distinct marker matched by every scanner, e.g. '$' or 'USD '
+        self._pattern_codes = {}
+        triggers = dict.fromkeys(trigger for pattern in self.patterns for trigger in pattern.triggers)
+        # one alternation of all triggers, searched by the linear-time regex engine of Arrow
+        self._trigger_regex = '|'.join(re.escape(trigger) for trigger in triggers)
+
+    def extract(self, texts: pd.Series) -> pd.DataFrame:
+        """
+        Extract the values of all patterns from the texts. Just the texts containing a trigger are scanned
+        by the combined scanners, the values are normalized by the magnitudes with array operations.
+
+        Args:
+            texts (pd.Series): The texts.
+
+        Returns:
+            pd.DataFrame: The extracted values in the columns 'pattern', 'unit' and 'value', indexed by the index
+                labels of their texts, in the order of the texts and of the matches in them.
+        """
+        texts = texts.fillna('')
+        # the matches of all texts are ordered by their positions in the texts following one another
+        text_starts = np.concatenate([[0], np.cumsum(texts.str.len().to_numpy())[:-1]])
+
+        matches = []
+        for text_position in self._find_texts_with_triggers(texts):
+            text, start = texts.iat[text_position], text_starts[text_position]
+            for position, scanner in enumerate(self.scanners):
+                matches.extend((text_position, start + match.start(), start + match.end(),
+                                self._get_pattern_code(position, match['marker']), match['number'],
+                                match['magnitude'] or '')
+                               for match in scanner.finditer(text))
+        matches = pd.DataFrame(matches, columns=['text', 'start', 'end', 'pattern', 'number', 'magnitude'])
+        matches = matches.sort_values('start', kind='stable', ignore_index=True)
+        # a match starting before the end of a preceding match overlaps it
+        previous_ends = np.maximum.accumulate(np.concatenate([[0], matches['end'].to_numpy()[:-1]]))
+        matches = matches[matches['start'].to_numpy() >= previous_ends]
+
+        numbers = matches['number'].str.replace(',', '', regex=False).astype(float).to_numpy()
+        magnitudes = matches['magnitude'].str.replace(r'[\s-]', '', regex=True).str.lower()
+        multipliers = magnitudes.map(MAGNITUDE_MULTIPLIERS).fillna(1).to_numpy()
+        return self._create_values(matches['pattern'].to_numpy(dtype=np.int64), numbers * multipliers,
+                                   texts.index[matches['text'].to_numpy(dtype=np.int64)])
+
+    def _get_pattern_code(self, scanner_position: int, marker: str) -> int:
+        """
+        Get the pattern of a matched marker, the first pattern of the scanner whose marker regex matches it.
+
+        Args:
+            scanner_position (int): The position of the scanner in the scanners.
+            marker (str): The matched marker.
+
+        Returns:
+            int: The position of the pattern in the patterns.
+        """
+        key = (scanner_position, marker)
+        if key not in self._pattern_codes:
+            self._pattern_codes[key] = next(code for code, regex in self._markers[scanner_position]
+                                            if regex.fullmatch(marker))
+        return self._pattern_codes[key]
+
+    def _find_texts_with_triggers(self, texts: pd.Series) -> np.ndarray:
+        """
+        Find the texts containing a trigger of any pattern, the other texts can not contain any match.
+        The alternation of all triggers is searched by the automaton of the RE2 engine of Arrow, so the texts
+        are read once whatever the number of the triggers.
+
+        Args:
+            texts (pd.Series): The texts without missing values.
+
+        Returns:
+            np.ndarray: The sorted positions of the texts containing a trigger.
+        """
+        data = ''.join(texts).encode('utf-8')
+        lengths = texts.str.len().to_numpy(dtype=np.int64)
+        if len(data) != lengths.sum():
+            # some texts have non-ASCII characters, their lengths in bytes differ from the ones in characters
+            lengths = np.fromiter((len(text.encode('utf-8')) for text in texts), dtype=np.int64, count=len(texts))
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        # the Arrow strings are built from the encoded texts directly, without converting every text on its own
+        array = pa.LargeStringArray.from_buffers(len(texts), pa.py_buffer(offsets), pa.py_buffer(data))
+        contains_trigger = pc.match_substring_regex(array, self._trigger_regex)
+        return np.flatnonzero(contains_trigger.to_numpy(zero_copy_only=False))
+
+    def aggregate(self, values: pd.DataFrame) -> pd.DataFrame:
+        """
+        Get the number and the sum of the extracted values of every pattern.
+
+        Args:
+            values (pd.DataFrame): The values extracted by extract.
+
+        Returns:
+            pd.DataFrame: The unit, the count and the sum of the values of every pattern, patterns without
+                any value included.
+        """
+        aggregates = values.groupby('pattern', observed=False)['value'].agg(['count', 'sum'])
+        aggregates.insert(0, 'unit', [pattern.unit for pattern in self.patterns])
+        return aggregates.reset_index()
+
+    def _create_values(self, pattern_codes: np.ndarray, values: np.ndarray, index: pd.Index) -> pd.DataFrame:
+        """
+        Create the DataFrame of the extracted values.
+
+        Args:
+            pattern_codes (np.ndarray): The positions of the patterns of the values in the patterns.
+            values (np.ndarray): The normalized values.
+            index (pd.Index): The index labels of the texts of the values.
+
+        Returns:
+            pd.DataFrame: The values in the columns 'pattern', 'unit' and 'value'.
+        """
+        names = [pattern.name for pattern in self.patterns]
+        units = np.array([pattern.unit for pattern in self.patterns], dtype=object)
+        return pd.DataFrame({
+            'pattern': pd.Categorical.from_codes(pattern_codes, categories=names),
+            'unit': units[pattern_codes],
+            'value': values,
+        }, index=index)
+
+
+@lru_cache(maxsize=None)
+def get_extraction_engine(patterns: tuple[str, ...] | None = None) -> ExtractionEngine:
+    """
+    Get the extraction engine of the patterns, the engine of the same patterns is compiled just once.
+
+    Args:
+        patterns (tuple[str, ...] | None): The names of the patterns in EXTRACTION_PATTERNS, all patterns if None.
+
+    Returns:
+        ExtractionEngine: The extraction engine.
+    """
+    return ExtractionEngine(None if patterns is None else list(patterns))
+
+
+if __name__ == '__main__':
+    from utils.dataset_utils import load_dataset_to_dataframe
+
+    parser = argparse.ArgumentParser(description="Extract amounts, percentages and other values from the texts.")
+    parser.add_argument("path_to_dataset", help="Path to the dataset file or to the directory with dataset files.")
+    parser.add_argument("--patterns", nargs='+', choices=list(EXTRACTION_PATTERNS), default=None,
+                        help="Extracted patterns (default: all patterns).")
+    args = parser.parse_args()
+    engine = get_extraction_engine(None if args.patterns is None else tuple(args.patterns))
+    texts = load_dataset_to_dataframe(args.path_to_dataset, columns=['text'])['text']
+    print(engine.aggregate(engine.extract(texts)).to_string(index=False))
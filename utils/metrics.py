@@ -0,0 +1,341 @@
+from utils.logging_utils import logger
+
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterator
+import threading
+import time
+import json
+import sys
+import os
+
+try:
+    import resource
+except ImportError:
+    # the resource module is not available on Windows
+    resource = None
+
+# prefix of the exported Prometheus metrics
+METRICS_PREFIX = "blog_corpus_stage"
+# interval of the memory sampling during a stage in seconds
+MEMORY_SAMPLING_INTERVAL = 0.02
+
+
+def get_current_rss_mb() -> float | None:
+    """
+    Get the current resident set size of the process. The current RSS is read from /proc on Linux,
+    elsewhere the peak RSS of the process is used instead.
+
+    Args:
+        None
+
+    Returns:
+        float | None: The RSS in MiB, None if it can not be measured on this platform.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1 << 20)
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / (1 << 10)
+
+
+class MetricsRecorder:
+    """
+    Records the wall time, CPU time, number of processed items and peak memory of the pipeline stages.
+    Stages can be nested, the name of a nested stage is prefixed by the names of the enclosing stages.
+    Repeated stages with the same name (e.g. one per batch) are accumulated into one record.
+
+    Only the stages of the current process are recorded, the records of worker processes have to be merged
+    explicitly (see merge).
+
+    Attributes:
+        records (dict[str, dict]): The records of the stages by their full names, in the order of the first run.
+
+    Methods:
+        stage(name: str, items: int | None = None) -> Iterator[dict]:
+            Measure the stage run inside the with block.
+        merge(records: dict[str, dict]) -> None:
+            Merge the records of another process.
+        reset() -> None:
+            Remove all records.
+        write_report(path: str) -> None:
+            Write the records to a JSON run report.
+        write_prometheus(path: str) -> None:
+            Write the records in the Prometheus text format.
+    """
+
+    def __init__(self):
+        """
+        Initialize the MetricsRecorder class.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self.records = {}
+        self.started = datetime.now(timezone.utc)
+        self._stack = []
+        self._peaks = []
+        self._sampler = None
+        self._sampler_pid = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str, items: int | None = None) -> Iterator[dict]:
+        """
+        Measure the stage run inside the with block. The number of items can be set in the yielded dict
+        when it is known only at the end of the stage.
+
+        Args:
+            name (str): The name of the stage.
+            items (int | None): The number of items processed by the stage.
+
+        Returns:
+            Iterator[dict]: The measurement of this run of the stage, with the key 'items'.
+        """
+        self._stack.append(name)
+        full_name = '.'.join(self._stack)
+        measurement = {'items': items}
+        self._start_sampler()
+        with self._lock:
+            self._peaks.append(get_current_rss_mb() or 0.0)
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield measurement
+        finally:
+            wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+            with self._lock:
+                peak = max(self._peaks.pop(), get_current_rss_mb() or 0.0)
+                if self._peaks:
+                    # the peak of a nested stage is a peak of the enclosing stage as well
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+            self._stack.pop()
+            self._add(full_name, wall, cpu, measurement['items'], peak)
+
+    def _add(self, name: str, wall: float, cpu: float, items: int | None, peak: float) -> None:
+        self.merge({name: {'calls': 1, 'wall_seconds': wall, 'cpu_seconds': cpu, 'items': items,
+                           'peak_rss_mb': peak}})
+
+    def _start_sampler(self) -> None:
+        # the sampler thread does not survive a fork, every process starts its own
+        if self._sampler is not None and self._sampler_pid == os.getpid():
+            return
+        self._sampler_pid = os.getpid()
+        self._sampler = threading.Thread(target=self._sample_memory, name="metrics-memory-sampler", daemon=True)
+        self._sampler.start()
+
+    def _sample_memory(self) -> None:
+        # update the peaks of the running stages, the innermost stage propagates its peak when it ends
+        while True:
+            time.sleep(MEMORY_SAMPLING_INTERVAL)
+            if self._peaks:
+                rss = get_current_rss_mb() or 0.0
+                with self._lock:
+                    if self._peaks:
+                        self._peaks[-1] = max(self._peaks[-1], rss)
+
+    def merge(self, records: dict[str, dict]) -> None:
+        """
+        Merge the records of another process, e.g. of a task run in a worker process.
+
+        Args:
+            records (dict[str, dict]): The records to merge.
+
+        Returns:
+            None
+        """
+        for name, record in records.items():
+            existing = self.records.setdefault(name, {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+                                                      'items': None, 'peak_rss_mb': 0.0})
+            existing['calls'] += record['calls']
+            existing['wall_seconds'] += record['wall_seconds']
+            existing['cpu_seconds'] += record['cpu_seconds']
+            if record['items'] is not None:
+                existing['items'] = (existing['items'] or 0) + record['items']
+            existing['peak_rss_mb'] = max(existing['peak_rss_mb'], record['peak_rss_mb'])
+
+    def reset(self) -> None:
+        """
+        Remove all records.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self.records = {}
+        self.started = datetime.now(timezone.utc)
+
+    def get_stages(self) -> list[dict]:
+        """
+        Get the records of the stages with the throughput.
+
+        Args:
+            None
+
+        Returns:
+            list[dict]: The records with the name of the stage and the items per second.
+        """
+        stages = []
+        for name, record in self.records.items():
+            items_per_second = None
+            if record['items'] is not None and record['wall_seconds'] > 0:
+                items_per_second = record['items'] / record['wall_seconds']
+            stages.append({'name': name, **record, 'items_per_second': items_per_second})
+        return stages
+
+    def write_report(self, path: str) -> None:
+        """
+        Write the records to a JSON run report.
+
+        Args:
+            path (str): The path of the report.
+
+        Returns:
+            None
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        report = {'started': self.started.isoformat(), 'pid': os.getpid(), 'stages': self.get_stages()}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Run report saved to {path}")
+
+    def write_prometheus(self, path: str) -> None:
+        """
+        Write the records in the Prometheus text exposition format, e.g. for the textfile collector
+        of the node exporter.
+
+        Args:
+            path (str): The path of the metrics file.
+
+        Returns:
+            None
+        """
+        metrics = [
+            ('wall_seconds', 'Wall time of the pipeline stage in seconds.', 'wall_seconds', 1),
+            ('cpu_seconds', 'CPU time of the pipeline stage in seconds.', 'cpu_seconds', 1),
+            ('items', 'Number of items processed by the pipeline stage.', 'items', 1),
+            ('items_per_second', 'Throughput of the pipeline stage in items per second.', 'items_per_second', 1),
+            ('peak_rss_bytes', 'Peak resident set size during the pipeline stage in bytes.', 'peak_rss_mb', 1 << 20),
+            ('calls', 'Number of runs of the pipeline stage.', 'calls', 1),
+        ]
+        stages = self.get_stages()
+        lines = []
+        for metric, description, key, scale in metrics:
+            lines.append(f"# HELP {METRICS_PREFIX}_{metric} {description}")
+            lines.append(f"# TYPE {METRICS_PREFIX}_{metric} gauge")
+            for stage in stages:
+                if stage[key] is not None:
+                    label = stage['name'].replace('\\', '\\\\').replace('"', '\\"')
+                    lines.append(f'{METRICS_PREFIX}_{metric}{{stage="{label}"}} {stage[key] * scale}')
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # the file is replaced atomically, so the collector never reads a partial file
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, path)
+        logger.info(f"Prometheus metrics saved to {path}")
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler sampling the stack of the main thread in fixed intervals. The samples are written
+    in the collapsed stack format, which is read by flame graph tools (e.g. flamegraph.pl or speedscope).
+
+    Attributes:
+        interval (float): The sampling interval in seconds.
+        samples (Counter): The number of samples of every collapsed stack.
+
+    Methods:
+        start() -> None:
+            Start sampling.
+        stop() -> None:
+            Stop sampling.
+        write(path: str) -> None:
+            Write the collapsed stacks.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        """
+        Initialize the SamplingProfiler class.
+
+        Args:
+            interval (float): The sampling interval in seconds.
+
+        Returns:
+            None
+        """
+        self.interval = interval
+        self.samples = Counter()
+        self._thread = None
+        self._stopped = threading.Event()
+        self._main_thread_id = threading.main_thread().ident
+
+    def start(self) -> None:
+        """
+        Start sampling in a background thread.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop sampling.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _sample(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._main_thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def write(self, path: str) -> None:
+        """
+        Write the collapsed stacks, one stack with its number of samples per line.
+
+        Args:
+            path (str): The path of the profile.
+
+        Returns:
+            None
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        logger.info(f"Profile with {sum(self.samples.values())} samples saved to {path}")
+
+
+# metrics of the current process shared by all modules
+metrics = MetricsRecorder()
@@ -0,0 +1,172 @@
+from utils.text_processing import get_vocabulary_mask, get_english_words_array, get_english_words_set
+from utils.logging_utils import logger
+
+from functools import lru_cache
+from typing import Callable, Iterable
+import numpy as np
+
+# the normalizers folding the inflected forms of a word, e.g. thinking, thinks and think
+NORMALIZERS = ('porter', 'snowball', 'lancaster', 'wordnet')
+# the number of the distinct words whose normalized forms are kept by every normalizer
+NORMALIZATION_CACHE_SIZE = 1 << 18
+
+
+def create_normalizer(name: str) -> Callable[[str], str]:
+    """
+    Create a normalizer of words - an NLTK stemmer, or the WordNet lemmatizer folding the verb forms
+    and then the noun forms.
+
+    Args:
+        name (str): The name of the normalizer, one of NORMALIZERS.
+
+    Returns:
+        Callable[[str], str]: The function mapping a word to its normalized form.
+    """
+    # nltk is imported just for the normalization, the runs without it do not need it
+    import nltk
+    from nltk.stem import PorterStemmer, SnowballStemmer, LancasterStemmer, WordNetLemmatizer
+
+    if name == 'porter':
+        return PorterStemmer().stem
+    if name == 'snowball':
+        return SnowballStemmer('english').stem
+    if name == 'lancaster':
+        return LancasterStemmer().stem
+    if name == 'wordnet':
+        # Download the WordNet corpus if not already downloaded
+        nltk.download('wordnet', quiet=True)
+        lemmatizer = WordNetLemmatizer()
+        return lambda word: lemmatizer.lemmatize(lemmatizer.lemmatize(word, pos='v'), pos='n')
+    raise ValueError(f"Unknown normalizer: {name}. Available normalizers: {', '.join(NORMALIZERS)}.")
+
+
+@lru_cache(maxsize=None)
+def get_cached_normalizer(name: str) -> Callable[[str], str]:
+    """
+    Get the normalizer of words with a bounded LRU cache, the normalizer runs once per distinct word
+    instead of once per occurrence.
+
+    Args:
+        name (str): The name of the normalizer, one of NORMALIZERS.
+
+    Returns:
+        Callable[[str], str]: The cached function mapping a word to its normalized form.
+    """
+    return lru_cache(maxsize=NORMALIZATION_CACHE_SIZE)(create_normalizer(name))
+
+
+def normalize_words(words: Iterable[str], name: str) -> list[str]:
+    """
+    Normalize the words, e.g. the words of get_cleaned_words_from_text. A normalized form which is not
+    an English word (e.g. the stem happi of happiness) falls back to the word itself.
+
+    Args:
+        words (Iterable[str]): The cleaned words.
+        name (str): The name of the normalizer, one of NORMALIZERS.
+
+    Returns:
+        list[str]: The normalized words.
+    """
+    normalize = get_cached_normalizer(name)
+    english_words = get_english_words_set()
+    return [form if (form := normalize(word)) in english_words else word for word in words]
+
+
+class TokenNormalizer:
+    """
+    The normalization of the token IDs of a vocabulary, between the cleaning of the texts and the tasks.
+    Every word of the vocabulary is normalized once, the tokens are then normalized by one array lookup
+    from their token IDs to the IDs of the normalized forms. The normalized forms are English words,
+    so the normalized tokens are filtered and counted like the cleaned ones.
+
+    Attributes:
+        name (str): The name of the normalizer.
+        mapping (np.ndarray): The ID of the normalized form of every token ID of the vocabulary.
+        vocabulary (np.ndarray): The sorted normalized forms indexed by their IDs.
+
+    Methods:
+        normalize_token_ids(token_ids: np.ndarray) -> np.ndarray:
+            Map the token IDs to the IDs of their normalized forms.
+        get_vocabulary_mask(**word_filter) -> np.ndarray:
+            Get the mask of the token IDs whose normalized forms satisfy the word filter.
+        get_forms() -> np.ndarray:
+            Get the normalized form of every word of the vocabulary.
+    """
+
+    def __init__(self, name: str, vocabulary: np.ndarray, forms: np.ndarray | None = None):
+        """
+        Initialize the TokenNormalizer class and normalize the words of the vocabulary.
+
+        Args:
+            name (str): The name of the normalizer, one of NORMALIZERS.
+            vocabulary (np.ndarray): The words indexed by their token ID.
+            forms (np.ndarray | None): The normalized form of every word of the vocabulary, e.g. the forms
+                of an earlier normalizer (see get_forms). The words are normalized if None.
+
+        Returns:
+            None
+        """
+        self.name = name
+        normalized = forms is None
+        if normalized:
+            forms = normalize_words(vocabulary, name)
+        # the normalized forms are sorted, so their IDs do not depend on the process or on the order of the texts
+        self.vocabulary, self.mapping = np.unique(np.array(forms, dtype=object), return_inverse=True)
+        self._vocabulary_masks = {}
+        if normalized:
+            logger.info(f"Normalized {len(vocabulary)} words to {len(self.vocabulary)} forms by the {name} normalizer")
+
+    def get_forms(self) -> np.ndarray:
+        """
+        Get the normalized form of every word of the vocabulary, the forms can be passed to a new normalizer
+        of the same vocabulary instead of normalizing the words again.
+
+        Args:
+            None
+
+        Returns:
+            np.ndarray: The normalized forms indexed by the token IDs of the vocabulary.
+        """
+        return self.vocabulary[self.mapping]
+
+    def normalize_token_ids(self, token_ids: np.ndarray) -> np.ndarray:
+        """
+        Map the token IDs to the IDs of their normalized forms.
+
+        Args:
+            token_ids (np.ndarray): The token IDs of the vocabulary.
+
+        Returns:
+            np.ndarray: The IDs of the normalized forms, they index the normalized vocabulary.
+        """
+        return self.mapping[token_ids]
+
+    def get_vocabulary_mask(self, **word_filter) -> np.ndarray:
+        """
+        Get the mask of the token IDs whose normalized forms satisfy the word filter, see get_vocabulary_mask.
+        The predicates are evaluated on the normalized forms, e.g. a minimal length applies to the stem.
+
+        Args:
+            **word_filter: The word predicates of get_vocabulary_mask.
+
+        Returns:
+            np.ndarray: Boolean mask over the token IDs of the vocabulary.
+        """
+        key = tuple(sorted(word_filter.items()))
+        if key not in self._vocabulary_masks:
+            self._vocabulary_masks[key] = get_vocabulary_mask(self.vocabulary, **word_filter)[self.mapping]
+        return self._vocabulary_masks[key]
+
+
+@lru_cache(maxsize=None)
+def get_english_token_normalizer(name: str) -> TokenNormalizer:
+    """
+    Cached TokenNormalizer of get_english_words_array().
+
+    Args:
+        name (str): The name of the normalizer, one of NORMALIZERS.
+
+    Returns:
+        TokenNormalizer: The normalizer of the English token IDs.
+    """
+    return TokenNormalizer(name, get_english_words_array())
@@ -0,0 +1,155 @@
+from scipy import sparse
+from statistics import NormalDist
+import numpy as np
+
+# the smallest number of sampled posts of a stratum, the variance of a stratum is estimated from two posts at least
+MIN_STRATUM_SAMPLE_SIZE = 2
+
+
+class StratifiedSample:
+    """
+    A stratified random sample of the posts, e.g. by gender, age band and topic. Every stratum is sampled
+    separately with the same fraction, so every stratum is represented in the sample by its share of the posts.
+    The totals over all posts are estimated from the sample by the stratified estimator - every sampled post
+    stands for population_size / sample_size posts of its stratum - with the standard errors of the estimates
+    and their bootstrap distribution.
+
+    Attributes:
+        positions (np.ndarray): The positions of the sampled posts in the population, sorted.
+        strata (np.ndarray): The stratum of every sampled post.
+        population_sizes (np.ndarray): The number of posts of every stratum in the population.
+        sample_sizes (np.ndarray): The number of sampled posts of every stratum.
+
+    Methods:
+        weights -> np.ndarray:
+            The number of posts of the population every sampled post stands for.
+        estimate_totals(values: np.ndarray, confidence: float) -> tuple[np.ndarray, np.ndarray]:
+            Estimate the totals of the values over the population with their confidence intervals.
+        bootstrap_totals(values: np.ndarray, n_resamples: int, seed: int) -> np.ndarray:
+            Estimate the totals of the values from resamples of the sample.
+    """
+
+    def __init__(self, positions: np.ndarray, strata: np.ndarray, population_sizes: np.ndarray,
+                 sample_sizes: np.ndarray):
+        """
+        Initialize the StratifiedSample class.
+
+        Args:
+            positions (np.ndarray): The positions of the sampled posts in the population, sorted.
+            strata (np.ndarray): The stratum of every sampled post.
+            population_sizes (np.ndarray): The number of posts of every stratum in the population.
+            sample_sizes (np.ndarray): The number of sampled posts of every stratum.
+
+        Returns:
+            None
+        """
+        self.positions = positions
+        self.strata = strata
+        self.population_sizes = population_sizes
+        self.sample_sizes = sample_sizes
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    @property
+    def weights(self) -> np.ndarray:
+        """
+        The number of posts of the population every sampled post stands for.
+        """
+        return (self.population_sizes / np.maximum(self.sample_sizes, 1))[self.strata]
+
+    def estimate_totals(self, values: np.ndarray, confidence: float = 0.95) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Estimate the totals of the values over the population. The variance of the estimates is the sum
+        of the variances of the strata with the finite population correction, a stratum with one sampled post
+        adds no variance.
+
+        Args:
+            values (np.ndarray | sparse.spmatrix): The values of the sampled posts, one row per post and one column
+                per estimated total. Sparse values, e.g. the indicators of many groups, are not made dense.
+            confidence (float): The confidence level of the intervals.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The estimated totals and the half-widths of their confidence intervals.
+        """
+        if sparse.issparse(values):
+            values = sparse.csr_matrix(values, dtype=np.float64)
+            squared_values = values.multiply(values)
+        else:
+            values = np.asarray(values, dtype=np.float64).reshape(len(self), -1)
+            squared_values = values ** 2
+        indicator = sparse.csr_matrix((np.ones(len(self)), (self.strata, np.arange(len(self)))),
+                                      shape=(len(self.population_sizes), len(self)))
+        # the sums of the strata are small, one row per stratum
+        sums = indicator @ values
+        squared_sums = indicator @ squared_values
+        if sparse.issparse(sums):
+            sums, squared_sums = sums.toarray(), squared_sums.toarray()
+        sample_sizes = self.sample_sizes[:, np.newaxis].astype(np.float64)
+        population_sizes = self.population_sizes[:, np.newaxis].astype(np.float64)
+
+        totals = (population_sizes / np.maximum(sample_sizes, 1) * sums).sum(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # the sample variances of the strata, zero for the strata with less than two sampled posts
+            variances = np.where(sample_sizes > 1, (squared_sums - sums ** 2 / sample_sizes) / (sample_sizes - 1), 0)
+            variances = np.maximum(variances, 0) * np.where(
+                sample_sizes > 0, population_sizes ** 2 * (1 - sample_sizes / population_sizes) / sample_sizes, 0)
+        z = NormalDist().inv_cdf((1 + confidence) / 2)
+        return totals, z * np.sqrt(variances.sum(axis=0))
+
+    def bootstrap_totals(self, values: np.ndarray, n_resamples: int = 200, seed: int = 0) -> np.ndarray:
+        """
+        Estimate the totals of the values from resamples of the sample. Every stratum is resampled
+        with replacement separately, so the resamples keep the sizes of the strata. The deviations of the resampled
+        totals of a stratum are rescaled to the variance of estimate_totals, so a stratum sampled completely
+        does not vary at all.
+
+        Args:
+            values (np.ndarray): The values of the sampled posts, one row per post and one column per estimated total.
+            n_resamples (int): The number of the resamples.
+            seed (int): The seed of the random resampling.
+
+        Returns:
+            np.ndarray: The estimated totals of every resample, one row per resample.
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(len(self), -1)
+        rng = np.random.default_rng(seed)
+        weights = self.population_sizes / np.maximum(self.sample_sizes, 1)
+        totals = np.zeros((n_resamples, values.shape[1]))
+        for stratum in np.flatnonzero(self.sample_sizes):
+            members = np.flatnonzero(self.strata == stratum)
+            # the number of copies of every sampled post of the stratum in every resample
+            copies = rng.multinomial(len(members), np.full(len(members), 1 / len(members)), size=n_resamples)
+            stratum_total = weights[stratum] * values[members].sum(axis=0)
+            # the finite population correction and the degrees of freedom of the sample variance
+            scale = np.sqrt((1 - len(members) / self.population_sizes[stratum]) * len(members)
+                            / (len(members) - 1)) if len(members) > 1 else 0
+            totals += stratum_total + scale * (weights[stratum] * (copies @ values[members]) - stratum_total)
+        return totals
+
+def draw_stratified_sample(strata: np.ndarray, fraction: float, seed: int = 0) -> StratifiedSample:
+    """
+    Draw a stratified random sample of the posts, the same fraction of every stratum. Every post gets
+    a random key, and the posts with the smallest keys of every stratum are sampled, so the sample of a larger
+    fraction with the same seed contains the sample of a smaller one.
+
+    Args:
+        strata (np.ndarray): The stratum code of every post of the population, from 0 to the number of strata - 1.
+        fraction (float): The sampled fraction of every stratum, at least MIN_STRATUM_SAMPLE_SIZE posts
+            of every stratum are sampled.
+        seed (int): The seed of the random keys.
+
+    Returns:
+        StratifiedSample: The sample.
+    """
+    population_sizes = np.bincount(strata, minlength=strata.max() + 1 if len(strata) else 0)
+    sample_sizes = np.minimum(population_sizes, np.maximum(np.ceil(population_sizes * fraction).astype(np.int64),
+                                                           MIN_STRATUM_SAMPLE_SIZE))
+    keys = np.random.default_rng(seed).random(len(strata))
+    # the posts sorted by the stratum and then by the key, the rank of a post is its position in its stratum
+    order = np.lexsort((keys, strata))
+    stratum_starts = np.concatenate([[0], np.cumsum(population_sizes)[:-1]])
+    ranks = np.empty(len(strata), dtype=np.int64)
+    ranks[order] = np.arange(len(strata)) - stratum_starts[strata[order]]
+    positions = np.flatnonzero(ranks < sample_sizes[strata])
+    return StratifiedSample(positions, strata[positions], population_sizes, sample_sizes)
@@ -0,0 +1,580 @@
+from utils.logging_utils import logger
+
+from typing import Any
+import numpy as np
+
+# the largest size in bytes of a block of the distances computed at once by update_nearest_neighbours
+DISTANCE_BLOCK_BYTES = 256 << 20
+
+
+class SimilarityBackend:
+    """
+    This class is a base class for the backends finding the most similar word of every word by the cosine
+    distance of their embeddings, or by a distance of the words themselves if the backend does not use embeddings.
+
+    Attributes:
+        uses_embeddings (bool): Whether the backend compares the embeddings of the words, the words are compared
+            directly otherwise.
+
+    Methods:
+        create_index() -> Any:
+            Create the empty index of the words kept between the incremental updates.
+        find_nearest_neighbours(embeddings: np.ndarray, index: Any = None) -> tuple[np.ndarray, np.ndarray]:
+            Find the nearest other word of every word. This method should be overridden in subclasses.
+        update_nearest_neighbours(embeddings: np.ndarray, distances: np.ndarray, neighbours: np.ndarray,
+                                  new_rows: np.ndarray, index: Any = None) -> tuple[np.ndarray, np.ndarray]:
+            Update the nearest neighbours after new words were added.
+    """
+    uses_embeddings = True
+
+    def create_index(self) -> Any:
+        """
+        Create the empty index of the words kept between the incremental updates, e.g. in the state
+        of the ingestion. The index is filled by find_nearest_neighbours and update_nearest_neighbours.
+
+        Args:
+            None
+
+        Returns:
+            Any: The index, None if the backend keeps no index.
+        """
+        return None
+
+    def find_nearest_neighbours(self, embeddings: np.ndarray, index: Any = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Find the nearest other word of every word. This method should be overridden in subclasses.
+
+        Args:
+            embeddings (np.ndarray): The embeddings of the words, one row per word.
+            index (Any): The empty index of create_index filled with the words, ignored if the backend keeps no index.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The cosine distance to the nearest word and the index of the nearest
+                word for every word. Words without any candidate have distance inf and index -1.
+        """
+        raise NotImplementedError
+
+    def update_nearest_neighbours(self, embeddings: np.ndarray, distances: np.ndarray, neighbours: np.ndarray,
+                                  new_rows: np.ndarray, index: Any = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Update the nearest neighbours after new words were added, the pairs with a new word are compared exactly.
+
+        Args:
+            embeddings (np.ndarray): The embeddings of all words, one row per word.
+            distances (np.ndarray): The distance to the nearest neighbour of every word, ignored for the new words.
+            neighbours (np.ndarray): The index of the nearest neighbour of every word, ignored for the new words.
+            new_rows (np.ndarray): The indices of the new words.
+            index (Any): The index of the previous words, the new words are added to it. Ignored if the backend
+                keeps no index.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The updated distances and indices of the nearest neighbours.
+        """
+        return update_nearest_neighbours(embeddings, distances, neighbours, new_rows)
+
+
+class BruteForceBackend(SimilarityBackend):
+    """
+    Exact nearest neighbours, every word is compared with all other words.
+    """
+
+    def find_nearest_neighbours(self, embeddings: np.ndarray, index: Any = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Find the nearest other word of every word using NearestNeighbors.
+
+        Args:
+            embeddings (np.ndarray): The embeddings of the words, one row per word.
+            index (Any): Ignored, the backend keeps no index.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The cosine distance to the nearest word and the index of the nearest
+                word for every word.
+        """
+        # scikit-learn is imported just for the brute force search, the other backends do not need it
+        from sklearn.neighbors import NearestNeighbors
+
+        if len(embeddings) < 2:
+            return np.full(len(embeddings), np.inf), np.full(len(embeddings), -1)
+        # setting n_neighbors to 2 to get the most similar pairs of words (first index is the word itself)
+        nn = NearestNeighbors(n_neighbors=2, metric='cosine').fit(embeddings)
+        distances, indices = nn.kneighbors(embeddings)
+        return distances[:, 1], indices[:, 1]
+
+
+class RandomProjectionLSHBackend(SimilarityBackend):
+    """
+    Approximate nearest neighbours using random-projection locality-sensitive hashing. Every hash table
+    projects the embeddings on random hyperplanes, words with similar directions get similar bit codes.
+    The words are sorted by their codes and every word is compared only with the words close to it
+    in the sorted order. More tables and a wider window give higher recall for more time.
+
+    Attributes:
+        n_tables (int): The number of hash tables.
+        n_bits (int): The number of hyperplanes (code bits) of a hash table.
+        window (int): The number of following words in the sorted order compared with every word.
+        seed (int): The seed of the random hyperplanes.
+
+    Methods:
+        find_nearest_neighbours(embeddings: np.ndarray, index: Any = None) -> tuple[np.ndarray, np.ndarray]:
+            Find the approximately nearest other word of every word.
+    """
+
+    def __init__(self, n_tables: int = 8, n_bits: int = 16, window: int = 8, seed: int = 42):
+        """
+        Initialize the RandomProjectionLSHBackend class.
+
+        Args:
+            n_tables (int): The number of hash tables.
+            n_bits (int): The number of hyperplanes (code bits) of a hash table, at most 63.
+            window (int): The number of following words in the sorted order compared with every word.
+            seed (int): The seed of the random hyperplanes.
+
+        Returns:
+            None
+        """
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.window = window
+        self.seed = seed
+
+    def find_nearest_neighbours(self, embeddings: np.ndarray, index: Any = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Find the approximately nearest other word of every word.
+
+        Args:
+            embeddings (np.ndarray): The embeddings of the words, one row per word.
+            index (Any): Ignored, the backend keeps no index.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The cosine distance to the nearest found word and the index of it
+                for every word.
+        """
+        vectors = normalize_rows(embeddings)
+        best_distances = np.full(len(vectors), np.inf)
+        best_indices = np.full(len(vectors), -1)
+        rng = np.random.default_rng(self.seed)
+        bit_weights = np.left_shift(np.int64(1), np.arange(self.n_bits, dtype=np.int64))
+
+        for table in range(self.n_tables):
+            hyperplanes = rng.standard_normal((vectors.shape[1], self.n_bits)).astype(vectors.dtype)
+            codes = ((vectors @ hyperplanes) > 0) @ bit_weights
+            order = np.argsort(codes, kind='stable')
+            for offset in range(1, min(self.window, len(order) - 1) + 1):
+                left, right = order[:-offset], order[offset:]
+                distances = 1 - np.einsum('ij,ij->i', vectors[left], vectors[right])
+                # every pair is a candidate for both words, the sources of one update are unique
+                for source, target in ((left, right), (right, left)):
+                    better = distances < best_distances[source]
+                    best_distances[source[better]] = distances[better]
+                    best_indices[source[better]] = target[better]
+            logger.info(f"LSH table {table + 1}/{self.n_tables} done")
+
+        return best_distances, best_indices
+
+
+class NGramIndex:
+    """
+    The character n-grams of the words compared by the LevenshteinBackend with the number of the words containing
+    every n-gram. Just the n-grams of the new words are extracted when words are added, so the index is kept
+    between the incremental updates (e.g. in the state of the ingestion) instead of being built again.
+
+    Attributes:
+        n (int): The number of characters of an n-gram, the words are padded by ^ and $.
+        grams (list[str]): The n-grams indexed by their ID.
+        document_frequencies (np.ndarray): The number of the words containing every n-gram.
+        offsets (np.ndarray): The offsets of the n-grams of the words in gram_ids, word i spans
+            gram_ids[offsets[i]:offsets[i + 1]].
+        gram_ids (np.ndarray): The IDs of the distinct n-grams of every word.
+
+    Methods:
+        add(words: np.ndarray, new_rows: np.ndarray) -> None:
+            Add the n-grams of the new words.
+        clear() -> None:
+            Remove all words.
+        get_candidate_pairs(query_rows: np.ndarray, lengths: np.ndarray, n_probes: int, window: int)
+                -> tuple[np.ndarray, np.ndarray]:
+            Get the candidate pairs of words with a query word.
+    """
+
+    def __init__(self, n: int):
+        """
+        Initialize the NGramIndex class without any word.
+
+        Args:
+            n (int): The number of characters of an n-gram.
+
+        Returns:
+            None
+        """
+        self.n = n
+        self.clear()
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def clear(self) -> None:
+        """
+        Remove all words and n-grams.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        self.grams = []
+        self._gram_ids = {}
+        self.document_frequencies = np.zeros(0, dtype=np.int64)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.gram_ids = np.zeros(0, dtype=np.int64)
+
+    def add(self, words: np.ndarray, new_rows: np.ndarray) -> None:
+        """
+        Add the n-grams of the new words. The n-grams of the previous words are moved to the indices
+        of the words after the insertion of the new words, they are not extracted again.
+
+        Args:
+            words (np.ndarray): All words, the previous words in the same order as in the index.
+            new_rows (np.ndarray): The sorted indices of the new words.
+
+        Returns:
+            None
+        """
+        new_gram_ids = []
+        new_counts = np.zeros(len(new_rows), dtype=np.int64)
+        for i, word in enumerate(np.asarray(words, dtype=object)[new_rows]):
+            padded = f"^{word}$"
+            word_grams = {padded[j:j + self.n] for j in range(max(len(padded) - self.n + 1, 1))}
+            for gram in word_grams:
+                if gram not in self._gram_ids:
+                    self._gram_ids[gram] = len(self.grams)
+                    self.grams.append(gram)
+                new_gram_ids.append(self._gram_ids[gram])
+            new_counts[i] = len(word_grams)
+        new_gram_ids = np.array(new_gram_ids, dtype=np.int64)
+        document_frequencies = np.bincount(new_gram_ids, minlength=len(self.grams))
+        document_frequencies[:len(self.document_frequencies)] += self.document_frequencies
+        self.document_frequencies = document_frequencies
+
+        # the n-grams of the previous and the new words are interleaved in the order of the words
+        old_rows = np.setdiff1d(np.arange(len(words)), new_rows)
+        counts = np.zeros(len(words), dtype=np.int64)
+        counts[old_rows], counts[new_rows] = np.diff(self.offsets), new_counts
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        gram_ids = np.empty(offsets[-1], dtype=np.int64)
+        gram_ids[_get_segment_positions(offsets, old_rows)] = self.gram_ids
+        gram_ids[_get_segment_positions(offsets, new_rows)] = new_gram_ids
+        self.offsets, self.gram_ids = offsets, gram_ids
+
+    def get_candidate_pairs(self, query_rows: np.ndarray, lengths: np.ndarray, n_probes: int, window: int) \
+            -> tuple[np.ndarray, np.ndarray]:
+        """
+        Get the candidate pairs of words with a query word. Every word is indexed by its n_probes rarest n-grams,
+        the words sharing an indexed n-gram are sorted by their length and every word is paired with the window
+        following words. Only the n-grams indexed for a query word can pair it, so just the words containing
+        them are ranked and sorted.
+
+        Args:
+            query_rows (np.ndarray): The indices of the words whose candidates are searched, every pair
+                contains at least one of them.
+            lengths (np.ndarray): The length of every word.
+            n_probes (int): The number of the rarest n-grams every word is indexed by.
+            window (int): The number of following words of the same n-gram compared with every word.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The indices of the first and the second word of the unique pairs.
+        """
+        word_rows = np.repeat(np.arange(len(self)), np.diff(self.offsets))
+        # equally rare n-grams are ranked by the n-grams themselves, not by the order the words were added in
+        gram_ranks = np.empty(len(self.grams), dtype=np.int64)
+        gram_ranks[np.argsort(np.array(self.grams, dtype=object), kind='stable')] = np.arange(len(self.grams))
+        is_query = np.zeros(len(self), dtype=bool)
+        is_query[query_rows] = True
+        query_probes = self._select_probes(np.flatnonzero(is_query[word_rows]), word_rows, gram_ranks, n_probes)
+        is_query_gram = np.zeros(len(self.grams), dtype=bool)
+        is_query_gram[self.gram_ids[query_probes]] = True
+        # the words containing an n-gram indexed for a query word, the n-grams of the other words are not ranked
+        is_candidate = np.zeros(len(self), dtype=bool)
+        is_candidate[word_rows[is_query_gram[self.gram_ids]]] = True
+        probes = self._select_probes(np.flatnonzero(is_candidate[word_rows]), word_rows, gram_ranks, n_probes)
+        probes = probes[is_query_gram[self.gram_ids[probes]]]
+
+        # the words of an n-gram are sorted by their length, words of similar length are compared
+        rows, gram_ids = word_rows[probes], self.gram_ids[probes]
+        order = np.lexsort((rows, lengths[rows], gram_ids))
+        rows, gram_ids = rows[order], gram_ids[order]
+        pair_keys = []
+        for offset in range(1, min(window, len(rows) - 1) + 1):
+            left, right = rows[:-offset], rows[offset:]
+            valid = (gram_ids[:-offset] == gram_ids[offset:]) & (is_query[left] | is_query[right])
+            left, right = left[valid], right[valid]
+            pair_keys.append(np.minimum(left, right) * len(self) + np.maximum(left, right))
+        pair_keys = np.unique(np.concatenate(pair_keys)) if pair_keys else np.zeros(0, dtype=np.int64)
+        return pair_keys // len(self), pair_keys % len(self)
+
+    def _select_probes(self, entries: np.ndarray, word_rows: np.ndarray, gram_ranks: np.ndarray,
+                       n_probes: int) -> np.ndarray:
+        # the rarest n-grams of every word of the entries, ties by the rank of the n-gram
+        gram_ids = self.gram_ids[entries]
+        entries = entries[np.lexsort((gram_ranks[gram_ids], self.document_frequencies[gram_ids], word_rows[entries]))]
+        rows = word_rows[entries]
+        word_starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        ranks = np.arange(len(rows)) - np.repeat(word_starts, np.diff(np.r_[word_starts, len(rows)]))
+        return entries[ranks < n_probes]
+
+
+class LevenshteinBackend(SimilarityBackend):
+    """
+    Approximate nearest neighbours by the normalized edit distance of the words, no embeddings are needed.
+    The candidate pairs are blocked by an inverted index of character n-grams (see NGramIndex): every word
+    is indexed by its rarest n-grams only, the words sharing an indexed n-gram are sorted by their length
+    and every word is compared only with the words close to it in the sorted order. The time grows with the number
+    of the words times the window, not with the square of the number of the words.
+
+    Attributes:
+        n (int): The number of characters of an n-gram, the words are padded by ^ and $.
+        n_probes (int): The number of the rarest n-grams every word is indexed by.
+        window (int): The number of following words of the same n-gram compared with every word.
+
+    Methods:
+        create_index() -> NGramIndex:
+            Create the empty n-gram index of the words.
+        find_nearest_neighbours(words: np.ndarray, index: NGramIndex | None = None) -> tuple[np.ndarray, np.ndarray]:
+            Find the approximately nearest other word of every word.
+        update_nearest_neighbours(words: np.ndarray, distances: np.ndarray, neighbours: np.ndarray,
+                                  new_rows: np.ndarray, index: NGramIndex | None = None)
+                -> tuple[np.ndarray, np.ndarray]:
+            Update the nearest neighbours after new words were added.
+    """
+    uses_embeddings = False
+
+    def __init__(self, n: int = 3, n_probes: int = 4, window: int = 16):
+        """
+        Initialize the LevenshteinBackend class.
+
+        Args:
+            n (int): The number of characters of an n-gram.
+            n_probes (int): The number of the rarest n-grams every word is indexed by, more probes give
+                higher recall for more time. The recall is approximate, the rarest n-grams differ from word to word,
+                so two words differing by one edit need not share an indexed n-gram, and within an n-gram
+                only the words close in length (see window) are compared.
+            window (int): The number of following words of the same n-gram compared with every word.
+
+        Returns:
+            None
+        """
+        self.n = n
+        self.n_probes = n_probes
+        self.window = window
+
+    def create_index(self) -> NGramIndex:
+        """
+        Create the empty n-gram index of the words kept between the incremental updates.
+
+        Args:
+            None
+
+        Returns:
+            NGramIndex: The empty index.
+        """
+        return NGramIndex(self.n)
+
+    def find_nearest_neighbours(self, words: np.ndarray, index: NGramIndex | None = None) \
+            -> tuple[np.ndarray, np.ndarray]:
+        """
+        Find the approximately nearest other word of every word.
+
+        Args:
+            words (np.ndarray): The words.
+            index (NGramIndex | None): The empty index filled with the words, a new one is used if None.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The normalized edit distance to the nearest found word and the index
+                of it for every word. Words without any candidate have distance inf and index -1.
+        """
+        return self.update_nearest_neighbours(words, np.full(len(words), np.inf), np.full(len(words), -1),
+                                              np.arange(len(words)), index)
+
+    def update_nearest_neighbours(self, words: np.ndarray, distances: np.ndarray, neighbours: np.ndarray,
+                                  new_rows: np.ndarray, index: NGramIndex | None = None) \
+            -> tuple[np.ndarray, np.ndarray]:
+        """
+        Update the nearest neighbours after new words were added, just the candidate pairs with a new word
+        are compared.
+
+        Args:
+            words (np.ndarray): All words.
+            distances (np.ndarray): The distance to the nearest neighbour of every word, ignored for the new words.
+            neighbours (np.ndarray): The index of the nearest neighbour of every word, ignored for the new words.
+            new_rows (np.ndarray): The indices of the new words.
+            index (NGramIndex | None): The index of the previous words, the new words are added to it. The index
+                is built from all words if None or if it does not hold the previous words.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The updated distances and indices of the nearest neighbours.
+        """
+        # the Levenshtein package is imported just for this backend
+        import Levenshtein
+
+        distances = np.array(distances, dtype=np.float64)
+        neighbours = np.array(neighbours, dtype=np.int64)
+        new_rows = np.asarray(new_rows, dtype=np.int64)
+        distances[new_rows], neighbours[new_rows] = np.inf, -1
+        words = np.asarray(words, dtype=object)
+        if index is None:
+            index = self.create_index()
+        if len(index) + len(new_rows) == len(words):
+            index.add(words, new_rows)
+        else:
+            # the index does not hold the previous words, e.g. it was not kept
+            index.clear()
+            index.add(words, np.arange(len(words)))
+        lengths = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+        left, right = index.get_candidate_pairs(new_rows, lengths, self.n_probes, self.window)
+        if len(left) == 0:
+            return distances, neighbours
+        logger.info(f"Comparing {len(left)} candidate pairs of words")
+        distance = Levenshtein.distance
+        edits = np.array([distance(a, b) for a, b in zip(words[left].tolist(), words[right].tolist())],
+                         dtype=np.float64)
+        # the edit distance normalized by the length of the longer word, 0 for equal words and 1 for unrelated words
+        pair_distances = edits / np.maximum(np.maximum(lengths[left], lengths[right]), 1)
+
+        # every pair is a candidate for both words, the nearest candidate (ties by the index) of every word is kept
+        sources, targets = np.concatenate([left, right]), np.concatenate([right, left])
+        pair_distances = np.concatenate([pair_distances, pair_distances])
+        nearest_distances = np.full(len(words), np.inf)
+        np.minimum.at(nearest_distances, sources, pair_distances)
+        is_nearest = pair_distances == nearest_distances[sources]
+        nearest_targets = np.full(len(words), len(words), dtype=np.int64)
+        np.minimum.at(nearest_targets, sources[is_nearest], targets[is_nearest])
+        better = nearest_distances < distances
+        distances[better], neighbours[better] = nearest_distances[better], nearest_targets[better]
+        return distances, neighbours
+
+
+def _get_segment_positions(offsets: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    # the positions of the items of the segments of the rows, segment i spans offsets[i]:offsets[i + 1]
+    lengths = offsets[rows + 1] - offsets[rows]
+    return np.arange(lengths.sum()) + np.repeat(offsets[rows] - (np.cumsum(lengths) - lengths), lengths)
+
+
+SIMILARITY_BACKENDS = {
+    'brute': BruteForceBackend,
+    'lsh': RandomProjectionLSHBackend,
+    'levenshtein': LevenshteinBackend,
+}
+
+
+def get_similarity_backend(name: str, **options) -> SimilarityBackend:
+    """
+    Create the similarity backend by its name.
+
+    Args:
+        name (str): The name of the backend, one of SIMILARITY_BACKENDS.
+        **options: The options of the backend.
+
+    Returns:
+        SimilarityBackend: The similarity backend.
+    """
+    if name not in SIMILARITY_BACKENDS:
+        raise ValueError(f"Unknown similarity backend: {name}. Supported backends are {list(SIMILARITY_BACKENDS)}.")
+    return SIMILARITY_BACKENDS[name](**options)
+
+
+def normalize_rows(embeddings: np.ndarray) -> np.ndarray:
+    """
+    Scale the embeddings to unit length, the dot product of unit vectors is their cosine similarity.
+
+    Args:
+        embeddings (np.ndarray): The embeddings, one row per word.
+
+    Returns:
+        np.ndarray: The unit length embeddings, zero rows stay zero.
+    """
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.where(norms == 0, 1, norms)
+
+
+def select_most_similar_pairs(distances: np.ndarray, neighbours: np.ndarray, n: int) -> list[tuple[int, int, float]]:
+    """
+    Select the n words closest to their nearest neighbour. Only the n smallest distances are selected
+    and sorted, the rest of the words is never sorted.
+
+    Args:
+        distances (np.ndarray): The distance of every word to its nearest neighbour.
+        neighbours (np.ndarray): The index of the nearest neighbour of every word.
+        n (int): The number of pairs to select.
+
+    Returns:
+        list[tuple[int, int, float]]: The word index, the neighbour index and the distance of the selected pairs,
+            sorted by the distance (ties by the word index).
+    """
+    candidates = np.flatnonzero(neighbours >= 0)
+    if len(candidates) > n:
+        candidates = candidates[np.argpartition(distances[candidates], n - 1)[:n]]
+        # words tied with the n-th distance are resolved by their index, the same way as a stable sort
+        threshold = distances[candidates].max()
+        tied = np.flatnonzero((distances == threshold) & (neighbours >= 0))
+        candidates = np.union1d(candidates[distances[candidates] < threshold], tied)
+    selected = candidates[np.lexsort((candidates, distances[candidates]))][:n]
+    return [(int(i), int(neighbours[i]), float(distances[i])) for i in selected]
+
+
+def update_nearest_neighbours(embeddings: np.ndarray, distances: np.ndarray, neighbours: np.ndarray,
+                              new_rows: np.ndarray, block_bytes: int = DISTANCE_BLOCK_BYTES) \
+        -> tuple[np.ndarray, np.ndarray]:
+    """
+    Update the nearest neighbours after new words were added to the embedded words. Just the pairs with a new word
+    are compared - every new word with all words and every other word with the new words, so the time grows with
+    the number of the new words, not with the square of all words. The compared pairs use the exact cosine distance
+    in the precision of the embeddings.
+
+    Args:
+        embeddings (np.ndarray): The embeddings of all words, one row per word.
+        distances (np.ndarray): The distance to the nearest neighbour of every word, ignored for the new words.
+        neighbours (np.ndarray): The index of the nearest neighbour of every word, ignored for the new words.
+        new_rows (np.ndarray): The indices of the new words.
+        block_bytes (int): The largest size in bytes of a block of the distances computed at once, the number
+            of the words compared at once is derived from it.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The updated distances and indices of the nearest neighbours.
+    """
+    distances = np.array(distances, dtype=np.float64)
+    neighbours = np.array(neighbours, dtype=np.int64)
+    new_rows = np.asarray(new_rows, dtype=np.int64)
+    distances[new_rows], neighbours[new_rows] = np.inf, -1
+    if len(new_rows) == 0 or len(embeddings) < 2:
+        return distances, neighbours
+
+    # the embeddings keep their floating point type (float32 of the FastText vectors), they are not upcast
+    embeddings = np.asarray(embeddings)
+    if not np.issubdtype(embeddings.dtype, np.floating):
+        embeddings = embeddings.astype(np.float32)
+    normalized = normalize_rows(embeddings)
+    new_vectors = normalized[new_rows]
+    # the new words compared with all words
+    batch_size = max(1, block_bytes // (normalized.dtype.itemsize * len(normalized)))
+    for start in range(0, len(new_rows), batch_size):
+        rows = new_rows[start:start + batch_size]
+        block = new_vectors[start:start + batch_size] @ normalized.T
+        # the distances are computed in place, just one block is allocated
+        np.subtract(1, block, out=block)
+        # a word is not its own neighbour
+        block[np.arange(len(rows)), rows] = np.inf
+        nearest = block.argmin(axis=1)
+        distances[rows], neighbours[rows] = block[np.arange(len(rows)), nearest], nearest
+
+    # the other words compared with the new words
+    old_rows = np.setdiff1d(np.arange(len(embeddings)), new_rows)
+    batch_size = max(1, block_bytes // (normalized.dtype.itemsize * len(new_rows)))
+    for start in range(0, len(old_rows), batch_size):
+        rows = old_rows[start:start + batch_size]
+        block = normalized[rows] @ new_vectors.T
+        np.subtract(1, block, out=block)
+        nearest = block.argmin(axis=1)
+        nearest_distances = block[np.arange(len(rows)), nearest]
+        closer = nearest_distances < distances[rows]
+        distances[rows[closer]], neighbours[rows[closer]] = nearest_distances[closer], new_rows[nearest[closer]]
+    return distances, neighbours
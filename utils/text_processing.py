@@ -1,26 +1,245 @@
-import nltk
-from nltk.corpus import words
-import re
-
-# Download the words corpus if not already downloaded
-nltk.download('words', quiet=True)
-
-english_words_list = set(words.words())
-
-def get_cleaned_words_from_text(text: str):
-    """
-    Cleans the input text by removing unwanted characters and splitting it into words.
-
-    Args:
-        text (str): The input text to be cleaned.
-
-    Returns:
-        list: A list of cleaned words.
-    """
-    # Remove unwanted characters
-    cleaned_text = re.sub(r'[^\w\s]', '', text)
-
-    # Split the cleaned text into words
-    words = [word.lower() for word in cleaned_text.split() if word.lower() in english_words_list]
-
-    return words
\ No newline at end of file
+from utils.vocabulary import load_english_vocabulary
+from functools import lru_cache
+from typing import Iterable
+import pyarrow as pa
+import pyarrow.compute as pc
+import numpy as np
+import pandas as pd
+import hashlib
+import re
+
+# regex removing all characters which are not part of a word
+unwanted_characters_pattern = re.compile(r'[^\w\s]')
+
+
+def get_cleaned_words_from_text(text: str):
+    """
+    Cleans the input text by removing unwanted characters and splitting it into words.
+
+    Args:
+        text (str): The input text to be cleaned.
+
+    Returns:
+        list: A list of cleaned words.
+    """
+    # Remove unwanted characters
+    cleaned_text = unwanted_characters_pattern.sub('', text)
+
+    # Split the cleaned text into words
+    english_words = get_english_words_set()
+    words = [word.lower() for word in cleaned_text.split() if word.lower() in english_words]
+
+    return words
+
+
+# bytes translation doing the regex cleaning and lower-casing of ASCII texts in one pass, all whitespace
+# becomes a space (the file/group/record/unit separators are whitespace for str.split as well), so every token
+# of the translated batch ends with a space
+LOWERCASE_TABLE = bytes.maketrans(b'ABCDEFGHIJKLMNOPQRSTUVWXYZ\t\n\r\x0b\x0c\x1c\x1d\x1e\x1f',
+                                  b'abcdefghijklmnopqrstuvwxyz         ')
+# separator of the texts in the joined batch, it is kept by the translation and looked up as a special token
+TEXT_SEPARATOR = '\x01'
+UNWANTED_BYTES = bytes(byte for byte in range(128)
+                       if not (chr(byte).isalnum() or chr(byte) in '_' + TEXT_SEPARATOR or chr(byte).isspace()))
+
+
+@lru_cache(maxsize=None)
+def get_english_words_array() -> np.ndarray:
+    """
+    Get the sorted English vocabulary. The position of a word is the token ID used by the batch API.
+    The vocabulary is loaded on the first use, the processes not cleaning texts never load it.
+
+    Args:
+        None
+
+    Returns:
+        np.ndarray: The sorted English words as an object array of strings.
+    """
+    return np.array([word.decode('utf-8') for word in load_english_vocabulary().tolist()], dtype=object)
+
+
+@lru_cache(maxsize=None)
+def get_english_words_set() -> frozenset[str]:
+    """
+    Get the English vocabulary as a set for the membership tests of get_cleaned_words_from_text.
+
+    Args:
+        None
+
+    Returns:
+        frozenset[str]: The English words.
+    """
+    return frozenset(get_english_words_array())
+
+
+@lru_cache(maxsize=None)
+def get_english_words_ids() -> dict[bytes, int]:
+    """
+    Get the token ID of every encoded English word.
+
+    Args:
+        None
+
+    Returns:
+        dict[bytes, int]: The token ID of every encoded English word.
+    """
+    return {word: position for position, word in enumerate(load_english_vocabulary().tolist())}
+
+
+@lru_cache(maxsize=16)
+def _get_token_lookup(vocabulary_mask: bytes | None) -> tuple[pc.SetLookupOptions, np.ndarray]:
+    """
+    Get the lookup of the tokens of the batch API in the kept words of the vocabulary. Every word of the lookup
+    ends with a space like the tokens of the translated batch, the text separator is the last word. The lookup
+    is built once per vocabulary mask.
+
+    Args:
+        vocabulary_mask (bytes | None): The bytes of the boolean mask over get_english_words_array(),
+            all English words are kept if None.
+
+    Returns:
+        tuple[pc.SetLookupOptions, np.ndarray]: The options of pc.index_in and the token ID of every word
+            of the lookup except the separator.
+    """
+    vocabulary = load_english_vocabulary()
+    if vocabulary_mask is None:
+        token_ids = np.arange(len(vocabulary))
+    else:
+        token_ids = np.flatnonzero(np.frombuffer(vocabulary_mask, dtype=bool))
+    words = [word + b' ' for word in vocabulary[token_ids].tolist()] + [f'{TEXT_SEPARATOR} '.encode('ascii')]
+    return pc.SetLookupOptions(pa.array(words, type=pa.large_binary())), token_ids
+
+
+# the vocabulary used to be built at import time, the module attributes are kept for compatibility
+_LAZY_ATTRIBUTES = {
+    'english_words_array': get_english_words_array,
+    'english_words_list': get_english_words_set,
+    'english_words_ids': get_english_words_ids,
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _prepare_text(text: str) -> str:
+    """
+    Prepares the text for the batch cleaning. ASCII texts are cleaned later by the bytes translation,
+    other texts are cleaned by the regex here, because Unicode letters and spaces need the regex and str.split.
+
+    Args:
+        text (str): The input text.
+
+    Returns:
+        str: The text ready for the bytes translation.
+    """
+    if text.isascii() and TEXT_SEPARATOR not in text:
+        return text
+    return ' '.join(unwanted_characters_pattern.sub('', text).lower().split())
+
+
+def get_cleaned_token_ids_from_texts(texts: Iterable[str], vocabulary_mask: np.ndarray | None = None) \
+        -> tuple[np.ndarray, np.ndarray]:
+    """
+    Batch version of get_cleaned_words_from_text. The texts of the batch are joined, cleaned and lower-cased
+    by one bytes translation. Every token with its following space is a slice of the translated bytes,
+    so all tokens are looked up at once by the hash lookup of Arrow over the slices, no Python object
+    is created per token. The words dropped by the vocabulary mask are not a part of the lookup at all.
+
+    Args:
+        texts (Iterable[str]): The input texts to be cleaned.
+        vocabulary_mask (np.ndarray | None): Boolean mask over get_english_words_array(), only the words
+            with True are kept. All English words are kept if None.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The token IDs (positions in the English vocabulary) of all texts concatenated
+            and the offsets of the texts, text i spans token_ids[offsets[i]:offsets[i + 1]].
+    """
+    prepared = [_prepare_text(text) for text in texts]
+    if not prepared:
+        return np.zeros(0, dtype=np.int64), np.zeros(1, dtype=np.int64)
+
+    # the separator is a standalone token between the texts, the batch ends with a space like every token
+    joined = (f' {TEXT_SEPARATOR} '.join(prepared) + ' ').encode('utf-8').translate(LOWERCASE_TABLE, UNWANTED_BYTES)
+    # a token spans the bytes after the preceding space up to its own space, the runs of spaces give empty tokens,
+    # which are not in the lookup
+    offsets = np.concatenate([[0], np.flatnonzero(np.frombuffer(joined, dtype=np.uint8) == ord(' ')) + 1])
+    tokens = pa.Array.from_buffers(pa.large_binary(), len(offsets) - 1,
+                                   [None, pa.py_buffer(offsets), pa.py_buffer(joined)])
+    lookup, lookup_token_ids = _get_token_lookup(None if vocabulary_mask is None else vocabulary_mask.tobytes())
+    # the positions of the kept tokens in the lookup, the other tokens are missing
+    positions = pc.index_in(tokens, options=lookup).drop_null().to_numpy()
+
+    # offsets of the texts in the kept tokens, every separator closes a text
+    separators = np.flatnonzero(positions == len(lookup_token_ids))
+    token_ids = lookup_token_ids[np.delete(positions, separators)]
+    text_starts = np.zeros(len(prepared) + 1, dtype=np.int64)
+    text_starts[1:-1] = separators - np.arange(len(separators))
+    text_starts[-1] = len(token_ids)
+    return token_ids, text_starts
+
+
+def get_vocabulary_mask(vocabulary: np.ndarray, min_length: int = 0, max_length: int | None = None,
+                        excluded_first_letters: str = '', excluded_last_letters: str = '') -> np.ndarray:
+    """
+    Evaluates the word predicates on the whole vocabulary at once. Applying the mask to token IDs
+    filters the tokens without evaluating the predicates for every token.
+
+    Args:
+        vocabulary (np.ndarray): The words of the vocabulary.
+        min_length (int): The minimal length of a word.
+        max_length (int | None): The maximal length of a word, unbounded if None.
+        excluded_first_letters (str): The letters a word must not start with.
+        excluded_last_letters (str): The letters a word must not end with.
+
+    Returns:
+        np.ndarray: Boolean mask over the vocabulary, True for the words satisfying all predicates.
+    """
+    words = pd.Series(vocabulary, dtype=object)
+    lengths = words.str.len()
+    mask = lengths >= min_length
+    if max_length is not None:
+        mask &= lengths <= max_length
+    if excluded_first_letters:
+        mask &= ~words.str[:1].isin(list(excluded_first_letters))
+    if excluded_last_letters:
+        mask &= ~words.str[-1:].isin(list(excluded_last_letters))
+    return mask.to_numpy(dtype=bool)
+
+
+@lru_cache(maxsize=None)
+def get_english_vocabulary_mask(min_length: int = 0, max_length: int | None = None,
+                                excluded_first_letters: str = '', excluded_last_letters: str = '') -> np.ndarray:
+    """
+    Cached get_vocabulary_mask over get_english_words_array().
+
+    Args:
+        min_length (int): The minimal length of a word.
+        max_length (int | None): The maximal length of a word, unbounded if None.
+        excluded_first_letters (str): The letters a word must not start with.
+        excluded_last_letters (str): The letters a word must not end with.
+
+    Returns:
+        np.ndarray: Boolean mask over get_english_words_array().
+    """
+    return get_vocabulary_mask(get_english_words_array(), min_length, max_length,
+                               excluded_first_letters, excluded_last_letters)
+
+
+def get_cleaning_rules_fingerprint() -> str:
+    """
+    Computes a fingerprint of the cleaning rules used by get_cleaned_words_from_text.
+    The fingerprint changes whenever the regex or the English vocabulary changes.
+
+    Args:
+        None
+
+    Returns:
+        str: The hex digest identifying the cleaning rules.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(unwanted_characters_pattern.pattern.encode('utf-8'))
+    hasher.update('\n'.join(get_english_words_array()).encode('utf-8'))
+    return hasher.hexdigest()
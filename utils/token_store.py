@@ -0,0 +1,276 @@
+from utils.logging_utils import logger
+from utils.data_utils import iter_batches
+from utils.text_processing import get_cleaned_token_ids_from_texts, get_cleaning_rules_fingerprint, \
+    get_vocabulary_mask, get_english_words_array
+from utils.normalization import TokenNormalizer
+from config import cache_directory
+
+from functools import lru_cache
+from typing import Iterable
+from tqdm import tqdm
+import numpy as np
+import hashlib
+import shutil
+import os
+
+TOKENS_FILENAME = "tokens.npy"
+OFFSETS_FILENAME = "offsets.npy"
+VOCABULARY_FILENAME = "vocabulary.txt"
+# the normalized forms of the vocabulary words, saved by the first process using a normalizer of the store
+NORMALIZED_FILENAME = "normalized-{name}.npy"
+# number of texts tokenized in one batch
+TOKENIZATION_BATCH_SIZE = 10_000
+
+
+class TokenStore:
+    """
+    Read-only view of a tokenized corpus stored on disk. The corpus is kept as one flat array of
+    integer token IDs, an array of per-post offsets into it and a vocabulary table mapping token IDs
+    back to words. Both arrays are memory-mapped, so the store is cheap to open in every task and
+    every worker process.
+
+    Post positions follow the row order of the dataset the store was built from.
+
+    Attributes:
+        directory (str): The directory with the stored artifact.
+        tokens (np.ndarray): Token IDs of all posts concatenated.
+        offsets (np.ndarray): Offsets of the posts in tokens, post i spans tokens[offsets[i]:offsets[i + 1]].
+        vocabulary (np.ndarray): Words indexed by their token ID.
+
+    Methods:
+        get_token_ids(position: int) -> np.ndarray:
+            Get the token IDs of a single post.
+        get_words(position: int) -> list[str]:
+            Get the cleaned words of a single post.
+        get_token_ids_of_posts(positions: list[int]) -> np.ndarray:
+            Get the token IDs of several posts concatenated.
+        get_vocabulary_mask(**word_filter) -> np.ndarray:
+            Get the cached mask of the vocabulary words satisfying the word filter.
+        get_normalizer(name: str) -> TokenNormalizer:
+            Get the cached normalizer of the token IDs of the store.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Open the token store stored in the directory.
+
+        Args:
+            directory (str): The directory with the stored artifact.
+
+        Returns:
+            None
+        """
+        self.directory = directory
+        self.tokens = np.load(os.path.join(directory, TOKENS_FILENAME), mmap_mode='r')
+        self.offsets = np.load(os.path.join(directory, OFFSETS_FILENAME), mmap_mode='r')
+        with open(os.path.join(directory, VOCABULARY_FILENAME), encoding='utf-8') as f:
+            self.vocabulary = np.array(f.read().split('\n'), dtype=object)
+        self._vocabulary_masks = {}
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __reduce__(self):
+        # re-open the memory-mapped files instead of copying them when sent to another process
+        return self.__class__, (self.directory,)
+
+    def get_token_ids(self, position: int) -> np.ndarray:
+        """
+        Get the token IDs of a single post.
+
+        Args:
+            position (int): The position of the post in the dataset.
+
+        Returns:
+            np.ndarray: The token IDs of the post.
+        """
+        return self.tokens[self.offsets[position]:self.offsets[position + 1]]
+
+    def get_words(self, position: int) -> list[str]:
+        """
+        Get the cleaned words of a single post. The result is the same as running
+        get_cleaned_words_from_text on the post text.
+
+        Args:
+            position (int): The position of the post in the dataset.
+
+        Returns:
+            list[str]: The cleaned words of the post.
+        """
+        return self.vocabulary[self.get_token_ids(position)].tolist()
+
+    def get_token_ids_of_posts(self, positions: list[int]) -> np.ndarray:
+        """
+        Get the token IDs of several posts concatenated in the order of the positions.
+
+        Args:
+            positions (list[int]): The positions of the posts in the dataset.
+
+        Returns:
+            np.ndarray: The token IDs of the posts.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        starts = self.offsets[positions]
+        lengths = self.offsets[positions + 1] - starts
+        # index of every token: the start of its post plus its position inside the post
+        post_starts_in_result = np.cumsum(lengths) - lengths
+        token_indices = np.arange(lengths.sum()) + np.repeat(starts - post_starts_in_result, lengths)
+        return self.tokens[token_indices]
+
+    def get_vocabulary_mask(self, **word_filter) -> np.ndarray:
+        """
+        Get the mask of the vocabulary words satisfying the word filter, see get_vocabulary_mask.
+
+        Args:
+            **word_filter: The word predicates of get_vocabulary_mask.
+
+        Returns:
+            np.ndarray: Boolean mask over the vocabulary.
+        """
+        key = tuple(sorted(word_filter.items()))
+        if key not in self._vocabulary_masks:
+            self._vocabulary_masks[key] = get_vocabulary_mask(self.vocabulary, **word_filter)
+        return self._vocabulary_masks[key]
+
+    def get_normalizer(self, name: str) -> TokenNormalizer:
+        """
+        Get the normalizer of the token IDs of the store, just the words occurring in the dataset are normalized.
+        The normalizer is shared by all copies of the store in the process, see load_or_build_normalizer.
+
+        Args:
+            name (str): The name of the normalizer, see NORMALIZERS.
+
+        Returns:
+            TokenNormalizer: The normalizer of the token IDs.
+        """
+        return load_or_build_normalizer(self.directory, name)
+
+
+@lru_cache(maxsize=None)
+def load_or_build_normalizer(directory: str, name: str) -> TokenNormalizer:
+    """
+    Load the normalizer of the token IDs of the token store in the directory. The words of the store
+    are normalized once and their forms are saved in the store, so the shards and the worker processes
+    load the forms instead of normalizing the vocabulary again. The normalizers are cached by the directory,
+    the copies of a store sent to other processes are opened again (see TokenStore.__reduce__).
+
+    Args:
+        directory (str): The directory of the token store.
+        name (str): The name of the normalizer, see NORMALIZERS.
+
+    Returns:
+        TokenNormalizer: The normalizer of the token IDs of the store.
+    """
+    vocabulary = TokenStore(directory).vocabulary
+    path = os.path.join(directory, NORMALIZED_FILENAME.format(name=name))
+    if os.path.exists(path):
+        return TokenNormalizer(name, vocabulary, forms=np.load(path))
+
+    normalizer = TokenNormalizer(name, vocabulary)
+    # the forms are replaced atomically, so a concurrent process never loads a partial file
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, normalizer.get_forms().astype(str))
+    os.replace(tmp_path, path)
+    logger.info(f"Normalized forms of the {name} normalizer saved to {path}")
+    return normalizer
+
+
+def get_token_store_key(dataset_fingerprint: str) -> str:
+    """
+    Get the key of the token store for the dataset and the current cleaning rules.
+
+    Args:
+        dataset_fingerprint (str): The content hash of the dataset.
+
+    Returns:
+        str: The key of the token store.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(dataset_fingerprint.encode('utf-8'))
+    hasher.update(get_cleaning_rules_fingerprint().encode('utf-8'))
+    return hasher.hexdigest()[:32]
+
+
+def build_token_store(texts: Iterable[str], directory: str) -> TokenStore:
+    """
+    Tokenize all texts and write the tokenized corpus to the directory.
+
+    Args:
+        texts (Iterable[str]): The texts of all posts in the dataset order.
+        directory (str): The target directory of the artifact.
+
+    Returns:
+        TokenStore: The built token store.
+    """
+    english_words = get_english_words_array()
+    # token store IDs of the English words, assigned in the order of the first occurrence
+    store_ids = np.full(len(english_words), -1, dtype=np.int64)
+    vocabulary = []
+    n_posts, n_tokens = 0, 0
+
+    # write into a temporary directory first, so an interrupted build never leaves a broken artifact
+    tmp_directory = f"{directory}.tmp-{os.getpid()}"
+    os.makedirs(tmp_directory, exist_ok=True)
+    # the token IDs and the offsets of every batch are appended to the array files right away, so the tokenized
+    # corpus is never held in memory, the lengths of the arrays are written to their headers at the end
+    with open(os.path.join(tmp_directory, TOKENS_FILENAME), 'wb') as tokens_file, \
+            open(os.path.join(tmp_directory, OFFSETS_FILENAME), 'wb') as offsets_file:
+        _write_array_header(tokens_file, np.int32, 0)
+        _write_array_header(offsets_file, np.int64, 1)
+        np.zeros(1, dtype=np.int64).tofile(offsets_file)
+        for batch in tqdm(iter_batches(texts, TOKENIZATION_BATCH_SIZE),
+                          desc="Tokenizing texts - building token store"):
+            token_ids, batch_offsets = get_cleaned_token_ids_from_texts(batch)
+            new_ids = token_ids[store_ids[token_ids] < 0]
+            if len(new_ids):
+                unique_ids, first_occurrences = np.unique(new_ids, return_index=True)
+                unique_ids = unique_ids[np.argsort(first_occurrences)]
+                store_ids[unique_ids] = np.arange(len(vocabulary), len(vocabulary) + len(unique_ids))
+                vocabulary.extend(english_words[unique_ids])
+            (batch_offsets[1:] + n_tokens).astype(np.int64).tofile(offsets_file)
+            store_ids[token_ids].astype(np.int32).tofile(tokens_file)
+            n_posts += len(batch_offsets) - 1
+            n_tokens += len(token_ids)
+        _write_array_header(tokens_file, np.int32, n_tokens)
+        _write_array_header(offsets_file, np.int64, n_posts + 1)
+    with open(os.path.join(tmp_directory, VOCABULARY_FILENAME), 'w', encoding='utf-8') as f:
+        # the line number is the token ID
+        f.write('\n'.join(vocabulary))
+    try:
+        os.replace(tmp_directory, directory)
+    except OSError:
+        # the artifact was built concurrently by another process
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+
+    logger.info(f"Token store with {n_posts} posts, {n_tokens} tokens "
+                f"and {len(vocabulary)} words saved to {directory}")
+    return TokenStore(directory)
+
+
+def _write_array_header(f, dtype: type, length: int) -> None:
+    # the header of a one-dimensional .npy array at the start of the file, numpy reserves space in the header
+    # for a longer length, so the header is rewritten in place when all items are appended
+    f.seek(0)
+    np.lib.format.write_array_header_1_0(f, {'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)),
+                                             'fortran_order': False, 'shape': (length,)})
+
+
+def load_or_build_token_store(texts: Iterable[str], dataset_fingerprint: str) -> TokenStore:
+    """
+    Load the token store of the dataset from the cache or build it if it does not exist yet.
+
+    Args:
+        texts (Iterable[str]): The texts of all posts in the dataset order.
+        dataset_fingerprint (str): The content hash of the dataset.
+
+    Returns:
+        TokenStore: The token store of the dataset.
+    """
+    directory = os.path.join(cache_directory, "token_store", get_token_store_key(dataset_fingerprint))
+    if os.path.exists(os.path.join(directory, VOCABULARY_FILENAME)):
+        logger.info(f"Loading token store from {directory}")
+        return TokenStore(directory)
+
+    logger.info("Token store not found - tokenizing the dataset")
+    return build_token_store(texts, directory)
@@ -0,0 +1,65 @@
+from utils.logging_utils import logger
+from config import cache_directory
+
+from functools import lru_cache
+import argparse
+import numpy as np
+import os
+
+# sorted English words as a fixed-width bytes array, memory-mapped by every process using the vocabulary
+VOCABULARY_PATH = os.path.join(cache_directory, "vocabulary", "english_words.npy")
+
+
+def build_vocabulary_artifact(path: str = VOCABULARY_PATH) -> str:
+    """
+    Build the English vocabulary artifact from the NLTK words corpus. The words are stored sorted,
+    UTF-8 encoded and padded to the length of the longest word, so the file can be memory-mapped
+    and the position of a word is its token ID.
+
+    Args:
+        path (str): The path of the artifact.
+
+    Returns:
+        str: The path of the artifact.
+    """
+    # nltk is imported just for building the artifact, the processes loading it do not need it
+    import nltk
+    from nltk.corpus import words
+
+    # Download the words corpus if not already downloaded
+    nltk.download('words', quiet=True)
+    english_words = sorted(set(words.words()))
+    vocabulary = np.array([word.encode('utf-8') for word in english_words])
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    # the artifact is replaced atomically, so a concurrent process never maps a partial file
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, vocabulary)
+    os.replace(tmp_path, path)
+    logger.info(f"Vocabulary of {len(vocabulary)} English words saved to {path}")
+    return path
+
+
+@lru_cache(maxsize=None)
+def load_english_vocabulary(path: str = VOCABULARY_PATH) -> np.ndarray:
+    """
+    Load the English vocabulary memory-mapped, the artifact is built first if it does not exist.
+
+    Args:
+        path (str): The path of the artifact.
+
+    Returns:
+        np.ndarray: The sorted UTF-8 encoded English words.
+    """
+    if not os.path.exists(path):
+        logger.info("Building the English vocabulary...")
+        build_vocabulary_artifact(path)
+    return np.load(path, mmap_mode='r')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the English vocabulary artifact from the NLTK words corpus.")
+    parser.add_argument("--path", default=VOCABULARY_PATH, help=f"Path of the artifact (default: {VOCABULARY_PATH}).")
+    args = parser.parse_args()
+    build_vocabulary_artifact(args.path)
@@ -0,0 +1,278 @@
+from utils.logging_utils import logger
+from utils.dataset_utils import load_dataset_to_dataframe, iter_dataset_texts, get_dataset_fingerprint, \
+    apply_filters, parse_blog_dates
+from utils.text_processing import get_vocabulary_mask
+from utils.token_store import TokenStore, load_or_build_token_store
+from config import cache_directory
+
+from scipy import sparse
+import argparse
+import numpy as np
+import pandas as pd
+import shutil
+import re
+import os
+
+DATA_FILENAME = "data.npy"
+INDICES_FILENAME = "indices.npy"
+INDPTR_FILENAME = "indptr.npy"
+POSTS_FILENAME = "posts.parquet"
+VOCABULARY_FILENAME = "vocabulary.txt"
+# the demographic columns of the posts the queries can filter by
+POST_COLUMNS = ['gender', 'age', 'topic', 'sign', 'date']
+# number of posts converted to the sparse matrix at once
+INDEX_BATCH_SIZE = 100_000
+# filter expressions of the query CLI, e.g. "gender==female", "age>=20" or "topic in Arts,Science"
+FILTER_EXPRESSION_PATTERN = re.compile(r'^\s*(\w+)\s*(==|!=|<=|>=|<|>|\s+in\s+)\s*(.+?)\s*$')
+
+
+class WordCountIndex:
+    """
+    Index of the word counts of every post. The counts are a sparse post-by-word matrix, the demographic
+    columns of the posts are kept alongside, so the word counts of any slice of the posts are a sum of
+    the matrix rows selected by the filters, without tokenizing the texts again.
+
+    Rows follow the row order of the dataset, columns are the token IDs of the token store the index
+    was built from. The words of every row are stored in the order of their first occurrence in the post,
+    so the order of the first occurrences in any slice is known as well.
+
+    Attributes:
+        directory (str): The directory with the stored index.
+        counts (sparse.csr_matrix): The number of occurrences of every word in every post.
+        posts (pd.DataFrame): The demographic columns of the posts indexed by the row positions.
+        vocabulary (np.ndarray): Words indexed by their token ID.
+
+    Methods:
+        select_posts(filters: list[tuple] | None = None) -> np.ndarray:
+            Get the positions of the posts matching the filters.
+        count_words(filters: list[tuple] | None = None) -> np.ndarray:
+            Get the number of occurrences of every word in the posts matching the filters.
+        get_top_words(filters: list[tuple] | None = None, n: int = 10, word_filter: dict | None = None)
+                -> pd.DataFrame:
+            Get the most common words in the posts matching the filters.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Open the index stored in the directory, the count matrix is memory-mapped.
+
+        Args:
+            directory (str): The directory with the stored index.
+
+        Returns:
+            None
+        """
+        self.directory = directory
+        self.posts = pd.read_parquet(os.path.join(directory, POSTS_FILENAME))
+        with open(os.path.join(directory, VOCABULARY_FILENAME), encoding='utf-8') as f:
+            self.vocabulary = np.array(f.read().split('\n'), dtype=object)
+        arrays = [np.load(os.path.join(directory, filename), mmap_mode='r')
+                  for filename in (DATA_FILENAME, INDICES_FILENAME, INDPTR_FILENAME)]
+        self.counts = sparse.csr_matrix(tuple(arrays), shape=(len(self.posts), len(self.vocabulary)), copy=False)
+        self._vocabulary_masks = {}
+
+    def __len__(self) -> int:
+        return len(self.posts)
+
+    def __reduce__(self):
+        # re-open the memory-mapped files instead of copying them when sent to another process
+        return self.__class__, (self.directory,)
+
+    def select_posts(self, filters: list[tuple] | None = None) -> np.ndarray:
+        """
+        Get the positions of the posts matching the filters.
+
+        Args:
+            filters (list[tuple] | None): The filters as (column, operator, value) tuples combined by AND,
+                the same format as the filters of load_dataset_to_dataframe. All posts match if None.
+
+        Returns:
+            np.ndarray: The positions of the matching posts in the dataset order.
+        """
+        if not filters:
+            return np.arange(len(self.posts))
+        return apply_filters(self.posts, filters).index.to_numpy(dtype=np.int64)
+
+    def count_words(self, filters: list[tuple] | None = None) -> np.ndarray:
+        """
+        Get the number of occurrences of every word in the posts matching the filters.
+
+        Args:
+            filters (list[tuple] | None): The filters of the posts, all posts are counted if None.
+
+        Returns:
+            np.ndarray: The number of occurrences indexed by the token IDs.
+        """
+        return self._count_words(self._select_rows(filters))
+
+    def _select_rows(self, filters: list[tuple] | None) -> sparse.csr_matrix:
+        # the row subset keeps the order of the words in the rows
+        return self.counts if not filters else self.counts[self.select_posts(filters)]
+
+    def _count_words(self, rows: sparse.csr_matrix) -> np.ndarray:
+        return np.bincount(rows.indices, weights=rows.data, minlength=len(self.vocabulary)).astype(np.int64)
+
+    def get_top_words(self, filters: list[tuple] | None = None, n: int = 10,
+                      word_filter: dict | None = None) -> pd.DataFrame:
+        """
+        Get the most common words in the posts matching the filters. Words with the same count are ordered
+        by their first occurrence in the selected posts, the same order as counting the words of the posts.
+
+        Args:
+            filters (list[tuple] | None): The filters of the posts, all posts are counted if None.
+            n (int): The number of words.
+            word_filter (dict | None): The word predicates of get_vocabulary_mask, all words are counted if None.
+
+        Returns:
+            pd.DataFrame: The most common words and their counts in the columns 'word' and 'count'.
+        """
+        rows = self._select_rows(filters)
+        counts = self._count_words(rows)
+        candidates = np.flatnonzero(counts)
+        if word_filter:
+            key = tuple(sorted(word_filter.items()))
+            if key not in self._vocabulary_masks:
+                self._vocabulary_masks[key] = get_vocabulary_mask(self.vocabulary, **word_filter)
+            candidates = candidates[self._vocabulary_masks[key][candidates]]
+        if len(candidates) > n > 0:
+            # just the words with at least the count of the n-th word can be in the result
+            candidates = candidates[counts[candidates] >= np.partition(counts[candidates], -n)[-n]]
+
+        # the first occurrence of the candidates in the selected posts breaks the ties
+        is_candidate = np.zeros(len(self.vocabulary), dtype=bool)
+        is_candidate[candidates] = True
+        positions = np.flatnonzero(is_candidate[rows.indices])
+        words, first = np.unique(rows.indices[positions], return_index=True)
+        first_occurrences = np.empty(len(self.vocabulary), dtype=np.int64)
+        first_occurrences[words] = positions[first]
+
+        top = candidates[np.lexsort((first_occurrences[candidates], -counts[candidates]))[:n]]
+        return pd.DataFrame({'word': self.vocabulary[top], 'count': counts[top]}, columns=['word', 'count'])
+
+
+def build_word_count_index(token_store: TokenStore, posts: pd.DataFrame, directory: str) -> WordCountIndex:
+    """
+    Build the word count index from the token store and save it to the directory.
+
+    Args:
+        token_store (TokenStore): The tokenized dataset.
+        posts (pd.DataFrame): The demographic columns of the posts, indexed by the row positions.
+        directory (str): The target directory of the index.
+
+    Returns:
+        WordCountIndex: The built index.
+    """
+    n_posts, n_words = len(token_store), len(token_store.vocabulary)
+    batches = []
+    for start in range(0, n_posts, INDEX_BATCH_SIZE):
+        end = min(start + INDEX_BATCH_SIZE, n_posts)
+        first, last = token_store.offsets[start], token_store.offsets[end]
+        lengths = np.diff(token_store.offsets[start:end + 1])
+        rows = np.repeat(np.arange(end - start, dtype=np.int64), lengths)
+        # the distinct (post, word) pairs with their counts and the positions of their first occurrences
+        keys, first_positions, counts = np.unique(rows * n_words + token_store.tokens[first:last],
+                                                  return_index=True, return_counts=True)
+        # the positions grow with the posts, sorting by them orders the words of every post by the first occurrence
+        order = np.argsort(first_positions, kind='stable')
+        keys, counts = keys[order], counts[order]
+        indptr = np.zeros(end - start + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys // n_words, minlength=end - start), out=indptr[1:])
+        batches.append(sparse.csr_matrix((counts.astype(np.int32), (keys % n_words).astype(np.int32), indptr),
+                                         shape=(end - start, n_words)))
+    counts = sparse.vstack(batches, format='csr') if batches else sparse.csr_matrix((0, n_words), dtype=np.int32)
+
+    posts = posts.sort_index()
+    posts.index = pd.RangeIndex(len(posts), name='row')
+    if len(posts) != n_posts:
+        raise ValueError(f"The dataset has {len(posts)} posts, but the token store has {n_posts} posts.")
+    if 'date' in posts.columns:
+        # the dates are compared as dates, the dates which can not be parsed are missing
+        posts['date'] = parse_blog_dates(posts['date'])
+
+    # write into a temporary directory first, so an interrupted build never leaves a broken index
+    tmp_directory = f"{directory}.tmp-{os.getpid()}"
+    os.makedirs(tmp_directory, exist_ok=True)
+    np.save(os.path.join(tmp_directory, DATA_FILENAME), counts.data.astype(np.int32))
+    np.save(os.path.join(tmp_directory, INDICES_FILENAME), counts.indices.astype(np.int32))
+    np.save(os.path.join(tmp_directory, INDPTR_FILENAME), counts.indptr.astype(np.int64))
+    posts.to_parquet(os.path.join(tmp_directory, POSTS_FILENAME))
+    with open(os.path.join(tmp_directory, VOCABULARY_FILENAME), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(token_store.vocabulary))
+    try:
+        os.replace(tmp_directory, directory)
+    except OSError:
+        # the index was built concurrently by another process
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+
+    logger.info(f"Word count index with {n_posts} posts and {counts.nnz} post-word counts saved to {directory}")
+    return WordCountIndex(directory)
+
+
+def load_or_build_word_count_index(path_to_dataset: str, dataset_fingerprint: str | None = None,
+                                   token_store: TokenStore | None = None) -> WordCountIndex:
+    """
+    Load the word count index of the dataset from the cache or build it if it does not exist yet.
+
+    Args:
+        path_to_dataset (str): The path to the dataset files.
+        dataset_fingerprint (str | None): The content hash of the dataset, computed if None.
+        token_store (TokenStore | None): The tokenized dataset, loaded or built if None.
+
+    Returns:
+        WordCountIndex: The word count index of the dataset.
+    """
+    if token_store is None:
+        dataset_fingerprint = dataset_fingerprint or get_dataset_fingerprint(path_to_dataset)
+        token_store = load_or_build_token_store(iter_dataset_texts(path_to_dataset), dataset_fingerprint)
+    # the index is derived from the token store, it has the same key
+    directory = os.path.join(cache_directory, "word_count_index", os.path.basename(token_store.directory))
+    if os.path.exists(os.path.join(directory, VOCABULARY_FILENAME)):
+        logger.info(f"Loading word count index from {directory}")
+        return WordCountIndex(directory)
+
+    logger.info("Word count index not found - building it from the token store")
+    posts = load_dataset_to_dataframe(path_to_dataset, columns=POST_COLUMNS)
+    return build_word_count_index(token_store, posts, directory)
+
+
+def parse_filter(expression: str) -> tuple:
+    """
+    Parse a filter expression, e.g. "gender==female", "age>=20" or "topic in Arts,Science".
+    Numeric values are converted to numbers.
+
+    Args:
+        expression (str): The filter expression.
+
+    Returns:
+        tuple: The filter as a (column, operator, value) tuple.
+    """
+    match = FILTER_EXPRESSION_PATTERN.match(expression)
+    if match is None:
+        raise ValueError(f"Invalid filter expression: {expression}. Expected e.g. 'age>=20' or 'topic in Arts,Law'.")
+    column, comparison, value = match.groups()
+    comparison = comparison.strip()
+    if comparison == 'in':
+        return column, comparison, [_parse_value(item.strip()) for item in value.split(',')]
+    return column, comparison, _parse_value(value)
+
+
+def _parse_value(value: str) -> int | float | str:
+    for parse in (int, float):
+        try:
+            return parse(value)
+        except ValueError:
+            pass
+    return value
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Get the most common words in a slice of the dataset.")
+    parser.add_argument("path_to_dataset", help="Path to the directory with the dataset files.")
+    parser.add_argument("filters", nargs='*', help="Filters of the posts combined by AND, e.g. gender==female "
+                                                   "'age>=20' 'topic in Arts,Science' 'date>=2004-01-01'.")
+    parser.add_argument("--top", type=int, default=10, help="Number of words (default: 10).")
+    parser.add_argument("--min-length", type=int, default=0, help="Minimal length of the words (default: 0).")
+    args = parser.parse_args()
+    index = load_or_build_word_count_index(args.path_to_dataset)
+    print(index.get_top_words([parse_filter(expression) for expression in args.filters], args.top,
+                              {'min_length': args.min_length}).to_string(index=False))
@@ -0,0 +1,267 @@
+import numpy as np
+
+# first occurrence of the words which did not occur yet
+NOT_SEEN = np.iinfo(np.int64).max
+
+
+class WordCounter:
+    """
+    This class is a base class for the counters of token IDs. The tokens are counted batch by batch as they are
+    streamed, no list of the tokens is built. The counters of shards are merged into the counter of the corpus.
+
+    Methods:
+        update(token_ids: np.ndarray) -> None:
+            Count the tokens of a batch. This method should be overridden in subclasses.
+        merge(other: WordCounter) -> WordCounter:
+            Add the counts of the following tokens counted by another counter. This method should be overridden
+            in subclasses.
+        most_common(n: int) -> list[tuple[int, int, int]]:
+            Get the most common tokens. This method should be overridden in subclasses.
+    """
+
+    def update(self, token_ids: np.ndarray) -> None:
+        """
+        Count the tokens of a batch. This method should be overridden in subclasses.
+
+        Args:
+            token_ids (np.ndarray): The token IDs of the batch in the order of the tokens.
+
+        Returns:
+            None
+        """
+        raise NotImplementedError
+
+    def merge(self, other: 'WordCounter') -> 'WordCounter':
+        """
+        Add the counts of the following tokens counted by another counter. This method should be overridden
+        in subclasses.
+
+        Args:
+            other (WordCounter): The counter of the tokens following the tokens of this counter.
+
+        Returns:
+            WordCounter: This counter with the merged counts.
+        """
+        raise NotImplementedError
+
+    def most_common(self, n: int) -> list[tuple[int, int, int]]:
+        """
+        Get the most common tokens. This method should be overridden in subclasses.
+
+        Args:
+            n (int): The number of tokens.
+
+        Returns:
+            list[tuple[int, int, int]]: The token ID, the count and the maximal overestimation of the count
+                of the n most common tokens, sorted by the count.
+        """
+        raise NotImplementedError
+
+
+class ExactWordCounter(WordCounter):
+    """
+    Exact counts of the token IDs in an array indexed by the token ID, every batch is added by np.bincount.
+    The memory is bounded by the size of the vocabulary, not by the number of the tokens. The position of the first
+    occurrence of every token is kept as well, so tokens with the same count are ordered the same way
+    as by collections.Counter.most_common.
+
+    Attributes:
+        counts (np.ndarray): The number of occurrences of every token ID.
+        first_seen (np.ndarray): The position of the first occurrence of every token ID in the counted tokens,
+            NOT_SEEN for the tokens which did not occur.
+        n_tokens (int): The number of the counted tokens.
+    """
+
+    def __init__(self, vocabulary_size: int):
+        """
+        Initialize the ExactWordCounter class.
+
+        Args:
+            vocabulary_size (int): The number of the token IDs.
+
+        Returns:
+            None
+        """
+        self.counts = np.zeros(vocabulary_size, dtype=np.int64)
+        self.first_seen = np.full(vocabulary_size, NOT_SEEN, dtype=np.int64)
+        self.n_tokens = 0
+
+    def update(self, token_ids: np.ndarray) -> None:
+        """
+        Count the tokens of a batch.
+
+        Args:
+            token_ids (np.ndarray): The token IDs of the batch in the order of the tokens.
+
+        Returns:
+            None
+        """
+        if len(token_ids) == 0:
+            return
+        self.counts += np.bincount(token_ids, minlength=len(self.counts))
+        unique_ids, first_positions = np.unique(token_ids, return_index=True)
+        is_new = self.first_seen[unique_ids] == NOT_SEEN
+        self.first_seen[unique_ids[is_new]] = self.n_tokens + first_positions[is_new]
+        self.n_tokens += len(token_ids)
+
+    def merge(self, other: 'ExactWordCounter') -> 'ExactWordCounter':
+        """
+        Add the counts of the following tokens counted by another counter.
+
+        Args:
+            other (ExactWordCounter): The counter of the tokens following the tokens of this counter.
+
+        Returns:
+            ExactWordCounter: This counter with the merged counts.
+        """
+        if len(other.counts) != len(self.counts):
+            raise ValueError(f"Counters of different vocabularies can not be merged: "
+                             f"{len(self.counts)} and {len(other.counts)} token IDs.")
+        self.counts += other.counts
+        # the first occurrences of the other counter follow all tokens of this counter
+        is_new = (self.first_seen == NOT_SEEN) & (other.first_seen != NOT_SEEN)
+        self.first_seen[is_new] = self.n_tokens + other.first_seen[is_new]
+        self.n_tokens += other.n_tokens
+        return self
+
+    def most_common(self, n: int) -> list[tuple[int, int, int]]:
+        """
+        Get the most common tokens, tokens with the same count are ordered by their first occurrence.
+
+        Args:
+            n (int): The number of tokens.
+
+        Returns:
+            list[tuple[int, int, int]]: The token ID, the count and the overestimation of the count (always 0)
+                of the n most common tokens, sorted by the count.
+        """
+        candidates = np.flatnonzero(self.counts)
+        if len(candidates) > n:
+            # only the tokens with at least the n-th largest count are sorted
+            threshold = np.partition(self.counts[candidates], len(candidates) - n)[len(candidates) - n]
+            candidates = candidates[self.counts[candidates] >= threshold]
+        selected = candidates[np.lexsort((self.first_seen[candidates], -self.counts[candidates]))][:n]
+        return [(int(token_id), int(self.counts[token_id]), 0) for token_id in selected]
+
+
+class SpaceSavingWordCounter(WordCounter):
+    """
+    Approximate counts of the most common tokens by the Space-Saving algorithm in a fixed memory. At most
+    `capacity` tokens are monitored, a new token replaces the token with the smallest count and takes over
+    its count as the error. Every batch is first counted exactly and then merged with the monitored tokens,
+    the counters of shards are merged the same way.
+
+    The counts never underestimate: the true count of a monitored token is between count - error and count,
+    and a token which is not monitored occurs at most `max_error` times. Every token occurring more than
+    n_tokens / capacity times is monitored.
+
+    Attributes:
+        capacity (int): The maximal number of the monitored tokens.
+        token_ids (np.ndarray): The monitored token IDs.
+        counts (np.ndarray): The counts of the monitored tokens.
+        errors (np.ndarray): The maximal overestimation of the counts of the monitored tokens.
+        n_tokens (int): The number of the counted tokens.
+    """
+
+    def __init__(self, capacity: int):
+        """
+        Initialize the SpaceSavingWordCounter class.
+
+        Args:
+            capacity (int): The maximal number of the monitored tokens, should be much larger than the number
+                of the requested most common tokens.
+
+        Returns:
+            None
+        """
+        if capacity < 1:
+            raise ValueError(f"The capacity has to be positive, got {capacity}.")
+        self.capacity = capacity
+        self.token_ids = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.errors = np.zeros(0, dtype=np.int64)
+        self.n_tokens = 0
+
+    @property
+    def max_error(self) -> int:
+        """
+        The maximal count of a token which is not monitored, 0 until all counters are used.
+        """
+        return int(self.counts.min()) if len(self.counts) >= self.capacity else 0
+
+    def update(self, token_ids: np.ndarray) -> None:
+        """
+        Count the tokens of a batch.
+
+        Args:
+            token_ids (np.ndarray): The token IDs of the batch in the order of the tokens.
+
+        Returns:
+            None
+        """
+        if len(token_ids) == 0:
+            return
+        unique_ids, counts = np.unique(token_ids, return_counts=True)
+        # the exact counts of the batch are a summary without any error
+        self._merge_summary(unique_ids, counts, np.zeros(len(unique_ids), dtype=np.int64), 0, len(token_ids))
+
+    def merge(self, other: 'SpaceSavingWordCounter') -> 'SpaceSavingWordCounter':
+        """
+        Add the counts of the following tokens counted by another counter.
+
+        Args:
+            other (SpaceSavingWordCounter): The counter of the tokens following the tokens of this counter.
+
+        Returns:
+            SpaceSavingWordCounter: This counter with the merged counts.
+        """
+        self._merge_summary(other.token_ids, other.counts, other.errors, other.max_error, other.n_tokens)
+        return self
+
+    def most_common(self, n: int) -> list[tuple[int, int, int]]:
+        """
+        Get the most common monitored tokens, tokens with the same count are ordered by their token ID.
+
+        Args:
+            n (int): The number of tokens.
+
+        Returns:
+            list[tuple[int, int, int]]: The token ID, the count and the maximal overestimation of the count
+                of the n most common tokens, sorted by the count.
+        """
+        selected = np.lexsort((self.token_ids, -self.counts))[:n]
+        return [(int(self.token_ids[i]), int(self.counts[i]), int(self.errors[i])) for i in selected]
+
+    def _merge_summary(self, token_ids: np.ndarray, counts: np.ndarray, errors: np.ndarray, max_error: int,
+                       n_tokens: int) -> None:
+        """
+        Merge another summary into the monitored tokens. A token missing in one of the summaries gets
+        the maximal count of a token not monitored by that summary, both as the count and as the error.
+        Only the tokens with the largest merged counts are kept.
+
+        Args:
+            token_ids (np.ndarray): The token IDs of the other summary.
+            counts (np.ndarray): The counts of the tokens of the other summary.
+            errors (np.ndarray): The errors of the counts of the other summary.
+            max_error (int): The maximal count of a token not monitored by the other summary.
+            n_tokens (int): The number of the tokens counted by the other summary.
+
+        Returns:
+            None
+        """
+        own_max_error = self.max_error
+        merged_ids, inverse = np.unique(np.concatenate([self.token_ids, token_ids]), return_inverse=True)
+        is_own = np.arange(len(inverse)) < len(self.token_ids)
+        in_own = np.bincount(inverse[is_own], minlength=len(merged_ids)) > 0
+        in_other = np.bincount(inverse[~is_own], minlength=len(merged_ids)) > 0
+        missing_error = np.where(in_own, 0, own_max_error) + np.where(in_other, 0, max_error)
+
+        merged_counts = np.bincount(inverse, weights=np.concatenate([self.counts, counts]),
+                                    minlength=len(merged_ids)).astype(np.int64) + missing_error
+        merged_errors = np.bincount(inverse, weights=np.concatenate([self.errors, errors]),
+                                    minlength=len(merged_ids)).astype(np.int64) + missing_error
+        if len(merged_ids) > self.capacity:
+            kept = np.lexsort((merged_ids, -merged_counts))[:self.capacity]
+            merged_ids, merged_counts, merged_errors = merged_ids[kept], merged_counts[kept], merged_errors[kept]
+        self.token_ids, self.counts, self.errors = merged_ids, merged_counts, merged_errors
+        self.n_tokens += n_tokens
@@ -1,231 +1,379 @@
-import requests
-import base64
-import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import os
-
-st.set_page_config(layout="wide") # Use wider layout
-
-# Set consistent plot style
-sns.set_theme(style="whitegrid")
-
-# --- Helper Function to Create Plots ---
-# This helps avoid matplotlib state issues in Streamlit
-def create_plot(plot_func, *args, **kwargs):
-    """Creates a matplotlib plot in a new figure."""
-    fig, ax = plt.subplots()
-    plot_func(*args, **kwargs, ax=ax)
-    return fig
-
-def send_image_to_server(task_number: int, image_path: str) -> str:
-    """
-    Send an image to the server for processing and get the response.
-
-    Args:
-        task_number (int): The task number to identify the type of analysis.
-        image_path (str): The path to the image file.
-
-    Returns:
-        str: The response from the server.
-    """
-    # Flask server URL
-    URL = "http://81.201.57.116:5008"
-
-    # Load and encode image to base64
-    with open(image_path, "rb") as image_file:
-        image_base64 = base64.b64encode(image_file.read()).decode("utf-8")
-
-    if task_number == 1:
-        prompt = "Please comment on the data trend in this chart. This chart represents number of articles by sex in blogs dataset."
-    elif task_number == 2:
-        prompt = "Please comment on the data trend in this chart. This chart represents the top 10 topics in blogs dataset."
-    elif task_number == 3:
-        prompt = "Please comment on the data trend in this chart. This chart represents the top 10 topics vs. zodiac signs in blogs dataset."
-    else:
-        raise ValueError("Invalid task number. Please provide a task number between 1 and 3.")
-    # Define the payload
-    payload = {
-        "prompt": prompt,
-        "image_base64": image_base64
-    }
-    try:
-        # Send the POST request
-        response = requests.post(URL, json=payload)
-    
-        # Print the response
-        if response.ok:
-            return f'🧠 GPT Response:\n {response.json()["response"]}'
-        else:
-            return f'❌ Error: {response.status_code}, {response.text}'
-    except requests.exceptions.RequestException as e:
-        return f'❌ Request failed: {str(e)}'
-
-# --- Streamlit App ---
-st.title("📊 Dataset Analysis")
-# button for refreshing data
-if st.button('Refresh Data'):
-    st.cache_data.clear()
-
-
-tab1, tab2 = st.tabs(["Mandatory Tasks Results", "Additional Visualization Tasks"])
-
-@st.cache_data
-def load_data():
-    with st.spinner():
-        df = None
-        dataset_path = os.environ.get("DATASET_PATH_TIPSPORT")
-        if os.path.exists(dataset_path):
-            df = pd.read_csv(dataset_path)
-        if df is None:
-            raise FileNotFoundError('Could not find csv file with data.')
-        return df
-
-
-with tab1:
-    col1, col2, col3 = st.columns(3)
-
-    with col1:
-        st.header('Task 1 - Common words')
-        res1 = pd.read_csv('./results/Task1_results.csv')
-        st.dataframe(res1, use_container_width=True)
-    with col2:
-        st.header('Task 2 - Similar words')
-        res2 = pd.read_csv('./results/Task2_results.csv')
-        st.dataframe(res2, use_container_width=True)
-    with col3:
-        st.header('Task 3 - Dollar amount')
-        res3 = pd.read_csv('./results/Task3_results.csv')
-        st.dataframe(res3, use_container_width=True)
-
-with tab2:
-    data = load_data()
-    expander1 = st.expander("1. Number of articles by sex")
-    expander2 = st.expander("2. Top 10 topics")
-    expander3 = st.expander("3. Heatmap of top 10 topics vs. zodiac signs")
-    with expander1:
-        st.header("1. Number of articles by sex")
-        colexp11, colexp12 = st.columns(2)
-        with colexp11:
-            if 'gender' in data.columns:
-                gender_counts = data['gender'].value_counts()
-                if not gender_counts.empty:
-                    fig1, ax1 = plt.subplots()
-                    p, tx, autotexts = ax1.pie(gender_counts.values,
-                            labels=gender_counts.index.tolist(),
-                            autopct='',
-                            shadow=False,
-                            startangle=90)
-                    percentage = [gender_counts.values[i] / sum(gender_counts.values) for i in range(len(gender_counts.values))]
-
-                    for i, a in enumerate(autotexts):
-                        a.set_text(f"{percentage[i]:.1%}\n {gender_counts.values[i]}")
-                    ax1.axis('equal')
-                    # add actual numbers to the pie chart
-                    fig1.set_size_inches(5, 4)
-                    # set smaller font
-                    plt.setp(tx, size=10, weight="bold")
-                    st.pyplot(fig1, use_container_width=False)
-                    # save the figure for openai processing
-                    os.makedirs('data', exist_ok=True)
-                    fig1.savefig('data/pie_chart.png')
-                else:
-                    st.warning("There are no articles in the dataset.")
-            else:
-                st.warning("Can not find gender column in the dataset.")
-
-            with colexp12:
-                genai_ask1 = st.button('Interpret the graph by AI', key='ask1')
-                if genai_ask1:
-                    with st.spinner('Getting response'):
-                        text_response_1 = send_image_to_server(task_number=1, image_path='data/pie_chart.png')
-                        gender_interpretation = st.write(text_response_1)
-
-    with expander2:
-        st.header("2. Top 10 topics")
-        colexp21, colexp22 = st.columns(2)
-        with colexp21:
-            if 'topic' in data.columns:
-                # Handle potential NaN values in 'topic' before counting
-                topic_counts = data['topic'].dropna().value_counts()
-                top_10_topics = topic_counts.head(10)
-
-                if not top_10_topics.empty:
-                    fig_topics = create_plot(sns.barplot, y=top_10_topics.index, x=top_10_topics.values, orient='h',
-                                             palette="magma")
-                    plt.xlabel("Number of articles")
-                    plt.ylabel("Topic")
-                    plt.title("Top 10 topics")
-                    plt.tight_layout()  # Adjust layout to prevent labels overlapping
-                    # set size of the figure
-                    fig_topics.set_size_inches(5, 4)
-                    # center the plot to the container center
-                    st.pyplot(fig_topics, use_container_width=False)
-                    # save the figure for openai processing
-                    os.makedirs('data', exist_ok=True)
-                    fig_topics.savefig('data/topics_chart.png')
-
-                else:
-                    st.warning("There are no topics in the dataset.")
-            else:
-                st.warning("Column Topic not found")
-        with colexp22:
-            genai_ask2 = st.button('Interpret the graph by AI', key='ask2')
-            if genai_ask2:
-                with st.spinner('Getting response'):
-                    text_response_2 = send_image_to_server(task_number=2, image_path='data/topics_chart.png')
-                    topics_interpretation = st.write(text_response_2)
-
-    with expander3:
-        st.header("3. Heatmap of top 10 topics vs. zodiac signs")
-        colexp31, colexp32 = st.columns(2)
-        with colexp31:
-            if 'topic' in data.columns and 'sign' in data.columns:
-                tmp_data = data.copy()
-                # take just top 10 topics
-                top_10_topics = data['topic'].value_counts().head(10).index.tolist()
-                # Filter the data to include only the top 10 topics
-                tmp_data = tmp_data[tmp_data['topic'].isin(top_10_topics)]
-                # Handle potential NaN values in 'sign'
-                tmp_data.dropna(subset=['sign'], inplace=True)
-
-                if not tmp_data.empty:
-                    # Create a cross-tabulation (contingency table)
-                    crosstab = pd.crosstab(tmp_data['topic'], tmp_data['sign'])
-
-                    zodiac_order = [
-                        "Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
-                        "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"
-                    ]
-                    # Filter crosstab columns to include only signs present AND in the defined order
-                    ordered_columns = [sign for sign in zodiac_order if sign in crosstab.columns]
-                    # Reindex if there are columns to order
-                    if ordered_columns:
-                        crosstab = crosstab.reindex(columns=ordered_columns)
-
-                    if not crosstab.empty:
-                        st.write("")
-                        fig_heatmap, ax_heatmap = plt.subplots(figsize=(12, 8))  # Adjust figure size
-                        sns.heatmap(crosstab, annot=True, fmt="d", cmap="coolwarm", linewidths=.5, ax=ax_heatmap, cbar=True)
-                        plt.xlabel("Zodiac Sign")
-                        plt.ylabel("Theme")
-                        plt.title("Heatmap of Topics vs Zodiac Signs")
-                        plt.xticks(rotation=45, ha='right')  # Rotate labels for better readability
-                        fig_heatmap.set_size_inches(10, 5)
-                        plt.tight_layout()  # Adjust layout
-                        st.pyplot(fig_heatmap, use_container_width=False)
-                        # save the figure for openai processing
-                        os.makedirs('data', exist_ok=True)
-                        fig_heatmap.savefig('data/topics_heatmap.png')
-                    else:
-                        st.warning("Not enough data to create the heatmap. Please check the dataset.")
-                else:
-                    st.warning("After filtering, there are no articles in the dataset.")
-        with colexp32:
-            genai_ask3 = st.button('Interpret the graph by AI', key='ask3')
-            if genai_ask3:
-                with st.spinner('Getting response'):
-                    text_response_3 = send_image_to_server(task_number=3, image_path='data/topics_heatmap.png')
-                    heatmap_interpretation = st.write(text_response_3)
-
+import streamlit as st
+import pandas as pd
+import matplotlib.pyplot as plt
+import seaborn as sns
+import inspect
+import sys
+import os
+
+# the app is started as a script, make the project modules importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import cache_directory, interpretation_server_url, interpretation_timeout, interpretation_retries, \
+    interpretation_concurrency
+from utils.data_utils import get_results_directory
+from web_app.chart_cache import ChartCache, InterpretationCache, get_chart_key, get_image_hash
+from web_app.interpretation_client import InterpretationClient, InterpretationError
+
+st.set_page_config(layout="wide") # Use wider layout
+
+# Set consistent plot style
+sns.set_theme(style="whitegrid")
+
+# prompts sent with the charts to the interpretation server
+CHART_PROMPTS = {
+    1: "Please comment on the data trend in this chart. This chart represents number of articles by sex in blogs dataset.",
+    2: "Please comment on the data trend in this chart. This chart represents the top 10 topics in blogs dataset.",
+    3: "Please comment on the data trend in this chart. This chart represents the top 10 topics vs. zodiac signs in blogs dataset.",
+}
+
+# titles of the charts by the task numbers
+CHART_TITLES = {
+    1: "1. Number of articles by sex",
+    2: "2. Top 10 topics",
+    3: "3. Heatmap of top 10 topics vs. zodiac signs",
+}
+
+# --- Helper Function to Create Plots ---
+# This helps avoid matplotlib state issues in Streamlit
+def create_plot(plot_func, *args, **kwargs):
+    """Creates a matplotlib plot in a new figure."""
+    fig, ax = plt.subplots()
+    plot_func(*args, **kwargs, ax=ax)
+    return fig
+
+
+@st.cache_resource
+def get_chart_cache() -> ChartCache:
+    """Rendered charts shared by all sessions, stored next to the other build-once artifacts."""
+    return ChartCache(os.path.join(cache_directory, "charts"))
+
+
+@st.cache_resource
+def get_interpretation_cache() -> InterpretationCache:
+    """Interpretations of the charts shared by all sessions."""
+    return InterpretationCache(max_entries=64)
+
+
+@st.cache_resource
+def get_interpretation_client() -> InterpretationClient:
+    """Client of the interpretation server shared by all sessions, its connections are kept alive between clicks."""
+    return InterpretationClient(interpretation_server_url, timeout=interpretation_timeout,
+                                retries=interpretation_retries, concurrency=interpretation_concurrency)
+
+
+def send_images_to_server(images: dict[int, bytes]) -> dict[int, str]:
+    """
+    Send the images to the server for processing and get the responses. The images are sent concurrently.
+    The responses are cached by the hash of the image and the prompt, an unchanged chart is not sent again.
+
+    Args:
+        images (dict[int, bytes]): The PNG images of the charts by the task numbers identifying the type of analysis.
+
+    Returns:
+        dict[int, str]: The responses from the server by the task numbers.
+    """
+    invalid = [task_number for task_number in images if task_number not in CHART_PROMPTS]
+    if invalid:
+        raise ValueError("Invalid task number. Please provide a task number between 1 and 3.")
+    interpretations, uncached = {}, {}
+    for task_number, image in images.items():
+        interpretations[task_number] = get_interpretation_cache().get(get_image_hash(image), CHART_PROMPTS[task_number])
+        if interpretations[task_number] is None:
+            uncached[task_number] = (CHART_PROMPTS[task_number], image)
+    if uncached:
+        interpretations.update(get_interpretation_client().interpret_all(uncached))
+
+    responses = {}
+    for task_number, interpretation in interpretations.items():
+        if isinstance(interpretation, InterpretationError):
+            # the failed requests are not cached, they are retried on the next click
+            responses[task_number] = f'❌ {interpretation}'
+        else:
+            get_interpretation_cache().put(get_image_hash(images[task_number]), CHART_PROMPTS[task_number],
+                                           interpretation)
+            responses[task_number] = f'🧠 GPT Response:\n {interpretation}'
+    return responses
+
+
+def send_image_to_server(task_number: int, image: bytes) -> str:
+    """
+    Send an image to the server for processing and get the response.
+
+    Args:
+        task_number (int): The task number to identify the type of analysis.
+        image (bytes): The PNG image of the chart.
+
+    Returns:
+        str: The response from the server.
+    """
+    return send_images_to_server({task_number: image})[task_number]
+
+
+def render_gender_chart(gender_counts: pd.Series) -> plt.Figure:
+    """Pie chart of the number of articles by sex."""
+    fig1, ax1 = plt.subplots()
+    p, tx, autotexts = ax1.pie(gender_counts.values,
+            labels=gender_counts.index.tolist(),
+            autopct='',
+            shadow=False,
+            startangle=90)
+    percentage = [gender_counts.values[i] / sum(gender_counts.values) for i in range(len(gender_counts.values))]
+
+    for i, a in enumerate(autotexts):
+        a.set_text(f"{percentage[i]:.1%}\n {gender_counts.values[i]}")
+    ax1.axis('equal')
+    # add actual numbers to the pie chart
+    fig1.set_size_inches(5, 4)
+    # set smaller font
+    plt.setp(tx, size=10, weight="bold")
+    return fig1
+
+
+def render_topics_chart(top_10_topics: pd.Series) -> plt.Figure:
+    """Bar chart of the top 10 topics."""
+    fig_topics = create_plot(sns.barplot, y=top_10_topics.index, x=top_10_topics.values, orient='h',
+                             palette="magma")
+    plt.xlabel("Number of articles")
+    plt.ylabel("Topic")
+    plt.title("Top 10 topics")
+    plt.tight_layout()  # Adjust layout to prevent labels overlapping
+    # set size of the figure
+    fig_topics.set_size_inches(5, 4)
+    return fig_topics
+
+
+def render_heatmap(crosstab: pd.DataFrame) -> plt.Figure:
+    """Heatmap of the topics vs. the zodiac signs."""
+    fig_heatmap, ax_heatmap = plt.subplots(figsize=(12, 8))  # Adjust figure size
+    sns.heatmap(crosstab, annot=True, fmt="d", cmap="coolwarm", linewidths=.5, ax=ax_heatmap, cbar=True)
+    plt.xlabel("Zodiac Sign")
+    plt.ylabel("Theme")
+    plt.title("Heatmap of Topics vs Zodiac Signs")
+    plt.xticks(rotation=45, ha='right')  # Rotate labels for better readability
+    fig_heatmap.set_size_inches(10, 5)
+    plt.tight_layout()  # Adjust layout
+    return fig_heatmap
+
+
+def get_chart(render, data: pd.Series | pd.DataFrame) -> bytes:
+    """
+    Get the PNG image of the chart, it is plotted just when the data or the code of the plotting function changed.
+
+    Args:
+        render (callable): The function plotting the chart from the data.
+        data (pd.Series | pd.DataFrame): The plotted data.
+
+    Returns:
+        bytes: The PNG image.
+    """
+    key = get_chart_key(data, chart=render.__name__, source=inspect.getsource(render))
+    return get_chart_cache().get_or_render(key, lambda: render(data))
+
+
+# --- Streamlit App ---
+st.title("📊 Dataset Analysis")
+# button for refreshing data
+if st.button('Refresh Data'):
+    st.cache_data.clear()
+
+
+tab1, tab2, tab3 = st.tabs(["Mandatory Tasks Results", "Additional Visualization Tasks", "Author Profiles"])
+
+# the number of the authors on one page of the profiles
+PROFILES_PAGE_SIZE = 50
+
+@st.cache_data
+def load_data():
+    with st.spinner():
+        # the charts are computed from the post counts precomputed by the pipeline (Task4), not from the dataset
+        aggregates_path = os.path.join(get_results_directory(), 'Task4_results.csv')
+        if not os.path.exists(aggregates_path):
+            raise FileNotFoundError('Could not find the aggregates, run the pipeline first.')
+        return pd.read_csv(aggregates_path)
+
+
+@st.cache_data
+def load_profiles() -> pd.DataFrame | None:
+    """
+    Load the author profiles computed by the pipeline (Task5), the columnar file is read just once.
+
+    Args:
+        None
+
+    Returns:
+        pd.DataFrame | None: The profiles of the authors, None if Task5 was not run.
+    """
+    profiles_path = os.path.join(get_results_directory(), 'Task5_results.parquet')
+    if not os.path.exists(profiles_path):
+        return None
+    return pd.read_parquet(profiles_path)
+
+
+def count_posts(aggregates: pd.DataFrame, columns: list[str]) -> pd.Series:
+    """
+    Sum the precomputed post counts by the columns, the groups with missing values are dropped.
+
+    Args:
+        aggregates (pd.DataFrame): The post counts by gender, age band, topic and sign.
+        columns (list[str]): The columns to group by.
+
+    Returns:
+        pd.Series: The number of posts in every group.
+    """
+    return aggregates.groupby(columns)['count'].sum()
+
+
+with tab1:
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.header('Task 1 - Common words')
+        res1 = pd.read_csv(os.path.join(get_results_directory(), 'Task1_results.csv'))
+        st.dataframe(res1, use_container_width=True)
+    with col2:
+        st.header('Task 2 - Similar words')
+        res2 = pd.read_csv(os.path.join(get_results_directory(), 'Task2_results.csv'))
+        st.dataframe(res2, use_container_width=True)
+    with col3:
+        st.header('Task 3 - Dollar amount')
+        res3 = pd.read_csv(os.path.join(get_results_directory(), 'Task3_results.csv'))
+        st.dataframe(res3, use_container_width=True)
+        if os.path.exists(os.path.join(get_results_directory(), 'Task3_by_author_results.csv')):
+            st.subheader('Top authors by dollar amount')
+            res3_authors = pd.read_csv(os.path.join(get_results_directory(), 'Task3_by_author_results.csv'))
+            st.dataframe(res3_authors.head(10), use_container_width=True)
+
+with tab2:
+    data = load_data()
+    # the charts sent for the interpretation, None if a chart could not be created
+    gender_chart = topics_chart = heatmap_chart = None
+    genai_ask_all = st.button('Interpret all charts by AI', key='ask_all')
+    # the responses are shown above the charts, but the charts are created first
+    all_interpretations = st.container()
+    expander1 = st.expander(CHART_TITLES[1])
+    expander2 = st.expander(CHART_TITLES[2])
+    expander3 = st.expander(CHART_TITLES[3])
+    with expander1:
+        st.header(CHART_TITLES[1])
+        colexp11, colexp12 = st.columns(2)
+        with colexp11:
+            if 'gender' in data.columns:
+                gender_counts = count_posts(data, ['gender']).sort_values(ascending=False)
+                if not gender_counts.empty:
+                    gender_chart = get_chart(render_gender_chart, gender_counts)
+                    st.image(gender_chart)
+                else:
+                    st.warning("There are no articles in the dataset.")
+            else:
+                st.warning("Can not find gender column in the dataset.")
+
+            with colexp12:
+                genai_ask1 = st.button('Interpret the graph by AI', key='ask1')
+                if genai_ask1 and gender_chart is None:
+                    st.warning("There is no chart to interpret.")
+                elif genai_ask1:
+                    with st.spinner('Getting response'):
+                        text_response_1 = send_image_to_server(task_number=1, image=gender_chart)
+                        gender_interpretation = st.write(text_response_1)
+
+    with expander2:
+        st.header(CHART_TITLES[2])
+        colexp21, colexp22 = st.columns(2)
+        with colexp21:
+            if 'topic' in data.columns:
+                # NaN values in 'topic' are not counted
+                topic_counts = count_posts(data, ['topic']).sort_values(ascending=False)
+                top_10_topics = topic_counts.head(10)
+
+                if not top_10_topics.empty:
+                    topics_chart = get_chart(render_topics_chart, top_10_topics)
+                    st.image(topics_chart)
+
+                else:
+                    st.warning("There are no topics in the dataset.")
+            else:
+                st.warning("Column Topic not found")
+        with colexp22:
+            genai_ask2 = st.button('Interpret the graph by AI', key='ask2')
+            if genai_ask2 and topics_chart is None:
+                st.warning("There is no chart to interpret.")
+            elif genai_ask2:
+                with st.spinner('Getting response'):
+                    text_response_2 = send_image_to_server(task_number=2, image=topics_chart)
+                    topics_interpretation = st.write(text_response_2)
+
+    with expander3:
+        st.header(CHART_TITLES[3])
+        colexp31, colexp32 = st.columns(2)
+        with colexp31:
+            if 'topic' in data.columns and 'sign' in data.columns:
+                # take just top 10 topics
+                top_10_topics = count_posts(data, ['topic']).sort_values(ascending=False).head(10).index.tolist()
+                # Filter the counts to include only the top 10 topics, NaN values in 'sign' are not counted
+                tmp_data = data[data['topic'].isin(top_10_topics)].dropna(subset=['sign'])
+
+                if not tmp_data.empty:
+                    # Create a cross-tabulation (contingency table)
+                    crosstab = count_posts(tmp_data, ['topic', 'sign']).unstack(fill_value=0)
+
+                    zodiac_order = [
+                        "Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
+                        "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"
+                    ]
+                    # Filter crosstab columns to include only signs present AND in the defined order
+                    ordered_columns = [sign for sign in zodiac_order if sign in crosstab.columns]
+                    # Reindex if there are columns to order
+                    if ordered_columns:
+                        crosstab = crosstab.reindex(columns=ordered_columns)
+
+                    if not crosstab.empty:
+                        st.write("")
+                        heatmap_chart = get_chart(render_heatmap, crosstab)
+                        st.image(heatmap_chart)
+                    else:
+                        st.warning("Not enough data to create the heatmap. Please check the dataset.")
+                else:
+                    st.warning("After filtering, there are no articles in the dataset.")
+        with colexp32:
+            genai_ask3 = st.button('Interpret the graph by AI', key='ask3')
+            if genai_ask3 and heatmap_chart is None:
+                st.warning("There is no chart to interpret.")
+            elif genai_ask3:
+                with st.spinner('Getting response'):
+                    text_response_3 = send_image_to_server(task_number=3, image=heatmap_chart)
+                    heatmap_interpretation = st.write(text_response_3)
+
+    if genai_ask_all:
+        charts = {task_number: chart for task_number, chart in
+                  [(1, gender_chart), (2, topics_chart), (3, heatmap_chart)] if chart is not None}
+        with all_interpretations:
+            if not charts:
+                st.warning("There is no chart to interpret.")
+            else:
+                with st.spinner('Getting responses'):
+                    # all charts are sent at once, the wait is bounded by the slowest response
+                    responses = send_images_to_server(charts)
+                for task_number, response in responses.items():
+                    st.subheader(CHART_TITLES[task_number])
+                    st.write(response)
+
+with tab3:
+    profiles = load_profiles()
+    if profiles is None:
+        st.warning("Could not find the author profiles, run the pipeline with Task5 first.")
+    else:
+        st.header(f'Task 5 - Profiles of {len(profiles)} authors')
+        colsort, colorder, colpage = st.columns(3)
+        with colsort:
+            sort_column = st.selectbox('Sort by', [column for column in profiles.columns if column != 'top_words'],
+                                       index=list(profiles.columns).index('posts'))
+        with colorder:
+            ascending = st.radio('Order', ['Descending', 'Ascending'], horizontal=True) == 'Ascending'
+        with colpage:
+            n_pages = max(1, -(-len(profiles) // PROFILES_PAGE_SIZE))
+            page = st.number_input(f'Page (of {n_pages})', min_value=1, max_value=n_pages, value=1)
+        # the sort column is ordered, just the rows of the page are taken from the table
+        ordered = profiles[sort_column].sort_values(ascending=ascending, kind='stable').index
+        start = (page - 1) * PROFILES_PAGE_SIZE
+        st.dataframe(profiles.loc[ordered[start:start + PROFILES_PAGE_SIZE]], use_container_width=True,
+                     hide_index=True)
@@ -0,0 +1,207 @@
+from collections import OrderedDict
+from typing import Callable
+import matplotlib.pyplot as plt
+import pandas as pd
+import threading
+import hashlib
+import json
+import io
+import os
+
+# bump when the rendering code changes, so the charts rendered by the old code are not served
+CHART_CACHE_VERSION = 1
+
+
+def get_chart_key(data: pd.Series | pd.DataFrame, **plot_params) -> str:
+    """
+    Get the content address of a chart - a hash of the plotted data and of the plot parameters.
+
+    Args:
+        data (pd.Series | pd.DataFrame): The plotted data.
+        **plot_params: The parameters of the plot (e.g. the size, the colors and the titles).
+
+    Returns:
+        str: The hex digest identifying the chart.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(str(CHART_CACHE_VERSION).encode('utf-8'))
+    hasher.update(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+    # the hash of the values does not cover the labels of the columns and the axes
+    labels = {'name': getattr(data, 'name', None), 'columns': list(getattr(data, 'columns', [])),
+              'index_names': list(data.index.names)}
+    hasher.update(json.dumps(labels, default=str).encode('utf-8'))
+    hasher.update(json.dumps(plot_params, sort_keys=True, default=str).encode('utf-8'))
+    return hasher.hexdigest()
+
+
+def get_image_hash(image: bytes) -> str:
+    """
+    Get the hash of the image content.
+
+    Args:
+        image (bytes): The image.
+
+    Returns:
+        str: The hex digest of the image.
+    """
+    return hashlib.sha256(image).hexdigest()
+
+
+class ChartCache:
+    """
+    Stores the rendered charts as PNG files named by their content address (see get_chart_key),
+    a chart with the same data and plot parameters is read from the file instead of being plotted again.
+
+    Attributes:
+        directory (str): The directory with the rendered charts.
+
+    Methods:
+        get(key: str) -> bytes | None:
+            Get the rendered chart.
+        put(key: str, image: bytes) -> None:
+            Store the rendered chart.
+        get_or_render(key: str, render: Callable[[], plt.Figure]) -> bytes:
+            Get the rendered chart, render it if it is not cached.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Initialize the ChartCache class.
+
+        Args:
+            directory (str): The directory with the rendered charts.
+
+        Returns:
+            None
+        """
+        self.directory = directory
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.png")
+
+    def get(self, key: str) -> bytes | None:
+        """
+        Get the rendered chart.
+
+        Args:
+            key (str): The content address of the chart.
+
+        Returns:
+            bytes | None: The PNG image, None if the chart is not cached.
+        """
+        try:
+            with open(self._get_path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, image: bytes) -> None:
+        """
+        Store the rendered chart.
+
+        Args:
+            key (str): The content address of the chart.
+            image (bytes): The PNG image.
+
+        Returns:
+            None
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._get_path(key)
+        # the file is replaced atomically, so a concurrent session never reads a partial image
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, 'wb') as f:
+            f.write(image)
+        os.replace(tmp_path, path)
+
+    def get_or_render(self, key: str, render: Callable[[], plt.Figure]) -> bytes:
+        """
+        Get the rendered chart, render it and store it if it is not cached.
+
+        Args:
+            key (str): The content address of the chart.
+            render (Callable[[], plt.Figure]): The function plotting the chart.
+
+        Returns:
+            bytes: The PNG image.
+        """
+        image = self.get(key)
+        if image is None:
+            fig = render()
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format='png', bbox_inches='tight')
+            # the figures are not shown by pyplot, close them so they do not pile up in the server process
+            plt.close(fig)
+            image = buffer.getvalue()
+            self.put(key, image)
+        return image
+
+
+class InterpretationCache:
+    """
+    Keeps the interpretations of the charts in memory, keyed by the hash of the image and the prompt.
+    The least recently used interpretations are evicted when the cache is full. The cache is shared
+    by the sessions of the app, which run in separate threads.
+
+    Attributes:
+        max_entries (int): The maximal number of cached interpretations.
+
+    Methods:
+        get(image_hash: str, prompt: str) -> str | None:
+            Get the cached interpretation.
+        put(image_hash: str, prompt: str, interpretation: str) -> None:
+            Store the interpretation.
+    """
+
+    def __init__(self, max_entries: int = 128):
+        """
+        Initialize the InterpretationCache class.
+
+        Args:
+            max_entries (int): The maximal number of cached interpretations.
+
+        Returns:
+            None
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, image_hash: str, prompt: str) -> str | None:
+        """
+        Get the cached interpretation and mark it as recently used.
+
+        Args:
+            image_hash (str): The hash of the image.
+            prompt (str): The prompt sent with the image.
+
+        Returns:
+            str | None: The interpretation, None if it is not cached.
+        """
+        key = (image_hash, prompt)
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, image_hash: str, prompt: str, interpretation: str) -> None:
+        """
+        Store the interpretation, evict the least recently used one if the cache is full.
+
+        Args:
+            image_hash (str): The hash of the image.
+            prompt (str): The prompt sent with the image.
+            interpretation (str): The interpretation.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._entries[(image_hash, prompt)] = interpretation
+            self._entries.move_to_end((image_hash, prompt))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
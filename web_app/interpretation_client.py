@@ -0,0 +1,159 @@
+from concurrent.futures import Future
+from typing import Awaitable
+import threading
+import asyncio
+import aiohttp
+import base64
+import random
+
+
+class InterpretationError(Exception):
+    """
+    The interpretation server did not return an interpretation.
+
+    Attributes:
+        status (int | None): The HTTP status of the last response, None if the request failed without a response.
+    """
+
+    def __init__(self, message: str, status: int | None = None):
+        super().__init__(message)
+        self.status = status
+
+
+class InterpretationClient:
+    """
+    Asynchronous client of the chart interpretation server. The client runs its own event loop in a background
+    thread, so it can be used from the synchronous Streamlit script, and keeps one pooled session with keep-alive
+    connections for all requests. Failed requests (connection errors, timeouts, 429 and 5xx responses) are
+    retried with exponential backoff.
+
+    Attributes:
+        url (str): The URL of the interpretation server.
+        timeout (float): The total timeout of one request in seconds.
+        retries (int): The number of retries of a failed request.
+        backoff (float): The delay before the first retry in seconds, doubled with every retry.
+        concurrency (int): The maximal number of requests sent at once.
+
+    Methods:
+        interpret(prompt: str, image: bytes) -> str:
+            Get the interpretation of the image.
+        interpret_all(charts: dict[str, tuple[str, bytes]]) -> dict[str, str | InterpretationError]:
+            Get the interpretations of several images concurrently.
+        close() -> None:
+            Close the session and stop the event loop.
+    """
+
+    def __init__(self, url: str, timeout: float = 60.0, retries: int = 2, backoff: float = 0.5,
+                 concurrency: int = 4):
+        """
+        Initialize the InterpretationClient class.
+
+        Args:
+            url (str): The URL of the interpretation server.
+            timeout (float): The total timeout of one request in seconds.
+            retries (int): The number of retries of a failed request.
+            backoff (float): The delay before the first retry in seconds, doubled with every retry.
+            concurrency (int): The maximal number of requests sent at once.
+
+        Returns:
+            None
+        """
+        self.url = url
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.concurrency = concurrency
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="interpretation-client", daemon=True)
+        self._thread.start()
+        self._session = None
+        self._semaphore = None
+
+    def _submit(self, coroutine: Awaitable) -> Future:
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # the session and the semaphore are bound to the event loop, they are created in the loop thread
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  timeout=aiohttp.ClientTimeout(total=self.timeout))
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._session
+
+    async def _post(self, prompt: str, image: bytes) -> str:
+        session = self._get_session()
+        payload = {
+            "prompt": prompt,
+            "image_base64": base64.b64encode(image).decode("utf-8")
+        }
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                # exponential backoff with jitter, so concurrent retries do not hit the server at once
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1) * (0.5 + random.random()))
+            try:
+                async with self._semaphore, session.post(self.url, json=payload) as response:
+                    if response.ok:
+                        return (await response.json())["response"]
+                    error = InterpretationError(f"Error: {response.status}, {await response.text()}",
+                                                response.status)
+                    # the other client errors would fail again
+                    if response.status != 429 and response.status < 500:
+                        break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = InterpretationError(f"Request failed: {str(e) or e.__class__.__name__}")
+        raise error
+
+    async def _post_all(self, charts: dict[str, tuple[str, bytes]]) -> dict[str, str | InterpretationError]:
+        keys = list(charts)
+        results = await asyncio.gather(*(self._post(*charts[key]) for key in keys), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException) and not isinstance(result, InterpretationError):
+                raise result
+        return dict(zip(keys, results))
+
+    def interpret(self, prompt: str, image: bytes) -> str:
+        """
+        Get the interpretation of the image, block until it is received.
+
+        Args:
+            prompt (str): The prompt sent with the image.
+            image (bytes): The PNG image.
+
+        Returns:
+            str: The interpretation.
+
+        Raises:
+            InterpretationError: If the server did not return an interpretation after all retries.
+        """
+        return self._submit(self._post(prompt, image)).result()
+
+    def interpret_all(self, charts: dict[str, tuple[str, bytes]]) -> dict[str, str | InterpretationError]:
+        """
+        Get the interpretations of several images. The requests are sent concurrently, so the time is bounded
+        by the slowest request, not by the sum of all requests.
+
+        Args:
+            charts (dict[str, tuple[str, bytes]]): The prompts and the PNG images by the names of the charts.
+
+        Returns:
+            dict[str, str | InterpretationError]: The interpretations, or the errors of the failed requests,
+                by the names of the charts.
+        """
+        return self._submit(self._post_all(charts)).result()
+
+    def close(self) -> None:
+        """
+        Close the session and stop the event loop.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        if self._session is not None:
+            self._submit(self._session.close()).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
@@ -0,0 +1,43 @@
+from aiohttp import web
+import argparse
+import asyncio
+import base64
+import hashlib
+
+
+def create_stub_app(delay: float = 0.0) -> web.Application:
+    """
+    Create a stub of the chart interpretation server for local testing. It accepts the same requests as the real
+    server and answers with a fixed text describing the received image after the delay.
+
+    Args:
+        delay (float): The time in seconds the stub waits before answering, to simulate a slow model.
+
+    Returns:
+        web.Application: The stub server application.
+    """
+
+    async def interpret(request: web.Request) -> web.Response:
+        payload = await request.json()
+        if "prompt" not in payload or "image_base64" not in payload:
+            return web.Response(status=400, text="The prompt and the image_base64 fields are required.")
+        image = base64.b64decode(payload["image_base64"])
+        await asyncio.sleep(delay)
+        return web.json_response({
+            "response": f"Stub interpretation of the image {hashlib.sha256(image).hexdigest()[:12]} "
+                        f"({len(image)} bytes) for the prompt: {payload['prompt']}"
+        })
+
+    app = web.Application(client_max_size=32 * 1024 ** 2)
+    app.router.add_post("/", interpret)
+    return app
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Stub of the chart interpretation server for local testing.")
+    parser.add_argument("--host", default="127.0.0.1", help="Host to listen on (default: 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=5008, help="Port to listen on (default: 5008).")
+    parser.add_argument("--delay", type=float, default=1.0,
+                        help="Seconds to wait before answering, to simulate a slow model (default: 1).")
+    args = parser.parse_args()
+    web.run_app(create_stub_app(args.delay), host=args.host, port=args.port)